@@ -7,352 +7,3487 @@
 # Standard imports.
 import numpy as np
 import copy
+import os
+import collections
+import hashlib
+import concurrent.futures
+import sqlite3
 
 # Custom imports.
 from HandyTools import HandyTools
-from DataTools import DataTools
 
 # The  planetaryimage  module can be found at https://planetaryimage.readthedocs.io/en/latest/index.html .
 from planetaryimage import PDS3Image
 
 
+# Byte order and kind of the NumPy data type for each PDS3 SAMPLE_TYPE, used by the memory-mapped reader.
+PDS3SampleTypes = {
+    'MSB_INTEGER': '>i', 'INTEGER': '>i', 'SUN_INTEGER': '>i', 'MAC_INTEGER': '>i',
+    'MSB_UNSIGNED_INTEGER': '>u', 'UNSIGNED_INTEGER': '>u', 'SUN_UNSIGNED_INTEGER': '>u', 'MAC_UNSIGNED_INTEGER': '>u',
+    'LSB_INTEGER': '<i', 'PC_INTEGER': '<i', 'VAX_INTEGER': '<i',
+    'LSB_UNSIGNED_INTEGER': '<u', 'PC_UNSIGNED_INTEGER': '<u', 'VAX_UNSIGNED_INTEGER': '<u',
+    'IEEE_REAL': '>f', 'FLOAT': '>f', 'REAL': '>f', 'MAC_REAL': '>f', 'SUN_REAL': '>f', 
+    'PC_REAL': '<f'
+    }
 
-# This is a Python class to wrangle Venus Express VMC data.
-class VMCTools:
+# A PDS3 value with units attached, for example  RADIANCE_SCALING_FACTOR = 1.2E-04 <W/m**3/sr> . 
+# The fields match those of the  pvl  Quantity used by  planetaryimage , so that  label ['KEY'].value  works for both readers.
+PDS3Quantity = collections.namedtuple ('PDS3Quantity', ['value', 'units'])
+
+# Version of the content of the calibrated image cache files, part of the cache key so that old entries are never used after a change in the calibration.
+VMCPhotometryCacheVersion = 1
+
+# Running estimate of the size in bytes of each calibrated image cache directory used in this session, updated by  VMCPhotometryCached  and  evictVMCPhotometryCache .
+VMCPhotometryCacheSizes = {}
+
+# Venus Express mission sections: name, first and last orbit. The South Polar Dynamics Campaign is part of Extension 4, but has its own entry.
+VEXMissionSections = [ ('Nominal mission', 0, 547), ('Extension 1', 548, 1135), ('Extension 2', 1136, 1583), ('Extension 3', 1584, 2451), 
+                       ('Extension 4', 2452, 3537), ('South Polar Dynamics Campaign', 2775, 2811) ]
+
+
+
+# Light-weight stand-in for a  planetaryimage  PDS3Image, with the data memory-mapped from disk.
+class PDS3MemoryMappedImage:
     '''
-    This is a Python class to wrangle Venus Express VMC data.
+    Light-weight stand-in for a  planetaryimage  PDS3Image object, as returned by :py:meth:`~.VMCTools.readVMCImageAndGeoCubeMemoryMapped`.
+    It has the attributes  label ,  filename ,  data  (NumPy memmap with shape (bands, lines, samples)) and  image .
     '''
+
+    def __init__ (self, label, fileName, data):
     
+        self.label = label
+        self.filename = fileName
+        self.data = data
 
-    # Read the content of a VMC image and geocube.
+
+    # Same convention as  planetaryimage : a single band image is returned as a 2D array.
+    @property
+    def image (self):
+    
+        if self.data.shape [0] == 1:
+        
+            return self.data [0]
+            
+        return self.data
+
+
+
+# Index of the pixels of a VMC geocube on latitude and longitude, for fast latitude-longitude box queries.
+class VMCGeoCubeIndex:
+    '''
+    Index of the pixels of a VMC geocube on latitude and longitude, built once per geocube and used for many box queries with :py:meth:`~.getPixelsInBox`.
+    
+    The valid pixels are sorted on latitude band (of width  latitudeBandWidth ) and, within each band, on longitude. A box query then only needs a binary search
+    on the longitudes of each latitude band that overlaps the box, instead of a scan over all 512 x 512 pixels.
+    '''
+
+    def __init__ (self, VMCGeoArraysFlattened, latitudeBandWidth = 1.):
+        '''
+        :param VMCGeoArraysFlattened: the five flattened geocube planes, as returned by :py:meth:`~.VMCTools.readVMCImageAndGeoCube`.
+        :type VMCGeoArraysFlattened: list [NumPy array x 5]
+
+        :param latitudeBandWidth: width (˚) of the latitude bands of the index, default = 1˚.
+        :type latitudeBandWidth: float
+        '''
+        
+        latitudes = np.asarray ( VMCGeoArraysFlattened [3], dtype = float )
+        longitudes = np.asarray ( VMCGeoArraysFlattened [4], dtype = float )
+        
+        # Same longitude convention (0˚ - 360˚) and on-disk condition as  VMCTools.readVMCImageAndGeoCube  and  VMCTools.VMCPhotometry , without changing the input.
+        longitudes = np.where ( np.logical_and (longitudes >= -180, longitudes < 0), longitudes + 360, longitudes )
+        iValid = np.where ( np.logical_and ( np.abs (latitudes) <= 90, np.abs (longitudes) <= 360 ) ) [0]
+
+        self.latitudeBandWidth = latitudeBandWidth
+        self.numberOfLatitudeBands = int ( np.ceil (180 / latitudeBandWidth) )
+        
+        latitudeBands = np.minimum ( ( (latitudes [iValid] + 90) / latitudeBandWidth ).astype (int), self.numberOfLatitudeBands - 1 )
+        iSorted = np.lexsort ( (longitudes [iValid], latitudeBands) )
+        
+        self.iPixels = iValid [iSorted]
+        self.latitudes = latitudes [self.iPixels]
+        self.longitudes = longitudes [self.iPixels]
+        
+        # The pixels of latitude band  b  are  self.iPixels [ self.latitudeBandStarts [b] : self.latitudeBandStarts [b + 1] ] .
+        self.latitudeBandStarts = np.searchsorted ( latitudeBands [iSorted], np.arange (self.numberOfLatitudeBands + 1) )
+
+
+    # Return the indices of the pixels inside a latitude-longitude box.
+    def getPixelsInBox (self, latitudeLimits, longitudeLimits):
+        '''
+        :param latitudeLimits: minimum and maximum latitude (˚) of the box.
+        :type latitudeLimits: list [float, float]
+
+        :param longitudeLimits: one or two longitude ranges (˚) of the box, as returned by :py:meth:`~.VMCTools.getWindAdvectedBox`: 
+                                two identical ranges, or  [ [minimum, 360], [0, maximum] ]  when the box crosses the 0˚ meridian.
+        :type longitudeLimits: list [float, float] or list [ [float, float], [float, float] ]
+
+        :return: sorted indices in the flattened geocube arrays of the pixels inside the box (limits included).
+        :rtype: 1D NumPy array
+        '''
+        
+        if np.ndim (longitudeLimits) == 1:
+        
+            longitudeLimits = [longitudeLimits]
+            
+        # Identical ranges (box that does not cross the 0˚ meridian) are only searched once.
+        longitudeRanges = []
+        for longitudeRange in longitudeLimits:
+        
+            if list (longitudeRange) not in longitudeRanges:
+            
+                longitudeRanges.append ( list (longitudeRange) )
+
+
+        latitudeBandMinimum = max ( 0, int ( (latitudeLimits [0] + 90) / self.latitudeBandWidth ) )
+        latitudeBandMaximum = min ( self.numberOfLatitudeBands - 1, int ( (latitudeLimits [1] + 90) / self.latitudeBandWidth ) )
+        
+        iPixelsInBox = []
+        for latitudeBand in range (latitudeBandMinimum, latitudeBandMaximum + 1):
+        
+            bandStart = self.latitudeBandStarts [latitudeBand]
+            bandEnd = self.latitudeBandStarts [latitudeBand + 1]
+            
+            for longitudeMinimum, longitudeMaximum in longitudeRanges:
+            
+                iStart = bandStart + np.searchsorted ( self.longitudes [bandStart:bandEnd], longitudeMinimum, side = 'left' )
+                iEnd = bandStart + np.searchsorted ( self.longitudes [bandStart:bandEnd], longitudeMaximum, side = 'right' )
+                
+                # Only the first and last band can contain pixels outside the latitude limits.
+                if latitudeBand in [latitudeBandMinimum, latitudeBandMaximum]:
+                
+                    iInside = iStart + np.where ( np.logical_and ( self.latitudes [iStart:iEnd] >= latitudeLimits [0], self.latitudes [iStart:iEnd] <= latitudeLimits [1] ) ) [0]
+                    iPixelsInBox.append ( self.iPixels [iInside] )
+                    
+                else:
+                
+                    iPixelsInBox.append ( self.iPixels [iStart:iEnd] )
+                    
+                    
+        if not iPixelsInBox:
+        
+            return np.array ( [], dtype = int )
+            
+        return np.sort ( np.concatenate (iPixelsInBox) )
+
+
+
+# Sparse resampling matrix from the pixels of a VMC image to the cells of a regular latitude-longitude grid.
+class VMCReprojection:
+    '''
+    Sparse resampling matrix from the pixels of a VMC image to the cells of a regular (cylindrical) latitude-longitude grid, created by 
+    :py:meth:`~.VMCTools.getVMCReprojection` from the geocube of the image. 
+    
+    The matrix is stored in coordinate form: pixel  iPixels [k]  contributes with weight  weights [k]  to grid cell  iCells [k]  (flattened index, 
+    latitude first). Applying it to an image is a single weighted  np.bincount  over these three arrays, so the grid is calculated without a loop over pixels or cells.
+    '''
+
+    def __init__ (self, iPixels, iCells, weights, gridStep, latitudeLimits, longitudeLimits):
+        '''
+        :param iPixels: index in the flattened image of each non-zero element of the matrix.
+        :type iPixels: 1D NumPy array
+
+        :param iCells: index in the flattened grid of each non-zero element of the matrix.
+        :type iCells: 1D NumPy array
+
+        :param weights: value of each non-zero element of the matrix.
+        :type weights: 1D NumPy array
+
+        :param gridStep: size (˚) of the grid cells in latitude and longitude.
+        :type gridStep: float
+
+        :param latitudeLimits: minimum and maximum latitude (˚) of the grid.
+        :type latitudeLimits: list [float, float]
+
+        :param longitudeLimits: minimum and maximum longitude (˚, 0˚ - 360˚) of the grid.
+        :type longitudeLimits: list [float, float]
+        '''
+        
+        self.iPixels = iPixels
+        self.iCells = iCells
+        self.weights = weights
+        self.gridStep = float (gridStep)
+        self.latitudeLimits = [ float (latitudeLimit)  for latitudeLimit in latitudeLimits ]
+        self.longitudeLimits = [ float (longitudeLimit)  for longitudeLimit in longitudeLimits ]
+        
+        self.gridShape = VMCReprojection.getGridShape (gridStep, latitudeLimits, longitudeLimits)
+
+
+    # Number of latitudes and longitudes of a grid.
     @staticmethod
-    def readVMCImageAndGeoCube (VMCImageFileName):
+    def getGridShape (gridStep, latitudeLimits, longitudeLimits):
         '''
-        :param VMCImageFileName: file name (and path) of the VMC image file. It is assumed the .IMG and .GEO have the same file name.
-        :type VMCImageFileName: str
+        :param gridStep: size (˚) of the grid cells in latitude and longitude.
+        :type gridStep: float
 
-        :return: VMC image as PDS3Image and flattened NumPy array, and the VMC geocube as PDS3Image as list of five flattened NumPy arrays.
-        :rtype: planetaryimage.pds3image.PDS3Image, NumPy array, planetaryimage.pds3image.PDS3Image, list [NumPy array x 5]
+        :param latitudeLimits: minimum and maximum latitude (˚) of the grid.
+        :type latitudeLimits: list [float, float]
+
+        :param longitudeLimits: minimum and maximum longitude (˚) of the grid.
+        :type longitudeLimits: list [float, float]
+
+        :return: number of latitudes, number of longitudes
+        :rtype: tuple (int, int)
+        '''
+        
+        return ( int ( round ( ( float (latitudeLimits [1]) - float (latitudeLimits [0]) ) / float (gridStep) ) ), 
+                 int ( round ( ( float (longitudeLimits [1]) - float (longitudeLimits [0]) ) / float (gridStep) ) ) )
+
+
+    # Latitudes and longitudes of the centres of the grid cells.
+    def getGridCoordinates (self):
+        '''
+        :return: latitudes, longitudes (˚) of the centres of the grid rows and columns.
+        :rtype: 1D NumPy array (number of latitudes), 1D NumPy array (number of longitudes)
+        '''
+        
+        return self.latitudeLimits [0] + ( np.arange (self.gridShape [0]) + 0.5 ) * self.gridStep, \
+               self.longitudeLimits [0] + ( np.arange (self.gridShape [1]) + 0.5 ) * self.gridStep
+
+
+    # Weighted sums and sums of weights of the valid pixels of an image in each grid cell.
+    def getCellSums (self, VMCImageFlattened, fillValue = -1.):
+        '''
+        :param VMCImageFlattened: flattened (calibrated) VMC image.
+        :type VMCImageFlattened: 1D NumPy array
+
+        :param fillValue: value of the pixels that are not valid, default = -1 (as set by :py:meth:`~.VMCTools.VMCPhotometry`). NaN pixels are never valid.
+        :type fillValue: float
+
+        :return: weighted sums of the pixel values, sums of the weights, and the cell, value and weight of each valid matrix element.
+        :rtype: 1D NumPy array (number of cells) x 2, 1D NumPy array x 3
+        '''
+        
+        pixelValues = np.asarray (VMCImageFlattened, dtype = np.float64) [self.iPixels]
+        iValid = np.where ( np.logical_and ( pixelValues != fillValue, np.isfinite (pixelValues) ) ) [0]
+        
+        iCells = self.iCells [iValid]
+        pixelValues = pixelValues [iValid]
+        weights = self.weights [iValid]
+        
+        numberOfCells = self.gridShape [0] * self.gridShape [1]
+        
+        return np.bincount ( iCells, weights = weights * pixelValues, minlength = numberOfCells ), np.bincount ( iCells, weights = weights, minlength = numberOfCells ), \
+               iCells, pixelValues, weights
+
+
+    # Resample an image onto the grid.
+    def apply (self, VMCImageFlattened, fillValue = -1.):
+        '''
+        :param VMCImageFlattened: flattened (calibrated) VMC image.
+        :type VMCImageFlattened: 1D NumPy array
+
+        :param fillValue: value of the pixels that are not valid, default = -1.
+        :type fillValue: float
+
+        :return: weighted average of the valid pixels in each grid cell, NaN for cells without valid pixels.
+        :rtype: 2D NumPy array (number of latitudes, number of longitudes)
+        '''
+        
+        cellSums, cellWeights = self.getCellSums (VMCImageFlattened, fillValue) [:2]
+        
+        with np.errstate (invalid = 'ignore', divide = 'ignore'):
+        
+            return np.where ( cellWeights > 0, cellSums / cellWeights, np.nan ).reshape (self.gridShape)
+
+
+
+# Running sum, count and variance of many VMC images on a regular latitude-longitude grid.
+class VMCMosaic:
+    '''
+    Mosaic of many VMC images on the grid of a :py:class:`~.VMCReprojection`. The images are added one at a time with :py:meth:`~.add` and only the 
+    running weights (count), averages and sums of squared deviations of each grid cell are kept, so the memory use does not depend on the number of images.
+    The running values are updated with the pairwise formula of Chan et al. (1979), which does not lose precision like a running sum of squares does. 
+    Two mosaics on the same grid, for example from different worker processes, are combined with :py:meth:`~.merge`. See also :py:meth:`~.VMCTools.createVMCMosaic`.
+    
+    .. code-block:: python
+    
+        VMCMosaicUV = VMCMosaic (gridStep = 1.)
+        for VMCImageFileName, VMCImage, VMCGeoCube, VMCPhotometryResults in VMCTools.processVMCImages ('/SomeWhere/VMC/'):
+        
+            VMCMosaicUV.add ( VMCPhotometryResults [1], VMCTools.getVMCReprojection ( list ( VMCGeoCube.data.reshape (5, -1) ), gridStep = 1. ) )
+            
+        averageRadianceFactor = VMCMosaicUV.getAverage ()
+    '''
+
+    def __init__ (self, gridStep = 1., latitudeLimits = (-90., 90.), longitudeLimits = (0., 360.)):
+        '''
+        :param gridStep: size (˚) of the grid cells, default = 1˚.
+        :type gridStep: float
+
+        :param latitudeLimits: minimum and maximum latitude (˚) of the grid, default = (-90, 90).
+        :type latitudeLimits: list [float, float]
+
+        :param longitudeLimits: minimum and maximum longitude (˚) of the grid, default = (0, 360).
+        :type longitudeLimits: list [float, float]
+        '''
+        
+        self.gridStep = float (gridStep)
+        self.latitudeLimits = [ float (latitudeLimit)  for latitudeLimit in latitudeLimits ]
+        self.longitudeLimits = [ float (longitudeLimit)  for longitudeLimit in longitudeLimits ]
+        self.gridShape = VMCReprojection.getGridShape (gridStep, latitudeLimits, longitudeLimits)
+        
+        self.numberOfImages = 0
+        self.count = np.zeros ( self.gridShape [0] * self.gridShape [1] )
+        self.average = np.zeros ( self.gridShape [0] * self.gridShape [1] )
+        self.sumOfSquaredDeviations = np.zeros ( self.gridShape [0] * self.gridShape [1] )
+
+
+    # Combine the running values with those of another set of values on the same grid.
+    def combine (self, count, average, sumOfSquaredDeviations):
+    
+        totalCount = self.count + count
+        
+        with np.errstate (invalid = 'ignore', divide = 'ignore'):
+        
+            delta = np.where ( count > 0, average - self.average, 0. )
+            fraction = np.where ( totalCount > 0, count / totalCount, 0. )
+            
+        self.average += delta * fraction
+        self.sumOfSquaredDeviations += sumOfSquaredDeviations + delta * delta * self.count * fraction
+        self.count = totalCount
+
+
+    # Add an image to the mosaic.
+    def add (self, VMCImageFlattened, reprojection, fillValue = -1.):
+        '''
+        :param VMCImageFlattened: flattened (calibrated) VMC image.
+        :type VMCImageFlattened: 1D NumPy array
+
+        :param reprojection: resampling matrix of the image, on the same grid as the mosaic.
+        :type reprojection: VMCReprojection
+
+        :param fillValue: value of the pixels that are not valid, default = -1.
+        :type fillValue: float
+
+        :return: True when the image was added, False when the grid of  reprojection  is not that of the mosaic.
+        :rtype: bool
+        '''
+        
+        if [reprojection.gridStep, reprojection.latitudeLimits, reprojection.longitudeLimits] != [self.gridStep, self.latitudeLimits, self.longitudeLimits]:
+        
+            print ()
+            print (' WARNING: the grid of the reprojection is not the grid of the mosaic, image not added.')
+            
+            return False
+            
+        
+        cellSums, cellWeights, iCells, pixelValues, weights = reprojection.getCellSums (VMCImageFlattened, fillValue)
+        
+        with np.errstate (invalid = 'ignore', divide = 'ignore'):
+        
+            cellAverages = np.where ( cellWeights > 0, cellSums / cellWeights, 0. )
+            
+        deviations = pixelValues - cellAverages [iCells]
+        self.combine ( cellWeights, cellAverages, np.bincount ( iCells, weights = weights * deviations * deviations, minlength = len (cellWeights) ) )
+        self.numberOfImages += 1
+        
+        return True
+
+
+    # Add another mosaic on the same grid.
+    def merge (self, otherMosaic):
+        '''
+        :param otherMosaic: mosaic on the same grid.
+        :type otherMosaic: VMCMosaic
+        '''
+        
+        if [otherMosaic.gridStep, otherMosaic.latitudeLimits, otherMosaic.longitudeLimits] != [self.gridStep, self.latitudeLimits, self.longitudeLimits]:
+        
+            print ()
+            print (' WARNING: the grids of the mosaics are different, mosaic not merged.')
+            
+            return
+            
+            
+        self.combine (otherMosaic.count, otherMosaic.average, otherMosaic.sumOfSquaredDeviations)
+        self.numberOfImages += otherMosaic.numberOfImages
+
+
+    # Average of each grid cell.
+    def getAverage (self):
+        '''
+        :return: average of all pixels in each grid cell, NaN for empty cells.
+        :rtype: 2D NumPy array (number of latitudes, number of longitudes)
+        '''
+        
+        return np.where ( self.count > 0, self.average, np.nan ).reshape (self.gridShape)
+
+
+    # Sample variance of each grid cell.
+    def getVariance (self):
+        '''
+        :return: sample variance (normalised by N - 1) of all pixels in each grid cell, NaN for cells with less than two pixels.
+        :rtype: 2D NumPy array (number of latitudes, number of longitudes)
+        '''
+        
+        with np.errstate (invalid = 'ignore', divide = 'ignore'):
+        
+            return np.where ( self.count > 1, self.sumOfSquaredDeviations / (self.count - 1), np.nan ).reshape (self.gridShape)
+
+
+    # Number of pixels in each grid cell.
+    def getCount (self):
+        '''
+        :return: (weighted) number of pixels in each grid cell.
+        :rtype: 2D NumPy array (number of latitudes, number of longitudes)
+        '''
+        
+        return self.count.reshape (self.gridShape)
+
+
+
+# Count, sum and sum of squares of the UV radiance factor in bins of latitude, local solar time and Venus Express mission section.
+class VMCClimatology:
+    '''
+    Accumulator of the calibrated radiance factors of many VMC images, binned on mission section (see :py:meth:`~.VMCTools.getVEXMissionSection`), 
+    latitude and local solar time. Each bin holds the number of pixels, the sum and the sum of squares of the radiance factors, so that
+    
+        | accumulators filled in different (worker) processes are combined exactly with :py:meth:`~.merge`, in any order;
+        | the state is written to disk with :py:meth:`~.write` and read back with :py:meth:`~.VMCClimatology.read` to continue later with new images;
+        | the IDs of the images already added are kept in  imageIDs , so that an image is never added twice.
+        
+    See :py:meth:`~.VMCTools.createVMCClimatology` to reduce a whole archive in parallel.
+    '''
+    
+    def __init__ (self, latitudeStep = 5., localSolarTimeStep = 0.5):
+        '''
+        :param latitudeStep: width (˚) of the latitude bins, from -90˚ through 90˚, default = 5˚.
+        :type latitudeStep: float
+
+        :param localSolarTimeStep: width (h) of the local solar time bins, from 0h through 24h, default = 0.5h.
+        :type localSolarTimeStep: float
+        '''
+        
+        self.latitudeStep = float (latitudeStep)
+        self.localSolarTimeStep = float (localSolarTimeStep)
+        
+        binShape = ( len (VEXMissionSections), int ( np.ceil (180 / self.latitudeStep) ), int ( np.ceil (24 / self.localSolarTimeStep) ) )
+        self.count = np.zeros (binShape, dtype = np.int64)
+        self.sum = np.zeros (binShape)
+        self.sumOfSquares = np.zeros (binShape)
+        self.imageIDs = set ()
+
+
+    # Add the valid pixels of one image.
+    def add (self, radianceFactors, latitudes, localSolarTimes, iMissionSection, imageID = None):
+        '''
+        :param radianceFactors: calibrated radiance factors of the valid pixels.
+        :type radianceFactors: 1D NumPy array
+
+        :param latitudes: latitude (˚) of each pixel.
+        :type latitudes: 1D NumPy array
+
+        :param localSolarTimes: local solar time (h) of each pixel.
+        :type localSolarTimes: 1D NumPy array
+
+        :param iMissionSection: index of the mission section in  VEXMissionSections .
+        :type iMissionSection: int
+
+        :param imageID: ID of the image, default = None. When given and the image has been added before, nothing is done.
+        :type imageID: str
+
+        :return: True when the pixels were added.
+        :rtype: bool
+        '''
+        
+        if imageID is not None and imageID in self.imageIDs:
+        
+            return False
+            
+            
+        iLatitudes = np.clip ( ( (np.asarray (latitudes) + 90) / self.latitudeStep ).astype (int), 0, self.count.shape [1] - 1 )
+        iLocalSolarTimes = np.clip ( ( np.mod (localSolarTimes, 24) / self.localSolarTimeStep ).astype (int), 0, self.count.shape [2] - 1 )
+        iBins = iLatitudes * self.count.shape [2] + iLocalSolarTimes
+        
+        radianceFactors = np.asarray (radianceFactors, dtype = np.float64)
+        numberOfBins = self.count.shape [1] * self.count.shape [2]
+        
+        self.count [iMissionSection] += np.bincount (iBins, minlength = numberOfBins).reshape (self.count.shape [1:])
+        self.sum [iMissionSection] += np.bincount (iBins, weights = radianceFactors, minlength = numberOfBins).reshape (self.count.shape [1:])
+        self.sumOfSquares [iMissionSection] += np.bincount (iBins, weights = radianceFactors * radianceFactors, minlength = numberOfBins).reshape (self.count.shape [1:])
+        
+        if imageID is not None:
+        
+            self.imageIDs.add (imageID)
+            
+        return True
+
+
+    # Add the content of another accumulator with the same bins.
+    def merge (self, otherClimatology):
+        '''
+        :param otherClimatology: accumulator with the same bins.
+        :type otherClimatology: VMCClimatology
+
+        :return: True when merged, False when the bins are different.
+        :rtype: bool
         
         **Description:**
-        Read the content of a VMC image (.IMG) and corresponding geo-cube (.GEO).
+        Images that are in both accumulators would be counted twice, so only the bins are added; it is up to the caller to give each image to one accumulator only.
+        '''
         
-        The VMCImage is a PDS3Image object (`planetaryimage module <https://planetaryimage.readthedocs.io/en/latest/index.html>`_), with several attributes.
-        The *image* attribute contains the uncalibrated image. For more easy manipulation, 
-        the image is also returned as flattened NumPy array.
+        if [otherClimatology.latitudeStep, otherClimatology.localSolarTimeStep] != [self.latitudeStep, self.localSolarTimeStep]:
         
-        The VMCGeoCube is a PDS3Image object, with several attributes. The *data* attribute contains the planes:
+            print ()
+            print (' WARNING: the bins of the climatologies are different, climatology not merged.')
+            
+            return False
+            
+            
+        self.count += otherClimatology.count
+        self.sum += otherClimatology.sum
+        self.sumOfSquares += otherClimatology.sumOfSquares
+        self.imageIDs |= otherClimatology.imageIDs
         
-            | VMCGeoCube.data [0] Incidence Angle
-            | VMCGeoCube.data [1] Emission Angle
-            | VMCGeoCube.data [2] Phase Angle
-            | VMCGeoCube.data [3] Latitude
-            | VMCGeoCube.data [4] Longitude
+        return True
+
+
+    # Average radiance factor of each bin.
+    def getAverage (self):
+        '''
+        :return: average radiance factor per mission section, latitude and local solar time; NaN for empty bins.
+        :rtype: NumPy array (number of mission sections, number of latitudes, number of local solar times)
+        '''
         
-        For more easy manipulation, each plane is returned as a flattened NumPy array, and the five arrays are packed in the  VMCGeoArraysFlattened  list.                
+        with np.errstate (invalid = 'ignore', divide = 'ignore'):
+        
+            return np.where ( self.count > 0, self.sum / self.count, np.nan )
+
+
+    # Sample standard deviation of each bin.
+    def getStandardDeviation (self):
+        '''
+        :return: sample standard deviation (normalised by N - 1) of the radiance factor per bin; NaN for bins with less than two pixels.
+        :rtype: NumPy array (number of mission sections, number of latitudes, number of local solar times)
         '''
         
-        # Make sure to not have the extension attached to the file name.
-        if '.IMG' in VMCImageFileName or '.GEO' in VMCImageFileName:
+        with np.errstate (invalid = 'ignore', divide = 'ignore'):
         
-            VMCImageFileName = VMCImageFileName [:-4]
+            variance = ( self.sumOfSquares - self.sum * self.sum / self.count ) / (self.count - 1)
+            
+            return np.where ( self.count > 1, np.sqrt ( np.maximum (variance, 0) ), np.nan )
 
 
-        # Open the VMC .IMG file and create the         
-        VMCImage = PDS3Image.open (VMCImageFileName + '.IMG')
-        VMCImageFlattened = VMCImage.image.flatten ()
+    # Write the state to disk.
+    def write (self, climatologyFileName):
+        '''
+        :param climatologyFileName: file name (and path) of the .npz file.
+        :type climatologyFileName: str
         
+        **Description:**
+        The file is first written under a temporary name and then renamed, so that an interrupted run never leaves a half-written checkpoint.
+        '''
         
-        VMCGeoCube = PDS3Image.open (VMCImageFileName + '.GEO')  
-                     
-        VMCGeoArraysFlattened  = []
-        VMCGeoArraysFlattened.append ( VMCGeoCube.data [0].flatten () )
-        VMCGeoArraysFlattened.append ( VMCGeoCube.data [1].flatten () )
-        VMCGeoArraysFlattened.append ( VMCGeoCube.data [2].flatten () )      
-        VMCGeoArraysFlattened.append ( VMCGeoCube.data [3].flatten () )
-        VMCGeoArraysFlattened.append ( VMCGeoCube.data [4].flatten () )
+        temporaryFileName = climatologyFileName + '.{}.tmp'.format ( os.getpid () )
+        with open (temporaryFileName, 'wb') as fileOpen:
+        
+            np.savez_compressed ( fileOpen, latitudeStep = self.latitudeStep, localSolarTimeStep = self.localSolarTimeStep, 
+                                  count = self.count, sum = self.sum, sumOfSquares = self.sumOfSquares, imageIDs = np.array ( sorted (self.imageIDs), dtype = str ) )
+            
+        os.replace (temporaryFileName, climatologyFileName)
 
-        # The longitudes must run from 0˚ through 360˚ and not -180˚ through -180˚. 
-        iNegativeLongitudes = np.where ( np.logical_and (VMCGeoArraysFlattened [4] >= -180, VMCGeoArraysFlattened [4] < 0) ) [0]
+
+    # Read the state written by  write .
+    @staticmethod
+    def read (climatologyFileName):
+        '''
+        :param climatologyFileName: file name (and path) of the .npz file written by :py:meth:`~.write`.
+        :type climatologyFileName: str
+
+        :return: the accumulator
+        :rtype: VMCClimatology
+        '''
+        
+        with np.load (climatologyFileName) as climatologyContent:
+        
+            climatology = VMCClimatology ( float ( climatologyContent ['latitudeStep'] ), float ( climatologyContent ['localSolarTimeStep'] ) )
+            climatology.count = climatologyContent ['count']
+            climatology.sum = climatologyContent ['sum']
+            climatology.sumOfSquares = climatologyContent ['sumOfSquares']
+            climatology.imageIDs = set ( str (imageID)  for imageID in climatologyContent ['imageIDs'] )
+            
+            
+        return climatology
+
+
+
+# Latitude profile of the zonal and meridional winds at the cloud tops, with lookup tables of the displacement rates.
+class VMCWindModel:
+    '''
+    Wind model for :py:meth:`~.VMCTools.getWindAdvectedBox` and :py:meth:`~.VMCTools.getWindAdvectedBoxes`: zonal and meridional winds and their 1-sigma 
+    uncertainties as piecewise-linear functions of latitude, given at a list of (increasing) latitudes. A latitude may be repeated to describe a jump in 
+    the profile; at the latitude of the jump the value on the southern side is used.
+    
+    When the model is created, the profiles are converted once to displacement rates (˚/s at 70km altitude, the zonal rate at the equator) and stored as 
+    the slope and intercept of each latitude interval. Evaluating the model for any number of latitudes is then one  np.searchsorted  and one multiply-add, 
+    without branches. Latitudes outside the table get the value at the nearest end.
+    
+    The parametrisation of `Khatuntsev et al. (2013) <http://dx.doi.org/10.1016/j.icarus.2013.05.018s>`_ is available as  KhatuntsevWindModel . Other models 
+    can be read from a table with :py:meth:`~.VMCWindModel.read` or made from cloud-tracked winds with :py:meth:`~.VMCWindModel.fromCloudTrackingWinds`.
+    '''
+
+    def __init__ (self, latitudes, zonalWinds, meridionalWinds, oneSigmaZonalWinds = 20., oneSigmaMeridionalWinds = 12., name = ''):
+        '''
+        :param latitudes: latitudes (˚) of the profile, increasing.
+        :type latitudes: 1D NumPy array
+
+        :param zonalWinds: zonal wind (m/s, positive to the east) at each latitude.
+        :type zonalWinds: 1D NumPy array
+
+        :param meridionalWinds: meridional wind (m/s, positive to the north) at each latitude.
+        :type meridionalWinds: 1D NumPy array
+
+        :param oneSigmaZonalWinds: 1-sigma uncertainty (m/s) of the zonal wind, one value or one value per latitude, default = 20m/s.
+        :type oneSigmaZonalWinds: float or 1D NumPy array
+
+        :param oneSigmaMeridionalWinds: 1-sigma uncertainty (m/s) of the meridional wind, one value or one value per latitude, default = 12m/s.
+        :type oneSigmaMeridionalWinds: float or 1D NumPy array
+
+        :param name: name of the model, default = ''.
+        :type name: str
+        '''
+        
+        self.name = name
+        self.latitudes = np.asarray (latitudes, dtype = float)
+        self.winds = np.array ( [ np.broadcast_to ( np.asarray (winds, dtype = float), self.latitudes.shape )  
+                                  for winds in [zonalWinds, meridionalWinds, oneSigmaZonalWinds, oneSigmaMeridionalWinds] ] )
+        
+        # conversion factor for metres to degrees latitude at 70km altitude (radius of Venus taken to be 6052km), as in  VMCTools.getWindAdvectedBox . 
+        self.degreesLatitudePerMetre = 180 / ( np.pi * (6052 + 70) * 1000 )
+        displacementRates = self.winds * self.degreesLatitudePerMetre
+        
+        # Interval  i  runs from  latitudes [i - 1]  to  latitudes [i] ; intervals 0 and  n  are beyond the ends, with constant values. 
+        # Intervals of zero width (jumps) are never selected by  np.searchsorted , their slope is set to zero.
+        latitudeWidths = np.diff (self.latitudes)
+        self.slopes = np.zeros ( (4, len (self.latitudes) + 1) )
+        
+        with np.errstate (invalid = 'ignore', divide = 'ignore'):
+        
+            self.slopes [:, 1:-1] = np.where ( latitudeWidths > 0, np.diff (displacementRates, axis = 1) / latitudeWidths, 0. )
+            
+        self.intercepts = np.empty ( (4, len (self.latitudes) + 1) )
+        self.intercepts [:, 1:] = displacementRates - self.slopes [:, 1:] * self.latitudes
+        self.intercepts [:, 0] = displacementRates [:, 0]
+
+
+    # Displacement rates for any number of latitudes.
+    def getDisplacementRates (self, latitudes):
+        '''
+        :param latitudes: latitudes (˚).
+        :type latitudes: NumPy array
+
+        :return: zonal, meridional, 1-sigma zonal and 1-sigma meridional displacement rates (˚/s), the zonal ones at the equator (divide by the cosine of the latitude).
+        :rtype: NumPy array (4, shape of latitudes)
+        '''
+        
+        latitudes = np.asarray (latitudes, dtype = float)
+        iIntervals = np.searchsorted (self.latitudes, latitudes, side = 'left')
+        
+        # Beyond the northern end, the value at the last latitude.
+        latitudesInInterval = np.where ( iIntervals < len (self.latitudes), latitudes, self.latitudes [-1] )
+        
+        return self.intercepts [:, iIntervals] + self.slopes [:, iIntervals] * latitudesInInterval
+
+
+    # Winds for any number of latitudes.
+    def getWinds (self, latitudes):
+        '''
+        :param latitudes: latitudes (˚).
+        :type latitudes: NumPy array
+
+        :return: zonal, meridional, 1-sigma zonal and 1-sigma meridional winds (m/s).
+        :rtype: NumPy array (4, shape of latitudes)
+        '''
+        
+        return self.getDisplacementRates (latitudes) / self.degreesLatitudePerMetre
+
+
+    # Read a wind model from a table.
+    @staticmethod
+    def read (windModelFileName, name = ''):
+        '''
+        :param windModelFileName: file name (and path) of a text file with the columns latitude (˚), zonal wind, meridional wind, and optionally 1-sigma zonal 
+                                  and 1-sigma meridional wind (m/s). Lines starting with # are comments.
+        :type windModelFileName: str
+
+        :param name: name of the model, default = '' (the file name).
+        :type name: str
+
+        :return: the wind model
+        :rtype: VMCWindModel
+        '''
+        
+        windTable = np.loadtxt (windModelFileName, ndmin = 2)
+        windTable = windTable [ np.argsort (windTable [:, 0], kind = 'stable') ]
+        
+        return VMCWindModel ( windTable [:, 0], windTable [:, 1], windTable [:, 2], *[ windTable [:, iColumn]  for iColumn in range ( 3, min (5, windTable.shape [1]) ) ], 
+                              name = name  if name  else os.path.basename (windModelFileName) )
+
+
+    # Zonal-mean wind model from cloud-tracked winds.
+    @staticmethod
+    def fromCloudTrackingWinds (latitudes, zonalWinds, meridionalWinds, minimumNumberOfVectors = 3, name = 'cloud tracking'):
+        '''
+        :param latitudes: latitudes (˚) of the rows of the wind arrays, as returned by :py:meth:`~.VMCTools.getCloudTrackingWinds`.
+        :type latitudes: 1D NumPy array
+
+        :param zonalWinds: zonal winds (m/s) per latitude row, NaN where there is no vector. The rows of several image pairs on the same grid can be stacked side by side.
+        :type zonalWinds: 2D NumPy array
+
+        :param meridionalWinds: meridional winds (m/s), same shape as  zonalWinds .
+        :type meridionalWinds: 2D NumPy array
+
+        :param minimumNumberOfVectors: latitudes with fewer vectors are left out, default = 3.
+        :type minimumNumberOfVectors: int
+
+        :return: the wind model, with the average winds per latitude and their (sample) standard deviations as 1-sigma uncertainties, or None when no latitude has enough vectors.
+        :rtype: VMCWindModel
+        '''
+        
+        numberOfVectors = np.sum ( np.isfinite (zonalWinds) & np.isfinite (meridionalWinds), axis = 1 )
+        iLatitudes = np.where (numberOfVectors >= max (2, minimumNumberOfVectors)) [0]
+        
+        if not len (iLatitudes):
+        
+            print ()
+            print (' WARNING: not enough cloud-tracked winds for a wind model.')
+            
+            return None
+            
+            
+        windStatistics = []
+        for winds in [zonalWinds, meridionalWinds]:
+        
+            winds = np.where ( np.isfinite (zonalWinds) & np.isfinite (meridionalWinds), winds, np.nan ) [iLatitudes]
+            windStatistics.append ( [ np.nanmean (winds, axis = 1), np.nanstd (winds, axis = 1, ddof = 1) ] )
+            
+        return VMCWindModel ( np.asarray (latitudes) [iLatitudes], windStatistics [0][0], windStatistics [1][0], windStatistics [0][1], windStatistics [1][1], name = name )
+
+
+
+# The parametrisation of Khatuntsev et al. (2013) figures 10a (zonal) and 10b (meridional), with the uncertainties estimated from the grey areas in those figures.
+# The latitudes -40˚ (zonal) and -75˚ (meridional) are repeated because the parametrisation jumps there.
+KhatuntsevWindModel = VMCWindModel ( [ -90., -75., -75., -50., -40., -40., -20., -15., 90. ], 
+                                     [ -94 + 40 * (65.6 / 25), -94 + 25 * (65.6 / 25), -94 + 25 * (65.6 / 25), -94., -101.5, -93 - 25 * (8.5 / 35), -93 - 5 * (8.5 / 35), -93., -93. ], 
+                                     [ 0., 0., -9.58 + 25 * (9.38 / 25), -9.58, -6.5 - 20 * (3.08 / 30), -6.5 - 20 * (3.08 / 30), -6.5, -3.26 - 15 * (3.24 / 20), -3.26 + 90 * (3.24 / 20) ], 
+                                     20., 12., name = 'Khatuntsev et al. (2013)' )
+
+
+
+# This is a Python class to wrangle Venus Express VMC data.
+class VMCTools:
+    '''
+    This is a Python class to wrangle Venus Express VMC data.
+    '''
+    
+
+    # Read the content of a VMC image and geocube.
+    @staticmethod
+    def readVMCImageAndGeoCube (VMCImageFileName):
+        '''
+        :param VMCImageFileName: file name (and path) of the VMC image file. It is assumed the .IMG and .GEO have the same file name.
+        :type VMCImageFileName: str
+
+        :return: VMC image as PDS3Image and flattened NumPy array, and the VMC geocube as PDS3Image as list of five flattened NumPy arrays.
+        :rtype: planetaryimage.pds3image.PDS3Image, NumPy array, planetaryimage.pds3image.PDS3Image, list [NumPy array x 5]
+        
+        **Description:**
+        Read the content of a VMC image (.IMG) and corresponding geo-cube (.GEO).
+        
+        The VMCImage is a PDS3Image object (`planetaryimage module <https://planetaryimage.readthedocs.io/en/latest/index.html>`_), with several attributes.
+        The *image* attribute contains the uncalibrated image. For more easy manipulation, 
+        the image is also returned as flattened NumPy array.
+        
+        The VMCGeoCube is a PDS3Image object, with several attributes. The *data* attribute contains the planes:
+        
+            | VMCGeoCube.data [0] Incidence Angle
+            | VMCGeoCube.data [1] Emission Angle
+            | VMCGeoCube.data [2] Phase Angle
+            | VMCGeoCube.data [3] Latitude
+            | VMCGeoCube.data [4] Longitude
+        
+        For more easy manipulation, each plane is returned as a flattened NumPy array, and the five arrays are packed in the  VMCGeoArraysFlattened  list.                
+        '''
+        
+        # Make sure to not have the extension attached to the file name.
+        if '.IMG' in VMCImageFileName or '.GEO' in VMCImageFileName:
+        
+            VMCImageFileName = VMCImageFileName [:-4]
+
+
+        # Open the VMC .IMG file and create the         
+        VMCImage = PDS3Image.open (VMCImageFileName + '.IMG')
+        VMCImageFlattened = VMCImage.image.flatten ()
+        
+        
+        VMCGeoCube = PDS3Image.open (VMCImageFileName + '.GEO')  
+                     
+        VMCGeoArraysFlattened  = []
+        VMCGeoArraysFlattened.append ( VMCGeoCube.data [0].flatten () )
+        VMCGeoArraysFlattened.append ( VMCGeoCube.data [1].flatten () )
+        VMCGeoArraysFlattened.append ( VMCGeoCube.data [2].flatten () )      
+        VMCGeoArraysFlattened.append ( VMCGeoCube.data [3].flatten () )
+        VMCGeoArraysFlattened.append ( VMCGeoCube.data [4].flatten () )
+
+        # The longitudes must run from 0˚ through 360˚ and not -180˚ through -180˚. 
+        iNegativeLongitudes = np.where ( np.logical_and (VMCGeoArraysFlattened [4] >= -180, VMCGeoArraysFlattened [4] < 0) ) [0]
         VMCGeoArraysFlattened [4][iNegativeLongitudes] += 360
         VMCGeoCube.data [4] = VMCGeoArraysFlattened [4].reshape (512,512)
                 
         return VMCImage, VMCImageFlattened, VMCGeoCube, VMCGeoArraysFlattened
 
+
+
+    # Parse the PDS3 label at the start of a (VMC) data file.
+    @staticmethod
+    def readPDS3Label (PDS3FileName):
+        '''
+        :param PDS3FileName: file name (and path) of the PDS3 file (.IMG or .GEO).
+        :type PDS3FileName: str
+
+        :return: label, size of the label in bytes
+        :rtype: dict, int
+        
+        **Description:**
+        Parse only the attached PDS3 label of a file, without reading any of the data. Keywords inside an OBJECT ... END_OBJECT (or GROUP ... END_GROUP)
+        block are stored in a nested dictionary under the name of the object, for example  label ['IMAGE']['LINES'] .
+        
+        Values are converted to int, float, str or tuple. A value with units attached is returned as a  PDS3Quantity  with the fields  value  and  units , 
+        so that  label ['RADIANCE_SCALING_FACTOR'].value  works in the same way as for the label of a  planetaryimage  PDS3Image.
+        '''
+
+        # Read the label lines up to the END statement; the binary data that follows is never touched.
+        labelLines = []
+        labelSize = 0
+        with open (PDS3FileName, 'rb') as fileOpen:
+        
+            for fileLine in fileOpen:
+            
+                labelSize += len (fileLine)
+                fileLine = fileLine.decode ('latin-1').strip ()
+                
+                # The END statement can be followed by spaces or a comment.
+                if fileLine.split ('/*')[0].strip () == 'END':
+                
+                    break
+                    
+                labelLines.append (fileLine)
+
+
+        label = {}
+        labelStack = [label]
+        iLine = 0
+        while iLine < len (labelLines):
+        
+            # Remove comments.
+            labelLine = labelLines [iLine].split ('/*')[0].strip ()
+            iLine += 1
+
+            if '=' not in labelLine:
+            
+                continue
+                
+            keyword, value = [ element.strip ()  for element in labelLine.split ('=', 1) ]
+            
+            # Values can continue over multiple lines: quoted strings, sequences  ( ... )  and sets  { ... } .
+            while iLine < len (labelLines) and ( ( value [:1] == '"' and value.count ('"') % 2 == 1 ) or 
+                                                 ( value [:1] in ['(', '{'] and value.count ('(') + value.count ('{') > value.count (')') + value.count ('}') ) ):
+            
+                value += ' ' + labelLines [iLine].split ('/*')[0].strip ()
+                iLine += 1
+                
+
+            if keyword in ['OBJECT', 'GROUP']:
+            
+                labelStack [-1][value] = {}
+                labelStack.append ( labelStack [-1][value] )
+                
+            elif keyword in ['END_OBJECT', 'END_GROUP']:
+            
+                labelStack.pop ()
+                
+            else:
+            
+                labelStack [-1][keyword] = VMCTools.convertPDS3LabelValue (value)
+
+
+        return label, labelSize
+
+
+
+    # Convert the text of a PDS3 label value to a Python value.
+    @staticmethod
+    def convertPDS3LabelValue (valueString):
+        '''
+        :param valueString: text of the value of a PDS3 label keyword.
+        :type valueString: str
+
+        :return: converted value
+        :rtype: int, float, str, tuple or PDS3Quantity
+        
+        **Description:**
+        Convert the text of a PDS3 label value to int, float or str (quotes removed). Sequences  ( ... )  and sets  { ... }  are converted to tuples,
+        values with units  <...>  to a  PDS3Quantity . Dates and other values that are not numbers are returned as str.
+        '''
+        
+        valueString = valueString.strip ()
+        
+        if valueString [:1] in ['(', '{'] and valueString [-1:] in [')', '}']:
+        
+            return tuple ( VMCTools.convertPDS3LabelValue (element)  for element in valueString [1:-1].split (',')  if element.strip () != '' )
+            
+        if valueString [:1] == '"':
+        
+            return valueString.strip ('"').strip ()
+            
+        if valueString.endswith ('>') and '<' in valueString:
+        
+            value, units = valueString [:-1].split ('<', 1)
+            
+            return PDS3Quantity ( VMCTools.convertPDS3LabelValue (value), units.strip () )
+        
+        valueString = valueString.strip ("'")
+        
+        for conversion in [int, float]:
+        
+            try:
+            
+                return conversion (valueString)
+                
+            except ValueError:
+            
+                pass
+                
+                
+        return valueString
+
+
+
+    # Memory-map the data of the IMAGE object of a PDS3 file.
+    @staticmethod
+    def readPDS3ImageMemoryMapped (PDS3FileName, mode = 'r'):
+        '''
+        :param PDS3FileName: file name (and path) of the PDS3 file (.IMG or .GEO).
+        :type PDS3FileName: str
+
+        :param mode: mode of the NumPy memmap, default = 'r' (read only). Use 'c' (copy-on-write) to be able to modify the data in memory without changing the file.
+        :type mode: str
+
+        :return: image with the attributes  label ,  filename ,  data  and  image 
+        :rtype: PDS3MemoryMappedImage
+        
+        **Description:**
+        Parse the PDS3 label with :py:meth:`~.readPDS3Label` and return the data of the IMAGE object as a NumPy memmap with shape (bands, lines, samples).
+        Nothing is read from disk until a value is accessed, and only the pages that are accessed are read.
+        
+        For the BAND_STORAGE_TYPE LINE_INTERLEAVED and SAMPLE_INTERLEAVED the data is a transposed view on the memmap, which is not contiguous: 
+        flattening the whole cube, or a band of LINE_INTERLEAVED data, with  reshape (-1)  makes a copy (  flatten ()  always copies). A band of 
+        SAMPLE_INTERLEAVED data flattens to a strided view.
+        '''
+
+        label, labelSize = VMCTools.readPDS3Label (PDS3FileName)
+        imageObject = label ['IMAGE']
+
+        # The pointer to the image data is either a record number (starting at 1), a byte offset  n <BYTES>  (starting at 1) or a (file name, record) pair.
+        imagePointer = label ['^IMAGE']
+        dataFileName = PDS3FileName
+        if type (imagePointer) == tuple:
+        
+            dataFileName = os.path.join ( os.path.dirname (PDS3FileName), imagePointer [0] )
+            imagePointer = imagePointer [1]  if len (imagePointer) > 1  else 1
+        
+        elif type (imagePointer) == str:
+        
+            dataFileName = os.path.join ( os.path.dirname (PDS3FileName), imagePointer )
+            imagePointer = 1
+
+        
+        if type (imagePointer) == PDS3Quantity:
+        
+            dataOffset = imagePointer.value - 1
+            
+        else:
+        
+            dataOffset = ( imagePointer - 1 ) * label ['RECORD_BYTES']
+
+
+        sampleType = imageObject ['SAMPLE_TYPE']
+        if sampleType not in PDS3SampleTypes:
+        
+            raise ValueError ( 'Unsupported PDS3 SAMPLE_TYPE {} in {}'.format (sampleType, PDS3FileName) )
+            
+        dataType = np.dtype ( PDS3SampleTypes [sampleType] + str ( imageObject ['SAMPLE_BITS'] // 8 ) )
+
+
+        numberOfBands = imageObject.get ('BANDS', 1)
+        numberOfLines = imageObject ['LINES']
+        numberOfSamples = imageObject ['LINE_SAMPLES']
+        bandStorageType = imageObject.get ('BAND_STORAGE_TYPE', 'BAND_SEQUENTIAL')
+
+        # Band sequential data maps directly to (bands, lines, samples); the interleaved storage types are transposed views on the memmap.
+        if bandStorageType == 'LINE_INTERLEAVED':
+        
+            data = np.memmap ( dataFileName, dtype = dataType, mode = mode, offset = dataOffset, shape = (numberOfLines, numberOfBands, numberOfSamples) ).transpose (1, 0, 2)
+            
+        elif bandStorageType == 'SAMPLE_INTERLEAVED':
+        
+            data = np.memmap ( dataFileName, dtype = dataType, mode = mode, offset = dataOffset, shape = (numberOfLines, numberOfSamples, numberOfBands) ).transpose (2, 0, 1)
+            
+        else:
+        
+            data = np.memmap ( dataFileName, dtype = dataType, mode = mode, offset = dataOffset, shape = (numberOfBands, numberOfLines, numberOfSamples) )
+        
+        
+        return PDS3MemoryMappedImage ( label, os.path.basename (PDS3FileName), data )
+
+
+
+    # Read a VMC image and geocube as memory-mapped arrays.
+    @staticmethod
+    def readVMCImageAndGeoCubeMemoryMapped (VMCImageFileName):
+        '''
+        :param VMCImageFileName: file name (and path) of the VMC image file. It is assumed the .IMG and .GEO have the same file name.
+        :type VMCImageFileName: str
+
+        :return: VMC image as PDS3MemoryMappedImage and flattened NumPy array, and the VMC geocube as PDS3MemoryMappedImage and list of five flattened NumPy arrays.
+        :rtype: PDS3MemoryMappedImage, NumPy memmap, PDS3MemoryMappedImage, list [NumPy memmap x 5]
+        
+        **Description:**
+        Drop-in replacement for :py:meth:`~.readVMCImageAndGeoCube` that returns the same tuple, but does not use the  planetaryimage  module.
+        Only the PDS3 labels are parsed (:py:meth:`~.readPDS3Label`), the image and the five planes of the geocube are NumPy memmaps on the files. 
+        The flattened arrays are views on the same memory, no copies are made and each plane is only read from disk when it is used. 
+        
+        The geocube is opened copy-on-write: the transformation of the longitudes from -180˚ - 180˚ to 0˚ - 360˚ is done in memory on the longitude plane only,
+        the .GEO file is never modified.
+        
+        A LINE_INTERLEAVED geocube (see :py:meth:`~.readPDS3ImageMemoryMapped`) cannot be flattened per plane without copying; it is then read once into a 
+        band-sequential array, so that the flattened planes are still views on  VMCGeoCube.data .
+        
+        As with  planetaryimage , no scaling or offset is applied to the values in the files.
+        '''
+
+        # Make sure to not have the extension attached to the file name.
+        if '.IMG' in VMCImageFileName or '.GEO' in VMCImageFileName:
+        
+            VMCImageFileName = VMCImageFileName [:-4]
+
+
+        VMCImage = VMCTools.readPDS3ImageMemoryMapped (VMCImageFileName + '.IMG')
+        VMCImageFlattened = VMCImage.image.reshape (-1)
+        
+        VMCGeoCube = VMCTools.readPDS3ImageMemoryMapped (VMCImageFileName + '.GEO', mode = 'c')
+        
+        # Planes that cannot be flattened as a view (line interleaved): one copy of the whole cube in band-sequential order, instead of a copy per plane 
+        # that is no longer a view on the cube.
+        if VMCGeoCube.data.strides [1] != VMCGeoCube.data.shape [2] * VMCGeoCube.data.strides [2]:
+        
+            VMCGeoCube.data = np.ascontiguousarray (VMCGeoCube.data)
+            
+        VMCGeoArraysFlattened = [ VMCGeoCube.data [iPlane].reshape (-1)  for iPlane in range (5) ]
+
+        # The longitudes must run from 0˚ through 360˚ and not -180˚ through -180˚. 
+        # Since the flattened longitude array is a view on the geocube, this also changes VMCGeoCube.data [4].
+        np.add ( VMCGeoArraysFlattened [4], 360, out = VMCGeoArraysFlattened [4], 
+                 where = np.logical_and (VMCGeoArraysFlattened [4] >= -180, VMCGeoArraysFlattened [4] < 0) )
+
+        return VMCImage, VMCImageFlattened, VMCGeoCube, VMCGeoArraysFlattened
+
+        
+
+    # Read the content of a VeRa .TAB file and return a numpy array.
+    @staticmethod
+    def VMCPhotometry ( VMCImage, 
+                        VMCImageFlattened,
+                        VMCGeoCube,
+                        VMCGeoArraysFlattened,
+                        incidenceAngleLimit = 89,
+                        emissionAngleLimit = 89,
+                        applyLambertLaw = True,
+                        silent = False ):
+        '''
+        :param VMCImage: PDS3Image object (`planetaryimage module <https://planetaryimage.readthedocs.io/en/latest/index.html>`_) from reading a VMC .IMG file.
+        :type VMCImage: planetaryimage.pds3image.PDS3Image
+
+        :param VMCImageFlattened: flattened 1D array of the calibrated radiance factors of the entire VMC image.
+        :type VMCImageFlattened: 1D NumPy array
+
+        :param VMCGeoCube: PDS3Image object (`planetaryimage module <https://planetaryimage.readthedocs.io/en/latest/index.html>`_) from reading a VMC .GEO file.
+        :type VMCGeoCube: planetaryimage.pds3image.PDS3Image
+
+        :param VMCGeoArraysFlattened: flattened 1D array of the calibrated radiance factors of the entire VMC image.
+        :type VMCGeoArraysFlattened: list [NumPy array x 5], see description of :py:meth:`~.readVMCImageAndGeoCube`
+
+        :param emissionAngleLimit: valid pixels must have emission angle smaller or equal to  incidenceAngleLimit .
+        :type emissionAngleLimit: float
+
+        :param incidenceAngleLimit: valid pixels must have incidence angle smaller or equal to  incidenceAngleLimit .
+        :type incidenceAngleLimit: float
+
+        :param applyLambertLaw: apply Lambert limbdarkening law only, default = True (at this time, no other law has been programmed yet).
+        :type applyLambertLaw: bool
+
+        :param silent: print information on run, default = False.
+        :type silent: bool
+
+        :return: calibrated VMC image, flattened calibrated VMC image, average incidence angle, standard deviation incidence angle, average emission angle, standard emission incidence angle, average phase angle, standard deviation phase angle, radiance scaling factor 
+        :rtype: 2D NumPy array (512x512), 1d NumPy array, float, float, float, float, float, float,
+        
+        **Description:**
+        This method is used to calibrate a VMC image.
+        The calibrated radiance factor :math:`RF_{x,y}` for a valid (= on Venus disk with incidence angle < :code:`incidenceAngleLimit` and emission 
+        angle < :code:`emissionAngleLimit`) pixel :math:`(x,y)` in a VMC image is:
+                
+            :math:`RF_{x,y} = \\pi \\beta R_{observed - x,y} \\frac {d_{Venus}}{S_{Sun}}`
+        
+        
+        where :math:`\\beta` is the calibration correction factor (see `Shalygina  et al. 2015 <https://doi.org/10.1016/j.pss.2014.11.012>`_, their Table 1), :math:`R_{observed - x,y}` is the value at the pixel in ADU times the radiance scaling factor read from the VMC image header (:code:`VMCImage.label ['RADIANCE_SCALING_FACTOR'].value`, when read with `planetaryimage module <https://planetaryimage.readthedocs.io/en/latest/index.html>`_ in Python) in :math:`W/m^2/\\mu m/ster/ADU`, :math:`d_{Venus}` is the distance of Venus to the Sun in AU and :math:`S_{Sun}` the solar flux in :math:`W/m^2/\\mu m` at 1AU (see `Lee et al. 2015 <http://dx.doi.org/10.1016/j.icarus.2015.02.015>`_ their Equation 2).
+        
+        
+        The :math:`\\beta` factor is 2.34 for orbits before 2639 and 1 for later orbits.
+        
+        For :math:`S_{Sun}` (from `Lee et al. 2015 <http://dx.doi.org/10.1016/j.icarus.2015.02.015>`_ their Equation 1):
+        
+            :math:`S_{Sun} = \\frac {\\int S_{irradiance}(\\lambda) T(\\lambda) d\\lambda}{\\int T (\\lambda) d\\lambda}`
+        
+        The :math:`S_{irradiance}` is determined using the `Solar Spectra website <https://www.nrel.gov/grid/solar-resource/spectra.html>`_ and the transmission function :math:`T (\\lamda)` is taken from a parametrisation of the UV part of the transmission function of the VMC camera as published by `Markiewicz et al. 2007 <https://doi.org/10.1016/j.pss.2007.01.004>`_ their Figure 3.
+        
+        This results in a value of :math:`S_{Sun} = 1081 W/m^2/\\mu m`.
+        
+        The value of :math:`d_{Venus} = 0.723AU` to within 1% in :math:`d_{Venus}^2` over the orbit of Venus.
+        
+        Finally, a Lambert limb-darkening law is applied. 
+        
+        The calibration is only done for pixels that fall on the Venus disk, which have valid longitudes attached to them and an incidence angle of less than or equal to the limit set by the user (default = 89˚).
+        
+        The first four input variables come from reading a VMC image with the :py:meth:`~.readVMCImageAndGeoCube` method of this class.
+        '''
+    
+        # Make sure the longitudes are running from 0 through 360˚ and not -180˚ through 180˚.
+        iLongitude = np.where ( np.logical_and ( VMCGeoArraysFlattened [4] >= -180, VMCGeoArraysFlattened [4] < 0 ) ) [0]
+        VMCGeoArraysFlattened [4][iLongitude] += 360
+        
+        # Collect the indices of all the points on the illuminated part of the Venus disk.
+        iOnDiskValid1 = np.where ( np.logical_and ( abs ( VMCGeoArraysFlattened [4] ) <= 360, 
+                                                    abs ( VMCGeoArraysFlattened [0] ) <= incidenceAngleLimit ) ) [0]
+
+        
+        iOnDiskValid2 = np.where ( VMCGeoArraysFlattened [1][iOnDiskValid1] <= emissionAngleLimit ) [0]
+                                                    
+        # Valid points with incidence and emission angle limits.
+        iOnDiskValid = iOnDiskValid1 [iOnDiskValid2]
+        
+   
+        # Extract the Radiance Scaling Factor in the right units of W/m2/ster/micron, instead of the reported units W/m3/ster.   
+        radianceScalingFactor = VMCImage.label ['RADIANCE_SCALING_FACTOR'].value / 1000000.        
+
+        # The beta factor is ...
+        betaFactor = 2.34  if VMCImage.label ['ORBIT_NUMBER'] <= 2638  else  1
+
+        VMCImageCalibratedFlattened = np.zeros ( len (VMCImageFlattened) ) - 1.
+        VMCImageCalibratedFlattened [iOnDiskValid] = radianceScalingFactor * VMCImageFlattened [iOnDiskValid] * betaFactor * np.pi * (0.723 * 0.723) / 1081
+
+
+        # Use Lambert's law for the correction of the indicence angle.
+        if applyLambertLaw:
+     
+            VMCImageCalibratedFlattened [iOnDiskValid] /= np.cos  ( VMCGeoArraysFlattened [0][iOnDiskValid] * np.pi / 180 )
+
+
+        if not silent:
+        
+            print ()
+            print ( ' Calibrating image {}'.format (VMCImage.filename) )
+            print ( '  - valid point when longitude 0˚ - 360, incidence angle < {}˚ and emission angle < {}˚;'.format (incidenceAngleLimit, emissionAngleLimit) )
+            print ( '  - number of valid points = {:6d};'.format ( len (iOnDiskValid) ) )
+            print ( '  - radiance scaling factor = {} W/m2/micron/ster;'.format (radianceScalingFactor) )
+
+            if applyLambertLaw:
+
+                print ( '  - applying Lambert\'s law.')
+
+
+        # Average and standard deviation of the incidence, emission and phase angles of the valid pixels, gathered once for the three angles.
+        onDiskValid = np.zeros ( len (VMCImageFlattened), dtype = bool )
+        onDiskValid [iOnDiskValid] = True
+        angleStatistics = VMCTools.getVMCImageStatistics ( VMCImageCalibratedFlattened, VMCGeoArraysFlattened, onDiskValid, quantiles = (), numberOfHistogramBins = 0 ) [0]
+
+        return VMCImageCalibratedFlattened.reshape (512, 512), VMCImageCalibratedFlattened, \
+               angleStatistics [0, 1], angleStatistics [0, 2], \
+               angleStatistics [1, 1], angleStatistics [1, 2], \
+               angleStatistics [2, 1], angleStatistics [2, 2], radianceScalingFactor
+
+
+
+    # Calibrate a VMC image with low memory use, without modifying the input arrays.
+    @staticmethod
+    def VMCPhotometryLowMemory ( VMCImage, 
+                                 VMCImageFlattened,
+                                 VMCGeoCube,
+                                 VMCGeoArraysFlattened,
+                                 incidenceAngleLimit = 89,
+                                 emissionAngleLimit = 89,
+                                 applyLambertLaw = True,
+                                 dataType = np.float32,
+                                 out = None,
+                                 onDiskValid = None,
+                                 scratch = None,
+                                 silent = False ):
+        '''
+        :param VMCImage: PDS3Image object from reading a VMC .IMG file, see :py:meth:`~.VMCPhotometry`.
+        :type VMCImage: planetaryimage.pds3image.PDS3Image
+
+        :param VMCImageFlattened: flattened 1D array of the VMC image.
+        :type VMCImageFlattened: 1D NumPy array
+
+        :param VMCGeoCube: PDS3Image object from reading a VMC .GEO file (not used, kept for the same call signature as :py:meth:`~.VMCPhotometry`).
+        :type VMCGeoCube: planetaryimage.pds3image.PDS3Image
+
+        :param VMCGeoArraysFlattened: the five flattened geocube planes, see :py:meth:`~.readVMCImageAndGeoCube`. The longitudes can run from -180˚ through 180˚ or 0˚ through 360˚.
+        :type VMCGeoArraysFlattened: list [NumPy array x 5]
+
+        :param incidenceAngleLimit: valid pixels must have incidence angle smaller or equal to  incidenceAngleLimit .
+        :type incidenceAngleLimit: float
+
+        :param emissionAngleLimit: valid pixels must have emission angle smaller or equal to  emissionAngleLimit .
+        :type emissionAngleLimit: float
+
+        :param applyLambertLaw: apply Lambert limbdarkening law only, default = True.
+        :type applyLambertLaw: bool
+
+        :param dataType: data type of the calibrated image and of the intermediate calculations, default = np.float32.
+        :type dataType: NumPy dtype
+
+        :param out: preallocated C-contiguous array of  dataType  with 512 x 512 elements (2D or flattened) for the calibrated image, default = None (a new array is created).
+        :type out: NumPy array
+
+        :param onDiskValid: preallocated C-contiguous boolean array with 512 x 512 elements for the mask of valid pixels, default = None (a new array is created).
+        :type onDiskValid: NumPy array
+
+        :param scratch: preallocated C-contiguous array of the data type of  out  with 512 x 512 elements for the intermediate calculations, default = None (a new array is created).
+        :type scratch: NumPy array
+
+        :param silent: print information on run, default = False.
+        :type silent: bool
+
+        :return: same as :py:meth:`~.VMCPhotometry`; the calibrated image and the flattened calibrated image are views on the same memory (out).
+        :rtype: 2D NumPy array (512x512), 1d NumPy array, float, float, float, float, float, float, float
+        
+        **Description:**
+        Same calibration as :py:meth:`~.VMCPhotometry`, with a much lower peak memory use:
+        
+            | the calculation is done in  dataType  (float32 by default) instead of float64;
+            | the results are written into the  out  and  onDiskValid  buffers, and the intermediate calculations into the  scratch  buffer, which can all be 
+              allocated once and reused for all the images processed by a worker;
+            | the valid pixels are selected with a boolean mask instead of index arrays and fancy-indexed copies, and a single scratch array is used for the Lambert correction and the statistics;
+            | the input arrays are never modified (the longitudes are not transformed, this is not needed to select the valid pixels).
+            
+        The averages and standard deviations of the angles are accumulated in float64.
+        '''
+        
+        numberOfPixels = VMCImageFlattened.size
+        
+        if out is None:
+        
+            out = np.empty (numberOfPixels, dtype = dataType)
+            
+        if onDiskValid is None:
+        
+            onDiskValid = np.empty (numberOfPixels, dtype = bool)
+            
+        if scratch is None:
+        
+            scratch = np.empty (numberOfPixels, dtype = out.dtype)
+            
+        # Flattening a buffer that is not C-contiguous makes a copy, and the results would silently not end up in the buffer.
+        for bufferName, bufferArray in [ ('out', out), ('onDiskValid', onDiskValid), ('scratch', scratch) ]:
+        
+            if not bufferArray.flags.c_contiguous or bufferArray.size != numberOfPixels:
+            
+                raise ValueError ( '{} has to be a C-contiguous array with {} elements'.format (bufferName, numberOfPixels) )
+                
+        VMCImageCalibratedFlattened = out.reshape (-1)
+        onDiskValid = onDiskValid.reshape (-1)
+        scratch = scratch.reshape (-1)
+        
+        # Valid points on the disk, with incidence and emission angle limits. The  where = onDiskValid  makes the comparisons act as a logical and, without temporary arrays.
+        np.abs ( VMCGeoArraysFlattened [4], out = scratch )
+        np.less_equal ( scratch, 360, out = onDiskValid )
+        np.abs ( VMCGeoArraysFlattened [0], out = scratch )
+        np.less_equal ( scratch, incidenceAngleLimit, out = onDiskValid, where = onDiskValid )
+        np.less_equal ( VMCGeoArraysFlattened [1], emissionAngleLimit, out = onDiskValid, where = onDiskValid )
+        numberOfValidPoints = np.count_nonzero (onDiskValid)
+
+
+        # Extract the Radiance Scaling Factor in the right units of W/m2/ster/micron, instead of the reported units W/m3/ster.   
+        radianceScalingFactor = VMCImage.label ['RADIANCE_SCALING_FACTOR'].value / 1000000.        
+
+        betaFactor = 2.34  if VMCImage.label ['ORBIT_NUMBER'] <= 2638  else  1
+
+        VMCImageCalibratedFlattened.fill (-1.)
+        np.multiply ( VMCImageFlattened, out.dtype.type ( radianceScalingFactor * betaFactor * np.pi * (0.723 * 0.723) / 1081 ), out = VMCImageCalibratedFlattened, where = onDiskValid )
+
+        # Use Lambert's law for the correction of the indicence angle.
+        if applyLambertLaw:
+        
+            np.multiply ( VMCGeoArraysFlattened [0], out.dtype.type (np.pi / 180), out = scratch, where = onDiskValid )
+            np.cos ( scratch, out = scratch, where = onDiskValid )
+            np.divide ( VMCImageCalibratedFlattened, scratch, out = VMCImageCalibratedFlattened, where = onDiskValid )
+
+
+        if not silent:
+        
+            print ()
+            print ( ' Calibrating image {}'.format (VMCImage.filename) )
+            print ( '  - valid point when longitude 0˚ - 360, incidence angle < {}˚ and emission angle < {}˚;'.format (incidenceAngleLimit, emissionAngleLimit) )
+            print ( '  - number of valid points = {:6d};'.format (numberOfValidPoints) )
+            print ( '  - radiance scaling factor = {} W/m2/micron/ster;'.format (radianceScalingFactor) )
+
+            if applyLambertLaw:
+
+                print ( '  - applying Lambert\'s law.')
+
+
+        # Average and (sample) standard deviation of the incidence, emission and phase angles of the valid pixels.
+        angleStatistics = []
+        for iPlane in range (3):
+        
+            with np.errstate (invalid = 'ignore', divide = 'ignore'):
+            
+                angleAverage = np.sum ( VMCGeoArraysFlattened [iPlane], where = onDiskValid, dtype = np.float64 ) / numberOfValidPoints
+                
+                np.subtract ( VMCGeoArraysFlattened [iPlane], out.dtype.type (angleAverage), out = scratch, where = onDiskValid )
+                np.square ( scratch, out = scratch, where = onDiskValid )
+                angleStandardDeviation = np.sqrt ( np.sum ( scratch, where = onDiskValid, dtype = np.float64 ) / (numberOfValidPoints - 1) )
+                
+            angleStatistics += [ angleAverage, angleStandardDeviation ]
+
+
+        return VMCImageCalibratedFlattened.reshape (512, 512), VMCImageCalibratedFlattened, \
+               angleStatistics [0], angleStatistics [1], \
+               angleStatistics [2], angleStatistics [3], \
+               angleStatistics [4], angleStatistics [5], radianceScalingFactor
+
+
+
+    # Names of the rows of the statistics and histograms of  getVMCImageStatistics .
+    VMCImageStatisticsVariables = [ 'incidenceAngle', 'emissionAngle', 'phaseAngle', 'radianceFactor' ]
+
+
+
+    # Statistics and histograms of the angles and the calibrated radiance factor of the valid pixels of a VMC image, in one go.
+    @staticmethod
+    def getVMCImageStatistics ( VMCImageCalibratedFlattened, 
+                                VMCGeoArraysFlattened, 
+                                onDiskValid = None, 
+                                quantiles = (0.05, 0.25, 0.5, 0.75, 0.95), 
+                                histogramRanges = ( (0., 90.), (0., 90.), (0., 180.), (0., 2.) ), 
+                                numberOfHistogramBins = 90 ):
+        '''
+        :param VMCImageCalibratedFlattened: flattened calibrated VMC image, as returned by :py:meth:`~.VMCPhotometry` or :py:meth:`~.VMCPhotometryLowMemory`.
+        :type VMCImageCalibratedFlattened: 1D NumPy array
+
+        :param VMCGeoArraysFlattened: the five flattened geocube planes, see :py:meth:`~.readVMCImageAndGeoCube`.
+        :type VMCGeoArraysFlattened: list [NumPy array x 5]
+
+        :param onDiskValid: boolean mask of the valid pixels, for example from :py:meth:`~.VMCPhotometryLowMemory`, default = None: all pixels that are not -1, 
+            as in :py:meth:`~.getSparseVMCPhotometry`.
+        :type onDiskValid: 1D NumPy array
+
+        :param quantiles: quantiles (0 - 1) to calculate, default = (0.05, 0.25, 0.5, 0.75, 0.95).
+        :type quantiles: list [float]
+
+        :param histogramRanges: minimum and maximum of the histogram of each variable, default = 0˚ - 90˚ for the incidence and emission angles, 0˚ - 180˚ for the
+                                phase angle and 0 - 2 for the radiance factor.
+        :type histogramRanges: list [ [float, float] x 4 ]
+
+        :param numberOfHistogramBins: number of (equal width) bins of each histogram, default = 90. With 0 no histograms are made.
+        :type numberOfHistogramBins: int
+
+        :return: statistics, histograms, histogram bin edges
+        :rtype: NumPy array (4, 5 + number of quantiles), NumPy array (4, numberOfHistogramBins), NumPy array (4, numberOfHistogramBins + 1)
+        
+        **Description:**
+        The rows are the incidence, emission and phase angles and the radiance factor, as listed in  VMCTools.VMCImageStatisticsVariables . The columns of  statistics  are:
+        
+            | [0] number of valid pixels
+            | [1] average
+            | [2] standard deviation (normalised by N - 1)
+            | [3] minimum
+            | [4] maximum
+            | [5 ...] the quantiles
+            
+        Instead of a separate fancy-indexed copy and call per variable, the valid pixels of the four variables are gathered once into one (4, number of valid pixels) 
+        float64 block, and every statistic is a single reduction along the pixels of that block. The four histograms are made with one  np.bincount , 
+        with the bin numbers of each variable offset by  numberOfHistogramBins ; values outside the histogram range are not counted, as in  np.histogram . 
+        :py:meth:`~.VMCPhotometry` takes the average and standard deviation of its angles from here. Without valid pixels, the statistics are NaN 
+        (with a count of 0) and the histograms zero.
+        '''
+        
+        VMCImageCalibratedFlattened = np.asarray (VMCImageCalibratedFlattened).reshape (-1)
+        
+        if onDiskValid is None:
+        
+            onDiskValid = VMCImageCalibratedFlattened != -1
+            
+        onDiskValid = np.asarray (onDiskValid, dtype = bool).reshape (-1)
+        numberOfValidPoints = np.count_nonzero (onDiskValid)
+        
+        # The valid pixels of all variables in one block.
+        validValues = np.empty ( (4, numberOfValidPoints) )
+        for iVariable, values in enumerate ( [ VMCGeoArraysFlattened [0], VMCGeoArraysFlattened [1], VMCGeoArraysFlattened [2], VMCImageCalibratedFlattened ] ):
+        
+            validValues [iVariable] = np.asarray (values).reshape (-1) [onDiskValid]
+            
+            
+        statistics = np.full ( ( 4, 5 + len (quantiles) ), np.nan )
+        statistics [:, 0] = numberOfValidPoints
+        
+        histogramRanges = np.asarray (histogramRanges, dtype = float)
+        binWidths = (histogramRanges [:, 1] - histogramRanges [:, 0]) / max (1, numberOfHistogramBins)
+        binEdges = histogramRanges [:, :1] + binWidths [:, np.newaxis] * np.arange (numberOfHistogramBins + 1)
+        
+        if not numberOfValidPoints or not numberOfHistogramBins:
+        
+            histograms = np.zeros ( (4, numberOfHistogramBins), dtype = np.int64 )
+            
+        if not numberOfValidPoints:
+        
+            return statistics, histograms, binEdges
+            
+            
+        statistics [:, 1] = validValues.sum (axis = 1) / numberOfValidPoints
+        
+        if numberOfValidPoints > 1:
+        
+            deviations = validValues - statistics [:, 1:2]
+            statistics [:, 2] = np.sqrt ( np.einsum ('ij,ij->i', deviations, deviations) / (numberOfValidPoints - 1) )
+            
+        statistics [:, 3] = validValues.min (axis = 1)
+        statistics [:, 4] = validValues.max (axis = 1)
+        
+        if len (quantiles):
+        
+            statistics [:, 5:] = np.quantile (validValues, quantiles, axis = 1).T
+            
+        if not numberOfHistogramBins:
+        
+            return statistics, histograms, binEdges
+            
+            
+        # Bin number of each value, the values at the maximum of the range in the last bin (as in  np.histogram ).
+        iBins = np.floor ( (validValues - histogramRanges [:, :1]) / binWidths [:, np.newaxis] )
+        iBins [ validValues == histogramRanges [:, 1:] ] = numberOfHistogramBins - 1
+        inRange = (iBins >= 0) & (iBins < numberOfHistogramBins)
+        
+        iBins += ( np.arange (4) * numberOfHistogramBins ) [:, np.newaxis]
+        histograms = np.bincount ( iBins [inRange].astype (np.int64), minlength = 4 * numberOfHistogramBins ).reshape (4, numberOfHistogramBins)
+        
+        return statistics, histograms, binEdges
+
+
+
+    # Convert a calibrated VMC image to a compact representation of only the valid pixels.
+    @staticmethod
+    def getSparseVMCPhotometry (VMCImageCalibratedFlattened, VMCGeoArraysFlattened, onDiskValid = None, dataType = np.float32):
+        '''
+        :param VMCImageCalibratedFlattened: flattened calibrated VMC image, as returned by :py:meth:`~.VMCPhotometry` or :py:meth:`~.VMCPhotometryLowMemory`.
+        :type VMCImageCalibratedFlattened: 1D NumPy array
+
+        :param VMCGeoArraysFlattened: the five flattened geocube planes, see :py:meth:`~.readVMCImageAndGeoCube`.
+        :type VMCGeoArraysFlattened: list [NumPy array x 5]
+
+        :param onDiskValid: boolean mask of the valid pixels, as filled by :py:meth:`~.VMCPhotometryLowMemory`, default = None: all pixels that are not -1.
+        :type onDiskValid: NumPy array
+
+        :param dataType: data type of the stored values, default = np.float32.
+        :type dataType: NumPy dtype
+
+        :return: struct-of-arrays with the valid pixels
+        :rtype: dict
+        
+        **Description:**
+        Keep only the valid pixels of a calibrated image, which usually are a fraction of the 512 x 512 pixels. The returned dictionary has one array per quantity, 
+        all with one element per valid pixel:
+        
+            | 'iPixels': index of the pixel in the flattened image (int32)
+            | 'radianceFactor': calibrated radiance factor
+            | 'incidenceAngle', 'emissionAngle', 'phaseAngle', 'latitude', 'longitude': the geocube values of the pixel (longitude from 0˚ through 360˚)
+            | 'imageShape': shape of the dense image, (512, 512)
+            
+        Use :py:meth:`~.getDenseVMCPhotometry` to go back to the dense image, and :py:meth:`~.writeSparseVMCPhotometry` and :py:meth:`~.readSparseVMCPhotometry` to store it.
+        '''
+        
+        if onDiskValid is None:
+        
+            onDiskValid = VMCImageCalibratedFlattened != -1
+            
+        iPixels = np.flatnonzero (onDiskValid).astype (np.int32)
+        longitudes = VMCGeoArraysFlattened [4][iPixels].astype (dataType)
+        longitudes [ np.logical_and (longitudes >= -180, longitudes < 0) ] += 360
+        
+        return { 'iPixels': iPixels,
+                 'radianceFactor': VMCImageCalibratedFlattened [iPixels].astype (dataType),
+                 'incidenceAngle': VMCGeoArraysFlattened [0][iPixels].astype (dataType),
+                 'emissionAngle': VMCGeoArraysFlattened [1][iPixels].astype (dataType),
+                 'phaseAngle': VMCGeoArraysFlattened [2][iPixels].astype (dataType),
+                 'latitude': VMCGeoArraysFlattened [3][iPixels].astype (dataType),
+                 'longitude': longitudes,
+                 'imageShape': np.array ( [512, 512]  if VMCImageCalibratedFlattened.size == 512 * 512  else  [VMCImageCalibratedFlattened.size] ) }
+
+
+
+    # Convert the compact representation of a calibrated VMC image back to a dense image.
+    @staticmethod
+    def getDenseVMCPhotometry (sparseVMCPhotometry, quantity = 'radianceFactor', fillValue = -1.):
+        '''
+        :param sparseVMCPhotometry: struct-of-arrays as returned by :py:meth:`~.getSparseVMCPhotometry` or :py:meth:`~.readSparseVMCPhotometry`.
+        :type sparseVMCPhotometry: dict
+
+        :param quantity: quantity to put in the image, default = 'radianceFactor'.
+        :type quantity: str
+
+        :param fillValue: value of the invalid pixels, default = -1 (as in :py:meth:`~.VMCPhotometry`).
+        :type fillValue: float
+
+        :return: dense image and the flattened dense image (a view on the same memory).
+        :rtype: 2D NumPy array (512x512), 1D NumPy array
+        '''
+        
+        imageShape = tuple ( sparseVMCPhotometry ['imageShape'] )
+        
+        denseImageFlattened = np.full ( int ( np.prod (imageShape) ), fillValue, dtype = sparseVMCPhotometry [quantity].dtype )
+        denseImageFlattened [ sparseVMCPhotometry ['iPixels'] ] = sparseVMCPhotometry [quantity]
+        
+        return denseImageFlattened.reshape (imageShape), denseImageFlattened
+
+
+
+    # Write the compact representation of a calibrated VMC image to file.
+    @staticmethod
+    def writeSparseVMCPhotometry (sparseFileName, sparseVMCPhotometry, **extraArrays):
+        '''
+        :param sparseFileName: file name (and path) of the .npz file.
+        :type sparseFileName: str
+
+        :param sparseVMCPhotometry: struct-of-arrays as returned by :py:meth:`~.getSparseVMCPhotometry`.
+        :type sparseVMCPhotometry: dict
+
+        :param extraArrays: other values to store in the same file, for example  statistics = np.array ( VMCPhotometryResults [2:] ) .
+        :type extraArrays: NumPy arrays
+        
+        **Description:**
+        Store the arrays uncompressed in a single .npz file, one entry per quantity, so that they can be read back quickly with :py:meth:`~.readSparseVMCPhotometry`.
+        '''
+        
+        np.savez ( sparseFileName, **sparseVMCPhotometry, **extraArrays )
+
+
+
+    # Read the compact representation of a calibrated VMC image from file.
+    @staticmethod
+    def readSparseVMCPhotometry (sparseFileName):
+        '''
+        :param sparseFileName: file name (and path) of a .npz file written with :py:meth:`~.writeSparseVMCPhotometry`.
+        :type sparseFileName: str
+
+        :return: struct-of-arrays, including any extra arrays stored in the file.
+        :rtype: dict
+        '''
+        
+        with np.load (sparseFileName) as sparseContent:
+        
+            return { arrayName: sparseContent [arrayName]  for arrayName in sparseContent.files }
+
+
+
+    # Calibrate a stack of VMC images in one go.
+    @staticmethod
+    def VMCPhotometryStack ( VMCImages,
+                             VMCGeoCubes,
+                             radianceScalingFactors,
+                             orbitNumbers,
+                             incidenceAngleLimit = 89,
+                             emissionAngleLimit = 89,
+                             applyLambertLaw = True,
+                             silent = False ):
+        '''
+        :param VMCImages: stack of N uncalibrated VMC images, for example  np.stack ( [ VMCImage.image for ... ] ) .
+        :type VMCImages: NumPy array (N, 512, 512)
+
+        :param VMCGeoCubes: stack of the N corresponding geocubes, for example  np.stack ( [ VMCGeoCube.data for ... ] ) . The longitudes can run from -180˚ through 180˚ or 0˚ through 360˚.
+        :type VMCGeoCubes: NumPy array (N, 5, 512, 512)
+
+        :param radianceScalingFactors: radiance scaling factor of each image as read from the header (:code:`VMCImage.label ['RADIANCE_SCALING_FACTOR'].value`) in W/m3/ster/ADU.
+        :type radianceScalingFactors: list or 1D NumPy array (N)
+
+        :param orbitNumbers: orbit number of each image (:code:`VMCImage.label ['ORBIT_NUMBER']`).
+        :type orbitNumbers: list or 1D NumPy array (N)
+
+        :param incidenceAngleLimit: valid pixels must have incidence angle smaller or equal to  incidenceAngleLimit .
+        :type incidenceAngleLimit: float
+
+        :param emissionAngleLimit: valid pixels must have emission angle smaller or equal to  emissionAngleLimit .
+        :type emissionAngleLimit: float
+
+        :param applyLambertLaw: apply Lambert limbdarkening law only, default = True.
+        :type applyLambertLaw: bool
+
+        :param silent: print information on run, default = False.
+        :type silent: bool
+
+        :return: calibrated VMC images, flattened calibrated VMC images, average incidence angles, standard deviation incidence angles, average emission angles, standard deviation emission angles, average phase angles, standard deviation phase angles, radiance scaling factors
+        :rtype: NumPy array (N, 512, 512), NumPy array (N, 262144), 1D NumPy array (N) x 7
+        
+        **Description:**
+        Same calibration as :py:meth:`~.VMCPhotometry`, but for a stack of N images at once: the valid pixels, the calibration with the radiance scaling factor and 
+        :math:`\\beta` factor of each image, the Lambert correction and the averages and (sample) standard deviations of the angles are each computed 
+        with one array operation over the whole stack, instead of a Python loop over the images. Apart from the calibrated images, only the mask of valid 
+        pixels and one scratch array of the size of a single geocube plane are allocated: the angle statistics are calculated one plane at a time, with 
+        masked sums instead of copies of the angle planes.
+        
+        Each returned value is an array with one element per image, in the same order as the tuple returned by :py:meth:`~.VMCPhotometry`. 
+        Invalid pixels have the value -1, images without valid pixels have NaN averages. The input arrays are not modified. 
+        '''
+
+        VMCImages = np.asarray (VMCImages)
+        VMCGeoCubes = np.asarray (VMCGeoCubes)
+
+        # Per-image calibration factor, with shape (N, 1, 1) to broadcast over the pixels. The radiance scaling factor is converted from W/m3/ster to W/m2/ster/micron.
+        radianceScalingFactors = np.asarray (radianceScalingFactors, dtype = float) / 1000000.
+        betaFactors = np.where ( np.asarray (orbitNumbers) <= 2638, 2.34, 1. )
+        calibrationFactors = ( radianceScalingFactors * betaFactors * np.pi * (0.723 * 0.723) / 1081 ) [:, None, None]
+
+        # Valid pixels: on the disk (longitude within -360˚ - 360˚, which is not changed by the transformation to 0˚ - 360˚) and within the angle limits.
+        onDiskValid = ( np.abs ( VMCGeoCubes [:, 4] ) <= 360 ) & ( np.abs ( VMCGeoCubes [:, 0] ) <= incidenceAngleLimit ) & ( VMCGeoCubes [:, 1] <= emissionAngleLimit )
+        numberOfValidPoints = onDiskValid.sum ( axis = (1, 2) )
+
+        VMCImagesCalibrated = np.full ( VMCImages.shape, -1. )
+        np.multiply ( VMCImages, calibrationFactors, out = VMCImagesCalibrated, where = onDiskValid )
+
+        # One scratch array of the size of a single geocube plane, reused for the Lambert correction and for each angle plane.
+        scratch = np.empty ( VMCImages.shape )
+
+        # Use Lambert's law for the correction of the indicence angle.
+        if applyLambertLaw:
+        
+            np.multiply ( VMCGeoCubes [:, 0], np.pi / 180, out = scratch, where = onDiskValid )
+            np.cos ( scratch, out = scratch, where = onDiskValid )
+            np.divide ( VMCImagesCalibrated, scratch, out = VMCImagesCalibrated, where = onDiskValid )
+
+
+        # Average and sample standard deviation of the incidence, emission and phase angles of the valid pixels of each image, shape (N, 3), one plane at a time.
+        angleAverages = np.empty ( ( len (VMCImages), 3 ) )
+        angleStandardDeviations = np.empty ( ( len (VMCImages), 3 ) )
+        with np.errstate (invalid = 'ignore', divide = 'ignore'):
+        
+            for iPlane in range (3):
+            
+                angleAverages [:, iPlane] = np.sum ( VMCGeoCubes [:, iPlane], axis = (1, 2), where = onDiskValid, dtype = np.float64 ) / numberOfValidPoints
+                
+                np.subtract ( VMCGeoCubes [:, iPlane], angleAverages [:, iPlane, None, None], out = scratch, where = onDiskValid )
+                np.square ( scratch, out = scratch, where = onDiskValid )
+                angleStandardDeviations [:, iPlane] = np.sqrt ( np.sum ( scratch, axis = (1, 2), where = onDiskValid ) / (numberOfValidPoints - 1) )
+
+
+        if not silent:
+        
+            print ()
+            print ( ' Calibrating stack of {} images'.format ( len (VMCImages) ) )
+            print ( '  - valid point when longitude 0˚ - 360, incidence angle < {}˚ and emission angle < {}˚;'.format (incidenceAngleLimit, emissionAngleLimit) )
+            
+            if len (VMCImages):
+            
+                print ( '  - number of valid points per image = {:6d} - {:6d};'.format ( numberOfValidPoints.min (), numberOfValidPoints.max () ) )
+
+            if applyLambertLaw:
+
+                print ( '  - applying Lambert\'s law.')
+
+
+        return VMCImagesCalibrated, VMCImagesCalibrated.reshape ( len (VMCImages), int ( np.prod ( VMCImages.shape [1:] ) ) ), \
+               angleAverages [:, 0], angleStandardDeviations [:, 0], \
+               angleAverages [:, 1], angleStandardDeviations [:, 1], \
+               angleAverages [:, 2], angleStandardDeviations [:, 2], radianceScalingFactors
+
+
+
+    # Determine the key of a VMC image in the calibrated image cache.
+    @staticmethod
+    def getVMCPhotometryCacheKey (VMCImageFileName, incidenceAngleLimit = 89, emissionAngleLimit = 89, applyLambertLaw = True, keyByContent = False):
+        '''
+        :param VMCImageFileName: file name (and path) of the VMC image file. It is assumed the .IMG and .GEO have the same file name.
+        :type VMCImageFileName: str
+
+        :param incidenceAngleLimit: incidence angle limit passed to :py:meth:`~.VMCPhotometry`.
+        :type incidenceAngleLimit: float
+
+        :param emissionAngleLimit: emission angle limit passed to :py:meth:`~.VMCPhotometry`.
+        :type emissionAngleLimit: float
+
+        :param applyLambertLaw: Lambert law flag passed to :py:meth:`~.VMCPhotometry`.
+        :type applyLambertLaw: bool
+
+        :param keyByContent: if True, use the SHA-1 hash of the content of the .IMG and .GEO files, otherwise (default) the file names, sizes and modification times.
+        :type keyByContent: bool
+
+        :return: cache key
+        :rtype: str
+        
+        **Description:**
+        The calibrated image only depends on the content of the .IMG and .GEO files and on the three calibration parameters. The key is the SHA-1 hash of 
+        either the content of the files or their names, sizes and modification times (much faster, the files are not read), combined with the parameters.
+        '''
+        
+        if '.IMG' in VMCImageFileName or '.GEO' in VMCImageFileName:
+        
+            VMCImageFileName = VMCImageFileName [:-4]
+
+
+        keyHash = hashlib.sha1 ( 'v{} {} {} {}'.format (VMCPhotometryCacheVersion, float (incidenceAngleLimit), float (emissionAngleLimit), bool (applyLambertLaw)).encode () )
+        for extension in ['.IMG', '.GEO']:
+        
+            if keyByContent:
+            
+                with open (VMCImageFileName + extension, 'rb') as fileOpen:
+                
+                    for fileBlock in iter ( lambda: fileOpen.read (1048576), b'' ):
+                    
+                        keyHash.update (fileBlock)
+                        
+            else:
+            
+                fileStatus = os.stat (VMCImageFileName + extension)
+                keyHash.update ( '{} {} {}'.format ( os.path.abspath (VMCImageFileName + extension), fileStatus.st_size, fileStatus.st_mtime_ns ).encode () )
+                
+                
+        return keyHash.hexdigest ()
+
+
+
+    # Calibrate a VMC image, using an on-disk cache of calibrated images.
+    @staticmethod
+    def VMCPhotometryCached ( VMCImageFileName,
+                              cacheDirectory,
+                              incidenceAngleLimit = 89,
+                              emissionAngleLimit = 89,
+                              applyLambertLaw = True,
+                              maximumCacheSizeMB = 2000,
+                              keyByContent = False,
+                              silent = False ):
+        '''
+        :param VMCImageFileName: file name (and path) of the VMC image file. It is assumed the .IMG and .GEO have the same file name.
+        :type VMCImageFileName: str
+
+        :param cacheDirectory: directory in which the calibrated images are stored. It is created if it does not exist.
+        :type cacheDirectory: str
+
+        :param incidenceAngleLimit: valid pixels must have incidence angle smaller or equal to  incidenceAngleLimit .
+        :type incidenceAngleLimit: float
+
+        :param emissionAngleLimit: valid pixels must have emission angle smaller or equal to  emissionAngleLimit .
+        :type emissionAngleLimit: float
+
+        :param applyLambertLaw: apply Lambert limbdarkening law only, default = True.
+        :type applyLambertLaw: bool
+
+        :param maximumCacheSizeMB: size budget of the cache in MB, default = 2000MB. When a new entry makes the cache larger, the least recently used entries are removed.
+        :type maximumCacheSizeMB: float
+
+        :param keyByContent: identify the images by the hash of their content instead of by file name, size and modification time, default = False. See :py:meth:`~.getVMCPhotometryCacheKey`.
+        :type keyByContent: bool
+
+        :param silent: print information on run, default = False.
+        :type silent: bool
+
+        :return: same as :py:meth:`~.VMCPhotometry`
+        :rtype: 2D NumPy array (512x512), 1d NumPy array, float, float, float, float, float, float, float
+        
+        **Description:**
+        Transparent cache around :py:meth:`~.readVMCImageAndGeoCubeMemoryMapped` and :py:meth:`~.VMCPhotometry`. The first time an image is calibrated with a given set of 
+        parameters, the calibrated image and the statistics are stored in a compressed .npz file in  cacheDirectory , named after the key from :py:meth:`~.getVMCPhotometryCacheKey`.
+        The next time, the result is loaded from that file and the image is not read or calibrated again.
+        
+        The modification time of a cache file is updated each time it is used, and :py:meth:`~.evictVMCPhotometryCache` removes the files that were used 
+        longest ago (least recently used) when the total size of the cache exceeds  maximumCacheSizeMB . The size of the cache is measured on the first new entry 
+        in a session and then kept as a running estimate, so the directory is not scanned after every new entry. Entries written by other processes are not 
+        in the estimate, so when several processes share a cache it can grow beyond  maximumCacheSizeMB  until the next eviction; call 
+        :py:meth:`~.evictVMCPhotometryCache` after a batch to enforce the budget.
+        '''
+        
+        cacheKey = VMCTools.getVMCPhotometryCacheKey (VMCImageFileName, incidenceAngleLimit, emissionAngleLimit, applyLambertLaw, keyByContent)
+        cacheFileName = os.path.join (cacheDirectory, cacheKey + '.npz')
+
+        # The entry may be missing, or be removed by  evictVMCPhotometryCache  in another process between any two steps; it is then calculated again.
+        try:
+        
+            with np.load (cacheFileName) as cacheContent:
+            
+                VMCImageCalibrated = cacheContent ['VMCImageCalibrated']
+                statistics = cacheContent ['statistics']
+                
+        except FileNotFoundError:
+        
+            VMCImageCalibrated = None
+            
+        
+        if VMCImageCalibrated is not None:
+        
+            # Mark the entry as most recently used.
+            try:
+            
+                os.utime (cacheFileName)
+                
+            except FileNotFoundError:
+            
+                pass
+                
+            if not silent:
+            
+                print ()
+                print ( ' Calibrated image {} read from cache {}'.format (VMCImageFileName, cacheFileName) )
+
+        else:
+
+            VMCPhotometryResults = VMCTools.VMCPhotometry ( *VMCTools.readVMCImageAndGeoCubeMemoryMapped (VMCImageFileName), 
+                                                            incidenceAngleLimit = incidenceAngleLimit, emissionAngleLimit = emissionAngleLimit, 
+                                                            applyLambertLaw = applyLambertLaw, silent = silent )
+            
+            VMCImageCalibrated = VMCPhotometryResults [0]
+            statistics = np.array ( VMCPhotometryResults [2:], dtype = float )
+            
+            # Write to a temporary file first, so that other processes never read a half-written entry.
+            os.makedirs (cacheDirectory, exist_ok = True)
+            temporaryFileName = cacheFileName + '.{}.tmp'.format ( os.getpid () )
+            with open (temporaryFileName, 'wb') as fileOpen:
+            
+                np.savez_compressed (fileOpen, VMCImageCalibrated = VMCImageCalibrated, statistics = statistics)
+                
+            os.replace (temporaryFileName, cacheFileName)
+            
+            # The directory is only scanned when the running estimate of its size exceeds the budget, not after every new entry.
+            cacheDirectoryPath = os.path.abspath (cacheDirectory)
+            if cacheDirectoryPath in VMCPhotometryCacheSizes:
+            
+                VMCPhotometryCacheSizes [cacheDirectoryPath] += os.path.getsize (cacheFileName)
+                
+            if VMCPhotometryCacheSizes.get (cacheDirectoryPath, np.inf) > maximumCacheSizeMB * 1048576:
+            
+                VMCTools.evictVMCPhotometryCache (cacheDirectory, maximumCacheSizeMB)
+            
+
+        return VMCImageCalibrated, VMCImageCalibrated.reshape (-1), \
+               statistics [0], statistics [1], \
+               statistics [2], statistics [3], \
+               statistics [4], statistics [5], statistics [6]
+
+
+
+    # Remove the least recently used entries from the calibrated image cache.
+    @staticmethod
+    def evictVMCPhotometryCache (cacheDirectory, maximumCacheSizeMB = 2000):
+        '''
+        :param cacheDirectory: directory of the cache, see :py:meth:`~.VMCPhotometryCached`.
+        :type cacheDirectory: str
+
+        :param maximumCacheSizeMB: size budget of the cache in MB, default = 2000MB.
+        :type maximumCacheSizeMB: float
+
+        :return: number of cache entries removed
+        :rtype: int
+        
+        **Description:**
+        Remove the cache files with the oldest modification time (= least recently used) until the total size of the cache is within  maximumCacheSizeMB .
+        The size of the cache after the removal is the new running estimate used by :py:meth:`~.VMCPhotometryCached`.
+        '''
+        
+        cacheDirectoryPath = os.path.abspath (cacheDirectory)
+        
+        # The entries that are on disk, also those written by other processes. Another process may remove an entry after it is listed.
+        cacheEntries = []
+        for cacheFileName in os.listdir (cacheDirectory):
+        
+            if cacheFileName.endswith ('.npz'):
+            
+                try:
+                
+                    fileStatus = os.stat ( os.path.join (cacheDirectory, cacheFileName) )
+                    
+                except FileNotFoundError:
+                
+                    continue
+                    
+                cacheEntries.append ( (fileStatus.st_mtime_ns, fileStatus.st_size, cacheFileName) )
+                
+                
+        cacheSize = sum ( cacheEntry [1]  for cacheEntry in cacheEntries )
+        numberOfEntriesRemoved = 0
+        for modificationTime, fileSize, cacheFileName in sorted (cacheEntries):
+        
+            if cacheSize <= maximumCacheSizeMB * 1048576:
+            
+                break
+                
+            # Another process may have removed the same entry already.
+            try:
+            
+                os.remove ( os.path.join (cacheDirectory, cacheFileName) )
+                numberOfEntriesRemoved += 1
+                
+            except FileNotFoundError:
+            
+                pass
+                
+            cacheSize -= fileSize
+            
+            
+        VMCPhotometryCacheSizes [cacheDirectoryPath] = cacheSize
+        
+        return numberOfEntriesRemoved
+
+
+
+    # Calibrate all VMC images in a directory tree or list, reading the next images while the current one is calibrated.
+    @staticmethod
+    def processVMCImages ( VMCImageFileNames,
+                           numberOfReaderThreads = 4,
+                           prefetchSize = 8,
+                           incidenceAngleLimit = 89,
+                           emissionAngleLimit = 89,
+                           applyLambertLaw = True,
+                           sparseOutput = False,
+                           silent = True ):
+        '''
+        :param VMCImageFileNames: top directory of a tree with VMC .IMG and .GEO files, or a list of VMC image file names (and paths).
+        :type VMCImageFileNames: str or list [str]
+
+        :param numberOfReaderThreads: number of threads reading images from disk, default = 4.
+        :type numberOfReaderThreads: int
+
+        :param prefetchSize: maximum number of images that are read ahead and kept in memory, default = 8.
+        :type prefetchSize: int
+
+        :param incidenceAngleLimit: valid pixels must have incidence angle smaller or equal to  incidenceAngleLimit .
+        :type incidenceAngleLimit: float
+
+        :param emissionAngleLimit: valid pixels must have emission angle smaller or equal to  emissionAngleLimit .
+        :type emissionAngleLimit: float
+
+        :param applyLambertLaw: apply Lambert limbdarkening law only, default = True.
+        :type applyLambertLaw: bool
+
+        :param sparseOutput: yield the compact representation of the calibrated images instead of the results of :py:meth:`~.VMCPhotometry`, default = False.
+        :type sparseOutput: bool
+
+        :param silent: print information on run, default = True.
+        :type silent: bool
+
+        :return: generator of tuples (VMC image file name, VMCImage, VMCGeoCube, results of :py:meth:`~.VMCPhotometry`), or with  sparseOutput  the struct-of-arrays 
+                 of :py:meth:`~.getSparseVMCPhotometry` instead of the results, with the other results of :py:meth:`~.VMCPhotometry` in its entry 'statistics'.
+        :rtype: generator
+        
+        **Description:**
+        Generator that reads the VMC images with :py:meth:`~.readVMCImageAndGeoCube` in a pool of  numberOfReaderThreads  threads and calibrates them with 
+        :py:meth:`~.VMCPhotometry` as they become available, so that reading from disk and calibration overlap. The results are yielded in the order of the 
+        file names: sorted for a directory tree, in the order as given for a list:
+        
+        .. code-block:: python
+        
+            for VMCImageFileName, VMCImage, VMCGeoCube, VMCPhotometryResults in VMCTools.processVMCImages ('/SomeWhere/VMC/'):
+            
+                VMCImageCalibrated = VMCPhotometryResults [0]
+
+        At most  prefetchSize  images are read ahead of the one being processed, so the memory use does not depend on the number of images. 
+        Images that cannot be read are skipped with a warning. When the generator is closed early, the reads that have not started are cancelled.
+        
+        With  sparseOutput = True  only the valid pixels of each calibrated image are kept, which can be stored directly with :py:meth:`~.writeSparseVMCPhotometry`:
+        
+        .. code-block:: python
+        
+            for VMCImageFileName, VMCImage, VMCGeoCube, sparseVMCPhotometry in VMCTools.processVMCImages ('/SomeWhere/VMC/', sparseOutput = True):
+            
+                VMCTools.writeSparseVMCPhotometry ( VMCImageFileName [:-4] + '.npz', sparseVMCPhotometry )
+        '''
+        
+        # Collect the .IMG files in the directory tree.
+        if type (VMCImageFileNames) == str:
+        
+            VMCImageFileNames = sorted ( HandyTools.getFilesInDirectoryTree (VMCImageFileNames, extension = 'IMG') )
+            
+        
+        # The reads that have not started yet are cancelled when the generator is closed before the end (for example after a  break  in the loop).
+        readerPool = concurrent.futures.ThreadPoolExecutor ( max_workers = numberOfReaderThreads )
+        try:
+        
+            # Queue of images being read, in the order of the file names. A new read is only started when an image leaves the queue.
+            readQueue = collections.deque ()
+            iVMCImageFileName = 0
+            while readQueue or iVMCImageFileName < len (VMCImageFileNames):
+            
+                while len (readQueue) < max (1, prefetchSize) and iVMCImageFileName < len (VMCImageFileNames):
+                
+                    readQueue.append ( ( VMCImageFileNames [iVMCImageFileName], 
+                                         readerPool.submit (VMCTools.readVMCImageAndGeoCube, VMCImageFileNames [iVMCImageFileName]) ) )
+                    iVMCImageFileName += 1
+                    
+                
+                VMCImageFileName, readFuture = readQueue.popleft ()
+                try:
+                
+                    VMCImage, VMCImageFlattened, VMCGeoCube, VMCGeoArraysFlattened = readFuture.result ()
+                    
+                except (OSError, KeyError, ValueError) as readError:
+                
+                    print ()
+                    print ( ' WARNING: could not read {}: {}'.format (VMCImageFileName, readError) )
+                    
+                    continue
+                    
+                
+                VMCPhotometryResults = VMCTools.VMCPhotometry ( VMCImage, VMCImageFlattened, VMCGeoCube, VMCGeoArraysFlattened, 
+                                                                incidenceAngleLimit = incidenceAngleLimit, emissionAngleLimit = emissionAngleLimit, 
+                                                                applyLambertLaw = applyLambertLaw, silent = silent )
+                
+                if sparseOutput:
+                
+                    sparseVMCPhotometry = VMCTools.getSparseVMCPhotometry (VMCPhotometryResults [1], VMCGeoArraysFlattened)
+                    sparseVMCPhotometry ['statistics'] = np.array ( VMCPhotometryResults [2:], dtype = float )
+                    
+                    yield VMCImageFileName, VMCImage, VMCGeoCube, sparseVMCPhotometry
+                    
+                else:
+                
+                    yield VMCImageFileName, VMCImage, VMCGeoCube, VMCPhotometryResults
+                
+        finally:
+        
+            readerPool.shutdown (cancel_futures = True)
+
+
+
+    # Build (or read from the cache) the sparse matrix that resamples a VMC image onto a regular latitude-longitude grid.
+    @staticmethod
+    def getVMCReprojection (VMCGeoArraysFlattened, gridStep = 1., latitudeLimits = (-90., 90.), longitudeLimits = (0., 360.), cacheDirectory = '', VMCImageFileName = ''):
+        '''
+        :param VMCGeoArraysFlattened: the five flattened geocube planes, see :py:meth:`~.readVMCImageAndGeoCube`. The longitudes can run from -180˚ through 180˚ or 0˚ through 360˚.
+        :type VMCGeoArraysFlattened: list [NumPy array x 5]
+
+        :param gridStep: size (˚) of the grid cells in latitude and longitude, default = 1˚.
+        :type gridStep: float
+
+        :param latitudeLimits: minimum and maximum latitude (˚) of the grid, default = (-90, 90).
+        :type latitudeLimits: list [float, float]
+
+        :param longitudeLimits: minimum and maximum longitude (˚, 0˚ - 360˚) of the grid, default = (0, 360).
+        :type longitudeLimits: list [float, float]
+
+        :param cacheDirectory: directory in which the matrices are stored, default = '' (no cache). It is created if it does not exist.
+        :type cacheDirectory: str
+
+        :param VMCImageFileName: file name (and path) of the VMC image file the geocube was read from, default = '' (unknown). Only used for the cache key.
+        :type VMCImageFileName: str
+
+        :return: the resampling matrix
+        :rtype: VMCReprojection
+        
+        **Description:**
+        Each pixel on the disk (valid latitude and longitude, same condition as :py:meth:`~.VMCPhotometry`) is assigned to the grid cell that contains its 
+        latitude and longitude, with weight 1; pixels outside the grid are left out. :py:meth:`~.VMCReprojection.apply` then averages the valid pixels in each cell.
+        
+        With a  cacheDirectory , the matrix is stored in a compressed .npz file and read from that file the next time the same geocube is put on the same grid. 
+        The file is named after the SHA-1 hash of the grid and, as for :py:meth:`~.getVMCPhotometryCacheKey`, the name, size and modification time of the .GEO 
+        file of  VMCImageFileName , so that the .GEO file does not have to be hashed. Without a  VMCImageFileName  the full latitude and longitude planes are 
+        hashed instead: two geocubes that differ in a single pixel have different matrices, so any sample of the planes could return the wrong matrix.
+        '''
+        
+        latitudes = np.asarray ( VMCGeoArraysFlattened [3], dtype = np.float64 ).reshape (-1)
+        longitudes = np.asarray ( VMCGeoArraysFlattened [4], dtype = np.float64 ).reshape (-1)
+        
+        cacheFileName = ''
+        if cacheDirectory:
+        
+            keyHash = hashlib.sha1 ( 'v{} {} {} {}'.format ( VMCPhotometryCacheVersion, float (gridStep), [ float (limit)  for limit in latitudeLimits ], 
+                                                            [ float (limit)  for limit in longitudeLimits ] ).encode () )
+            
+            if VMCImageFileName:
+            
+                VMCGeoCubeFileName = ( VMCImageFileName [:-4]  if '.IMG' in VMCImageFileName or '.GEO' in VMCImageFileName  else VMCImageFileName ) + '.GEO'
+                fileStatus = os.stat (VMCGeoCubeFileName)
+                keyHash.update ( '{} {} {}'.format ( os.path.abspath (VMCGeoCubeFileName), fileStatus.st_size, fileStatus.st_mtime_ns ).encode () )
+                
+            else:
+            
+                keyHash.update ( '{}'.format ( len (latitudes) ).encode () )
+                keyHash.update ( np.ascontiguousarray (latitudes) )
+                keyHash.update ( np.ascontiguousarray (longitudes) )
+            
+            cacheFileName = os.path.join ( cacheDirectory, 'reprojection_' + keyHash.hexdigest () + '.npz' )
+            
+            if os.path.isfile (cacheFileName):
+            
+                with np.load (cacheFileName) as cacheContent:
+                
+                    return VMCReprojection ( cacheContent ['iPixels'], cacheContent ['iCells'], cacheContent ['weights'], gridStep, latitudeLimits, longitudeLimits )
+                    
+        
+        # Same longitude convention (0˚ - 360˚) and on-disk condition as  readVMCImageAndGeoCube  and  VMCPhotometry , without changing the input.
+        longitudes = np.where ( np.logical_and (longitudes >= -180, longitudes < 0), longitudes + 360, longitudes )
+        
+        gridShape = VMCReprojection.getGridShape (gridStep, latitudeLimits, longitudeLimits)
+        
+        with np.errstate (invalid = 'ignore'):
+        
+            iLatitudes = np.floor ( ( latitudes - float (latitudeLimits [0]) ) / float (gridStep) )
+            iLongitudes = np.floor ( ( longitudes - float (longitudeLimits [0]) ) / float (gridStep) )
+            
+            iPixels = np.where ( ( np.abs (latitudes) <= 90 ) & ( np.abs (longitudes) <= 360 ) & 
+                                 ( iLatitudes >= 0 ) & ( iLatitudes < gridShape [0] ) & 
+                                 ( iLongitudes >= 0 ) & ( iLongitudes < gridShape [1] ) ) [0]
+                                 
+        reprojection = VMCReprojection ( iPixels.astype (np.int32), 
+                                         ( iLatitudes [iPixels] * gridShape [1] + iLongitudes [iPixels] ).astype (np.int32), 
+                                         np.ones ( len (iPixels), dtype = np.float32 ), 
+                                         gridStep, latitudeLimits, longitudeLimits )
+        
+        if cacheFileName:
+        
+            # Write to a temporary file first, so that other processes never read a half-written entry.
+            os.makedirs (cacheDirectory, exist_ok = True)
+            temporaryFileName = cacheFileName + '.{}.tmp'.format ( os.getpid () )
+            with open (temporaryFileName, 'wb') as fileOpen:
+            
+                np.savez_compressed (fileOpen, iPixels = reprojection.iPixels, iCells = reprojection.iCells, weights = reprojection.weights)
+                
+            os.replace (temporaryFileName, cacheFileName)
+            
+            
+        return reprojection
+
+
+
+    # Mosaic of many calibrated VMC images on a regular latitude-longitude grid.
+    @staticmethod
+    def createVMCMosaic ( VMCImageFileNames, 
+                          gridStep = 1., 
+                          latitudeLimits = (-90., 90.), 
+                          longitudeLimits = (0., 360.), 
+                          cacheDirectory = '', 
+                          VMCMosaicToUpdate = None, 
+                          incidenceAngleLimit = 89,
+                          emissionAngleLimit = 89,
+                          applyLambertLaw = True,
+                          silent = True ):
+        '''
+        :param VMCImageFileNames: top directory of a tree with VMC .IMG and .GEO files, or a list of VMC image file names (and paths).
+        :type VMCImageFileNames: str or list [str]
+
+        :param gridStep: size (˚) of the grid cells in latitude and longitude, default = 1˚.
+        :type gridStep: float
+
+        :param latitudeLimits: minimum and maximum latitude (˚) of the grid, default = (-90, 90).
+        :type latitudeLimits: list [float, float]
+
+        :param longitudeLimits: minimum and maximum longitude (˚) of the grid, default = (0, 360).
+        :type longitudeLimits: list [float, float]
+
+        :param cacheDirectory: directory for the cache of resampling matrices, default = '' (no cache), see :py:meth:`~.getVMCReprojection`.
+        :type cacheDirectory: str
+
+        :param VMCMosaicToUpdate: existing mosaic (on the same grid) to add the images to, default = None (a new mosaic is created).
+        :type VMCMosaicToUpdate: VMCMosaic
+
+        :return: the mosaic
+        :rtype: VMCMosaic
+        
+        **Description:**
+        Calibrate the images with :py:meth:`~.processVMCImages` (with the angle limits and Lambert law flag given) and stream them into a :py:class:`~.VMCMosaic`, 
+        resampled with :py:meth:`~.getVMCReprojection`. Only one image at a time (plus the images read ahead) is in memory.
+        '''
+        
+        VMCMosaicUpdated = VMCMosaic (gridStep, latitudeLimits, longitudeLimits)  if VMCMosaicToUpdate is None  else VMCMosaicToUpdate
+        
+        for VMCImageFileName, VMCImage, VMCGeoCube, VMCPhotometryResults in VMCTools.processVMCImages ( VMCImageFileNames, incidenceAngleLimit = incidenceAngleLimit, 
+                                                                                                        emissionAngleLimit = emissionAngleLimit, 
+                                                                                                        applyLambertLaw = applyLambertLaw, silent = silent ):
+        
+            reprojection = VMCTools.getVMCReprojection ( list ( np.reshape ( VMCGeoCube.data, (5, -1) ) ), gridStep, latitudeLimits, longitudeLimits, cacheDirectory, 
+                                                         VMCImageFileName )
+            VMCMosaicUpdated.add ( VMCPhotometryResults [1], reprojection )
+            
+            
+        return VMCMosaicUpdated
+
+
+
+    # Local solar time of each pixel of a VMC image.
+    @staticmethod
+    def getVMCLocalSolarTimes (VMCImage, VMCGeoArraysFlattened):
+        '''
+        :param VMCImage: PDS3Image (or PDS3MemoryMappedImage) object of the VMC .IMG file.
+        :type VMCImage: planetaryimage.pds3image.PDS3Image
+
+        :param VMCGeoArraysFlattened: the five flattened geocube planes, see :py:meth:`~.readVMCImageAndGeoCube`.
+        :type VMCGeoArraysFlattened: list [NumPy array x 5]
+
+        :return: local solar time (h, 0h - 24h) of each pixel, or None when the label has no SUB_SOLAR_LONGITUDE.
+        :rtype: 1D NumPy array
+        
+        **Description:**
+        With the (east) longitude :math:`\\lambda` of the pixel and the sub-solar longitude :math:`\\lambda_{Sun}` from the image label, and 
+        because of the retrograde rotation of Venus:
+        
+            :math:`LST = 12 + (\\lambda_{Sun} - \\lambda) / 15`  (modulo 24h)
+            
+        The values for pixels off the disk are meaningless, select the valid pixels first.
+        '''
+        
+        if 'SUB_SOLAR_LONGITUDE' not in VMCImage.label:
+        
+            return None
+            
+        subSolarLongitude = VMCImage.label ['SUB_SOLAR_LONGITUDE']
+        subSolarLongitude = float ( getattr (subSolarLongitude, 'value', subSolarLongitude) )
+        
+        return np.mod ( 12 + ( subSolarLongitude - np.asarray ( VMCGeoArraysFlattened [4], dtype = np.float64 ) ) / 15, 24 )
+
+
+
+    # Fill a climatology accumulator with a list of VMC images.
+    @staticmethod
+    def getVMCClimatologyOfImages ( VMCImageFileNames, 
+                                    latitudeStep = 5., 
+                                    localSolarTimeStep = 0.5, 
+                                    incidenceAngleLimit = 89, 
+                                    emissionAngleLimit = 89, 
+                                    applyLambertLaw = True ):
+        '''
+        :param VMCImageFileNames: list of VMC image file names (and paths).
+        :type VMCImageFileNames: list [str]
+
+        :return: the accumulator with the images that could be read, calibrated and placed in a mission section.
+        :rtype: VMCClimatology
+        
+        **Description:**
+        Worker of :py:meth:`~.createVMCClimatology`. Each image is read with :py:meth:`~.readVMCImageAndGeoCubeMemoryMapped` and calibrated with 
+        :py:meth:`~.VMCPhotometry`, and its valid pixels are added to a new :py:class:`~.VMCClimatology`. Images that fail are skipped with a warning.
+        '''
+        
+        climatology = VMCClimatology (latitudeStep, localSolarTimeStep)
+        
+        for VMCImageFileName in VMCImageFileNames:
+        
+            try:
+            
+                VMCImage, VMCImageFlattened, VMCGeoCube, VMCGeoArraysFlattened = VMCTools.readVMCImageAndGeoCubeMemoryMapped (VMCImageFileName)
+                VMCImageCalibratedFlattened = VMCTools.VMCPhotometry ( VMCImage, VMCImageFlattened, VMCGeoCube, VMCGeoArraysFlattened, 
+                                                                       incidenceAngleLimit = incidenceAngleLimit, emissionAngleLimit = emissionAngleLimit, 
+                                                                       applyLambertLaw = applyLambertLaw, silent = True ) [1]
+                
+            except (OSError, KeyError, ValueError) as readError:
+            
+                print ()
+                print ( ' WARNING: could not read {}: {}'.format (VMCImageFileName, readError) )
+                
+                continue
+                
+                
+            localSolarTimes = VMCTools.getVMCLocalSolarTimes (VMCImage, VMCGeoArraysFlattened)
+            iMissionSection = VMCTools.getVEXMissionSection ( VMCImage.label ['ORBIT_NUMBER'] )
+            if localSolarTimes is None or iMissionSection < 0:
+            
+                print ()
+                print ( ' WARNING: no sub-solar longitude or mission section for {}, image skipped.'.format (VMCImageFileName) )
+                
+                continue
+                
+            
+            # Only the calibrated pixels (invalid pixels have the value -1).
+            iValid = np.where ( VMCImageCalibratedFlattened >= 0 ) [0]
+            climatology.add ( VMCImageCalibratedFlattened [iValid], VMCGeoArraysFlattened [3][iValid], localSolarTimes [iValid], iMissionSection, 
+                              imageID = os.path.basename (VMCImageFileName).split ('.')[0] )
+            
+            
+        return climatology
+
+
+
+    # Reduce a whole archive of VMC images to a latitude - local solar time - mission section climatology, in parallel and with checkpoints.
+    @staticmethod
+    def createVMCClimatology ( VMCImageFileNames, 
+                               climatologyFileName = '', 
+                               latitudeStep = 5., 
+                               localSolarTimeStep = 0.5, 
+                               numberOfProcesses = 4, 
+                               imagesPerTask = 50, 
+                               incidenceAngleLimit = 89, 
+                               emissionAngleLimit = 89, 
+                               applyLambertLaw = True ):
+        '''
+        :param VMCImageFileNames: top directory of a tree with VMC .IMG and .GEO files, or a list of VMC image file names (and paths).
+        :type VMCImageFileNames: str or list [str]
+
+        :param climatologyFileName: checkpoint file (.npz), default = '' (no checkpoint). When it exists, the climatology is read from it and only new images are added.
+        :type climatologyFileName: str
+
+        :param latitudeStep: width (˚) of the latitude bins, default = 5˚. Ignored when the climatology is read from  climatologyFileName .
+        :type latitudeStep: float
+
+        :param localSolarTimeStep: width (h) of the local solar time bins, default = 0.5h. Ignored when the climatology is read from  climatologyFileName .
+        :type localSolarTimeStep: float
+
+        :param numberOfProcesses: number of worker processes, default = 4. With 1 all images are handled in the current process.
+        :type numberOfProcesses: int
+
+        :param imagesPerTask: number of images handed to a worker at a time, default = 50. The checkpoint is written after each task.
+        :type imagesPerTask: int
+
+        :return: the climatology
+        :rtype: VMCClimatology
+        
+        **Description:**
+        The images not yet in the climatology are split in tasks of  imagesPerTask  images, each reduced to its own :py:class:`~.VMCClimatology` by 
+        :py:meth:`~.getVMCClimatologyOfImages` in a worker process. The results are merged as they come in and the checkpoint is written after each one, 
+        so an interrupted run continues where it stopped, and a run on an extended archive only processes the new images.
+        '''
+        
+        if type (VMCImageFileNames) == str:
+        
+            VMCImageFileNames = HandyTools.getFilesInDirectoryTree (VMCImageFileNames, extension = 'IMG')
+            
+        if climatologyFileName and os.path.isfile (climatologyFileName):
+        
+            climatology = VMCClimatology.read (climatologyFileName)
+            
+        else:
+        
+            climatology = VMCClimatology (latitudeStep, localSolarTimeStep)
+            
+            
+        newVMCImageFileNames = sorted ( VMCImageFileName  for VMCImageFileName in VMCImageFileNames  
+                                                          if os.path.basename (VMCImageFileName).split ('.')[0] not in climatology.imageIDs )
+        
+        taskFileNames = [ newVMCImageFileNames [iStart : iStart + imagesPerTask]  for iStart in range ( 0, len (newVMCImageFileNames), max (1, imagesPerTask) ) ]
+        taskArguments = [ taskFileNames ] + [ [argument] * len (taskFileNames)  for argument in [ climatology.latitudeStep, climatology.localSolarTimeStep, 
+                                                                                                    incidenceAngleLimit, emissionAngleLimit, applyLambertLaw ] ]
+        
+        if numberOfProcesses > 1 and len (taskFileNames) > 1:
+        
+            with concurrent.futures.ProcessPoolExecutor ( max_workers = numberOfProcesses ) as workerPool:
+            
+                taskFutures = [ workerPool.submit (VMCTools.getVMCClimatologyOfImages, *arguments)  for arguments in zip (*taskArguments) ]
+                
+                for taskFuture in concurrent.futures.as_completed (taskFutures):
+                
+                    climatology.merge ( taskFuture.result () )
+                    
+                    if climatologyFileName:
+                    
+                        climatology.write (climatologyFileName)
+                        
+        else:
+        
+            for taskClimatology in map (VMCTools.getVMCClimatologyOfImages, *taskArguments):
+            
+                climatology.merge (taskClimatology)
+                
+                if climatologyFileName:
+                
+                    climatology.write (climatologyFileName)
+                    
+                    
+        return climatology
+
+
+
+    # Displacements between two images on the same latitude-longitude grid, from FFT cross-correlation of templates.
+    @staticmethod
+    def getCloudTrackingDisplacements (VMCGrid1, VMCGrid2, templateSize = 16, templateStep = 8, minimumValidFraction = 0.8, numberOfPasses = 2):
+        '''
+        :param VMCGrid1: first image on a regular latitude-longitude grid (latitude first), NaN where there is no data, see :py:meth:`~.VMCReprojection.apply`.
+        :type VMCGrid1: 2D NumPy array
+
+        :param VMCGrid2: second (later) image on the same grid.
+        :type VMCGrid2: 2D NumPy array
+
+        :param templateSize: size (grid cells) of the square templates, default = 16.
+        :type templateSize: int
+
+        :param templateStep: distance (grid cells) between the templates, default = 8 (templates overlap by half).
+        :type templateStep: int
+
+        :param minimumValidFraction: minimum fraction of cells with data in a template in both images, default = 0.8. Other templates get NaN.
+        :type minimumValidFraction: float
+
+        :param numberOfPasses: number of passes, default = 2. After the first pass the templates in the second image are moved by the rounded displacement.
+        :type numberOfPasses: int
+
+        :return: template centre rows, template centre columns, row (latitude) displacements, column (longitude) displacements, peak correlations
+        :rtype: 1D NumPy array, 1D NumPy array, 2D NumPy array x 3 (number of template rows, number of template columns)
+        
+        **Description:**
+        The first image is cut in square templates of  templateSize  cells, every  templateStep  cells, and the second image in templates of the same size 
+        at the same positions. In each template the average is subtracted and cells without data are set to zero; the templates of the first image are also multiplied by a Hann window. 
+        The cross-correlations of all templates are then calculated in one batched ( np.fft.rfft2 ) operation, normalised to a correlation coefficient, and the 
+        integer position of the peak is refined to sub-cell precision with a parabola through the peak and its two neighbours, along each axis.
+        
+        Cloud features that move out of a template bias the displacement towards zero. In each next pass the templates of the second image are therefore moved 
+        by the rounded displacement of the previous pass, so that they contain the same features, and only the remaining displacement is measured. 
+        Templates that are moved onto too many cells without data keep the displacement of the previous pass.
+        
+        The displacement is that of the second image with respect to the first, in grid cells; per pass it must be smaller than half the template size. 
+        The centres are the (fractional) row and column indices in the grid of the centre of the templates of the first image.
+        '''
+        
+        VMCGrid1 = np.asarray (VMCGrid1, dtype = np.float64)
+        VMCGrid2 = np.asarray (VMCGrid2, dtype = np.float64)
+        
+        templates1 = np.lib.stride_tricks.sliding_window_view ( VMCGrid1, (templateSize, templateSize) ) [::templateStep, ::templateStep]
+        templateGridShape = templates1.shape [:2]
+        templates1 = templates1.reshape (-1, templateSize, templateSize)
+        
+        # All the templates of the second image, at every position, from which the (moved) templates are picked in each pass.
+        allTemplates2 = np.lib.stride_tricks.sliding_window_view ( VMCGrid2, (templateSize, templateSize) )
+        iTemplateRows, iTemplateColumns = [ iStart.reshape (-1)  for iStart in np.meshgrid ( np.arange (templateGridShape [0]) * templateStep, 
+                                                                                              np.arange (templateGridShape [1]) * templateStep, indexing = 'ij' ) ]
+        
+        hannWindow = np.outer ( np.hanning (templateSize), np.hanning (templateSize) )
+        
+        rowOffsets = np.zeros ( len (templates1), dtype = int )
+        columnOffsets = np.zeros ( len (templates1), dtype = int )
+        
+        # Each pass only overwrites the templates that are valid in that pass; the others keep the result of the previous pass.
+        rowDisplacements = np.full ( len (templates1), np.nan )
+        columnDisplacements = np.full ( len (templates1), np.nan )
+        peakCorrelations = np.full ( len (templates1), np.nan )
+        
+        for iPass in range ( max (1, numberOfPasses) ):
+        
+            # Templates that would be moved beyond the border of the grid stop at the border.
+            rowOffsets = np.clip ( iTemplateRows + rowOffsets, 0, allTemplates2.shape [0] - 1 ) - iTemplateRows
+            columnOffsets = np.clip ( iTemplateColumns + columnOffsets, 0, allTemplates2.shape [1] - 1 ) - iTemplateColumns
+            templates2 = allTemplates2 [ iTemplateRows + rowOffsets, iTemplateColumns + columnOffsets ]
+                                         
+            validCells = np.isfinite (templates1) & np.isfinite (templates2)
+            iTemplates = np.where ( validCells.mean ( axis = (1, 2) ) >= minimumValidFraction ) [0]
+            
+            if not len (iTemplates):
+            
+                break
+                
+                
+            # Average removed and no-data cells zero. Only the templates of the first image are apodised: windowing both biases the peak towards zero.
+            normalisedTemplates = []
+            for templates, templateWindow in [ ( templates1 [iTemplates], hannWindow ), ( templates2 [iTemplates], 1. ) ]:
+            
+                templates = np.where ( validCells [iTemplates], templates, 0. )
+                templates -= ( templates.sum ( axis = (1, 2) ) / validCells [iTemplates].sum ( axis = (1, 2) ) ) [:, np.newaxis, np.newaxis]
+                templates *= validCells [iTemplates] * templateWindow
+                
+                normalisedTemplates.append (templates)
+                
+                
+            with np.errstate (invalid = 'ignore', divide = 'ignore'):
+            
+                crossCorrelations = np.fft.irfft2 ( np.conj ( np.fft.rfft2 ( normalisedTemplates [0] ) ) * np.fft.rfft2 ( normalisedTemplates [1] ), s = (templateSize, templateSize) )
+                crossCorrelations /= np.sqrt ( ( normalisedTemplates [0]**2 ).sum ( axis = (1, 2) ) * ( normalisedTemplates [1]**2 ).sum ( axis = (1, 2) ) ) [:, np.newaxis, np.newaxis]
+            
+            iPeaks = np.argmax ( crossCorrelations.reshape ( len (iTemplates), -1 ), axis = 1 )
+            iPeakRows, iPeakColumns = np.divmod (iPeaks, templateSize)
+            iBatch = np.arange ( len (iTemplates) )
+            
+            peakValues = crossCorrelations [iBatch, iPeakRows, iPeakColumns]
+            
+            # Parabola through the peak and its (periodic) neighbours along each axis.
+            subCellOffsets = []
+            for neighbourMinus, neighbourPlus in [ ( crossCorrelations [iBatch, (iPeakRows - 1) % templateSize, iPeakColumns], crossCorrelations [iBatch, (iPeakRows + 1) % templateSize, iPeakColumns] ),
+                                                   ( crossCorrelations [iBatch, iPeakRows, (iPeakColumns - 1) % templateSize], crossCorrelations [iBatch, iPeakRows, (iPeakColumns + 1) % templateSize] ) ]:
+            
+                curvature = neighbourMinus - 2 * peakValues + neighbourPlus
+                
+                with np.errstate (invalid = 'ignore', divide = 'ignore'):
+                
+                    subCellOffsets.append ( np.where ( curvature < 0, 0.5 * (neighbourMinus - neighbourPlus) / curvature, 0. ) )
+                    
+            
+            # Peaks beyond half the template size are negative shifts. The offset of the templates of the second image is added back.
+            rowDisplacements [iTemplates] = ( iPeakRows + templateSize // 2 ) % templateSize - templateSize // 2 + subCellOffsets [0] + rowOffsets [iTemplates]
+            columnDisplacements [iTemplates] = ( iPeakColumns + templateSize // 2 ) % templateSize - templateSize // 2 + subCellOffsets [1] + columnOffsets [iTemplates]
+            peakCorrelations [iTemplates] = peakValues
+            
+            rowOffsets [iTemplates] = np.rint ( rowDisplacements [iTemplates] ).astype (int)
+            columnOffsets [iTemplates] = np.rint ( columnDisplacements [iTemplates] ).astype (int)
+            
+            
+        templateCentreRows = np.arange ( templateGridShape [0] ) * templateStep + (templateSize - 1) / 2
+        templateCentreColumns = np.arange ( templateGridShape [1] ) * templateStep + (templateSize - 1) / 2
+        
+        return templateCentreRows, templateCentreColumns, \
+               rowDisplacements.reshape (templateGridShape), columnDisplacements.reshape (templateGridShape), peakCorrelations.reshape (templateGridShape)
+
+
+
+    # Cloud-tracked winds from a pair of VMC images of the same orbit.
+    @staticmethod
+    def getCloudTrackingWinds ( VMCImageFileName1, 
+                                VMCImageFileName2, 
+                                gridStep = 0.5, 
+                                latitudeLimits = (-90., 90.), 
+                                longitudeLimits = (0., 360.), 
+                                templateSize = 16, 
+                                templateStep = 8, 
+                                numberOfPasses = 2, 
+                                minimumCorrelation = 0.3, 
+                                cacheDirectory = '', 
+                                incidenceAngleLimit = 89, 
+                                emissionAngleLimit = 89, 
+                                applyLambertLaw = True ):
+        '''
+        :param VMCImageFileName1: file name (and path) of the first VMC image. It is assumed the .IMG and .GEO have the same file name.
+        :type VMCImageFileName1: str
+
+        :param VMCImageFileName2: file name (and path) of the second VMC image, taken later in the same orbit.
+        :type VMCImageFileName2: str
+
+        :param gridStep: size (˚) of the grid cells the images are reprojected on, default = 0.5˚.
+        :type gridStep: float
+
+        :param latitudeLimits: minimum and maximum latitude (˚) of the grid, default = (-90, 90).
+        :type latitudeLimits: list [float, float]
+
+        :param longitudeLimits: minimum and maximum longitude (˚) of the grid, default = (0, 360).
+        :type longitudeLimits: list [float, float]
+
+        :param templateSize: size (grid cells) of the templates, default = 16, see :py:meth:`~.getCloudTrackingDisplacements`.
+        :type templateSize: int
+
+        :param templateStep: distance (grid cells) between the templates, default = 8.
+        :type templateStep: int
+
+        :param numberOfPasses: number of passes of the template matching, default = 2.
+        :type numberOfPasses: int
+
+        :param minimumCorrelation: vectors with a lower peak correlation are set to NaN, default = 0.3.
+        :type minimumCorrelation: float
+
+        :param cacheDirectory: directory for the cache of resampling matrices, default = '' (no cache), see :py:meth:`~.getVMCReprojection`.
+        :type cacheDirectory: str
+
+        :return: latitudes, longitudes (˚) of the template centres, zonal winds, meridional winds (m/s), peak correlations
+        :rtype: 1D NumPy array, 1D NumPy array, 2D NumPy array x 3 (number of latitudes, number of longitudes)
+        
+        **Description:**
+        Both images are calibrated with :py:meth:`~.VMCPhotometry` (with the angle limits and Lambert law flag given), reprojected with :py:meth:`~.getVMCReprojection`, 
+        and the displacements of :py:meth:`~.getCloudTrackingDisplacements` are divided by the time between the images (START_TIME in the labels). 
+        As in :py:meth:`~.getWindAdvectedBox`, the winds are at 70km altitude (radius of Venus taken to be 6052km); the zonal wind is positive to the east 
+        (increasing longitude) and the meridional wind positive to the north. The position of a vector is the centre of its template in the first image.
+        '''
+        
+        VMCGrids = []
+        for VMCImageFileName in [VMCImageFileName1, VMCImageFileName2]:
+        
+            VMCImage, VMCImageFlattened, VMCGeoCube, VMCGeoArraysFlattened = VMCTools.readVMCImageAndGeoCubeMemoryMapped (VMCImageFileName)
+            VMCImageCalibratedFlattened = VMCTools.VMCPhotometry ( VMCImage, VMCImageFlattened, VMCGeoCube, VMCGeoArraysFlattened, 
+                                                                   incidenceAngleLimit = incidenceAngleLimit, emissionAngleLimit = emissionAngleLimit, 
+                                                                   applyLambertLaw = applyLambertLaw, silent = True ) [1]
+            
+            reprojection = VMCTools.getVMCReprojection (VMCGeoArraysFlattened, gridStep, latitudeLimits, longitudeLimits, cacheDirectory, VMCImageFileName)
+            VMCGrids.append ( reprojection.apply (VMCImageCalibratedFlattened) )
+            
+        
+        templateCentreRows, templateCentreColumns, rowDisplacements, columnDisplacements, peakCorrelations = \
+            VMCTools.getCloudTrackingDisplacements ( VMCGrids [0], VMCGrids [1], templateSize, templateStep, numberOfPasses = numberOfPasses )
+        
+        latitudes = reprojection.latitudeLimits [0] + (templateCentreRows + 0.5) * reprojection.gridStep
+        longitudes = reprojection.longitudeLimits [0] + (templateCentreColumns + 0.5) * reprojection.gridStep
+        
+        VMCImageTimes = VMCTools.getVMCImageTimes ( [VMCImageFileName1, VMCImageFileName2] )
+        timeDifferenceSeconds = ( VMCImageTimes [1] - VMCImageTimes [0] ) / np.timedelta64 (1, 's')
+        
+        # Conversion factor for metres to degrees latitude at 70km altitude, as in  VMCWindModel .
+        degreesLatitudePerMetre = 180 / ( np.pi * (6052 + 70) * 1000 )
+        
+        with np.errstate (invalid = 'ignore', divide = 'ignore'):
+        
+            meridionalWinds = rowDisplacements * reprojection.gridStep / degreesLatitudePerMetre / timeDifferenceSeconds
+            zonalWinds = columnDisplacements * reprojection.gridStep * np.cos ( np.pi * latitudes [:, np.newaxis] / 180 ) / degreesLatitudePerMetre / timeDifferenceSeconds
+            
+            iLowCorrelation = ~ ( peakCorrelations >= minimumCorrelation )
+            
+        zonalWinds [iLowCorrelation] = np.nan
+        meridionalWinds [iLowCorrelation] = np.nan
+        
+        return latitudes, longitudes, zonalWinds, meridionalWinds, peakCorrelations
+
+
+
+    # Cloud-tracked winds for all pairs of VMC images of the same orbits, in parallel.
+    @staticmethod
+    def getCloudTrackingWindsOfOrbits ( VMCImageFileNames, 
+                                        minimumTimeDifferenceHours = 0.5, 
+                                        maximumTimeDifferenceHours = 3., 
+                                        numberOfProcesses = 4, 
+                                        **cloudTrackingParameters ):
+        '''
+        :param VMCImageFileNames: top directory of a tree with VMC .IMG and .GEO files, or a list of VMC image file names (and paths).
+        :type VMCImageFileNames: str or list [str]
+
+        :param minimumTimeDifferenceHours: minimum time (h) between the two images of a pair, default = 0.5h.
+        :type minimumTimeDifferenceHours: float
+
+        :param maximumTimeDifferenceHours: maximum time (h) between the two images of a pair, default = 3h.
+        :type maximumTimeDifferenceHours: float
+
+        :param numberOfProcesses: number of worker processes, default = 4. With 1 all pairs are handled in the current process.
+        :type numberOfProcesses: int
+
+        :param cloudTrackingParameters: other parameters of :py:meth:`~.getCloudTrackingWinds`, for example  gridStep  or  cacheDirectory .
+        :type cloudTrackingParameters: keyword arguments
+
+        :return: image pairs (file names), cloud-tracked winds of each pair as returned by :py:meth:`~.getCloudTrackingWinds` (None when it failed)
+        :rtype: list [ (str, str) ], list [tuple]
+        
+        **Description:**
+        The images are grouped by orbit (the first part of the file name, for example V2811) and sorted on time. Each image is paired with the first later 
+        image of the same orbit taken between  minimumTimeDifferenceHours  and  maximumTimeDifferenceHours  after it. The pairs are distributed over  
+        numberOfProcesses  worker processes.
+        '''
+        
+        if type (VMCImageFileNames) == str:
+        
+            VMCImageFileNames = HandyTools.getFilesInDirectoryTree (VMCImageFileNames, extension = 'IMG')
+            
+        VMCImageFileNames = list (VMCImageFileNames)
+        VMCImageTimes = VMCTools.getVMCImageTimes (VMCImageFileNames)
+        orbitIDs = [ os.path.basename (VMCImageFileName).split ('_')[0]  for VMCImageFileName in VMCImageFileNames ]
+        
+        # Sorted on orbit, then on time.
+        iSorted = sorted ( range ( len (VMCImageFileNames) ), key = lambda iImage: ( orbitIDs [iImage], VMCImageTimes [iImage] ) )
+        
+        VMCImagePairs = []
+        for iPosition, iImage in enumerate (iSorted):
+        
+            for iLaterImage in iSorted [iPosition + 1:]:
+            
+                if orbitIDs [iLaterImage] != orbitIDs [iImage]:
+                
+                    break
+                    
+                timeDifferenceHours = ( VMCImageTimes [iLaterImage] - VMCImageTimes [iImage] ) / np.timedelta64 (1, 'h')
+                if minimumTimeDifferenceHours <= timeDifferenceHours <= maximumTimeDifferenceHours:
+                
+                    VMCImagePairs.append ( ( VMCImageFileNames [iImage], VMCImageFileNames [iLaterImage] ) )
+                    
+                    break
+                    
+        
+        cloudTrackingWinds = [None] * len (VMCImagePairs)
+        if numberOfProcesses > 1 and len (VMCImagePairs) > 1:
+        
+            with concurrent.futures.ProcessPoolExecutor ( max_workers = numberOfProcesses ) as workerPool:
+            
+                pairFutures = { workerPool.submit ( VMCTools.getCloudTrackingWinds, *VMCImagePair, **cloudTrackingParameters ): iPair  for iPair, VMCImagePair in enumerate (VMCImagePairs) }
+                
+                for pairFuture in concurrent.futures.as_completed (pairFutures):
+                
+                    try:
+                    
+                        cloudTrackingWinds [ pairFutures [pairFuture] ] = pairFuture.result ()
+                        
+                    except (OSError, KeyError, ValueError) as pairError:
+                    
+                        print ()
+                        print ( ' WARNING: no winds for {}: {}'.format ( VMCImagePairs [ pairFutures [pairFuture] ], pairError ) )
+                        
+        else:
+        
+            for iPair, VMCImagePair in enumerate (VMCImagePairs):
+            
+                try:
+                
+                    cloudTrackingWinds [iPair] = VMCTools.getCloudTrackingWinds ( *VMCImagePair, **cloudTrackingParameters )
+                    
+                except (OSError, KeyError, ValueError) as pairError:
+                
+                    print ()
+                    print ( ' WARNING: no winds for {}: {}'.format (VMCImagePair, pairError) )
+                    
+                    
+        return VMCImagePairs, cloudTrackingWinds
+
+
+
+    # 
+    @staticmethod
+    def getWindAdvectedBox (latitudeVeRaSounding, longitudeVeRaSounding, timeDifferenceHours, oneSigmaZonalWind = None, oneSigmaMeridionalWind = None, windModel = None):
+        '''
+        :param latitudeVeRaSounding: latitude (˚) of the VeRa sounding location.
+        :type latitudeVeRaSounding: float
+
+        :param longitudeVeRaSounding: longitude (˚) of the VeRa sounding location.
+        :type longitudeVeRaSounding: float
+
+        :param timeDifferenceHours: difference in hours between the VeRa sounding and the VMC image acquisition.
+        :type timeDifferenceHours: float        
+
+        :param oneSigmaZonalWind: the standard deviation for the zonal wind. Default is None, the value of the wind model (20m/s from Khatunstev et al. (2013) Figure 10a).
+        :type oneSigmaZonalWind: float        
+
+        :param oneSigmaMeridionalWind: the standard deviation for the meridional wind. Default is None, the value of the wind model (12m/s from Khatunstev et al. (2013) Figure 10b).
+        :type oneSigmaMeridionalWind: float        
+
+        :param windModel: the wind profiles, default = None (KhatuntsevWindModel).
+        :type windModel: VMCWindModel
+
+
+        :return: latitudeCentre, latitudeLimits, longitudeCentre, longitudeLimits.
+        :rtype: float, list [float, float], float, list [ [float, float], [float, float] ]
+        
+        **Description**:   
+        Given the latitude and longitude of the VeRa sounding, as well as the time difference between the VeRa sounding and the VMC image, determine the
+        latitude-longitude box where the atmosphere of the VeRa sounding was positioned at the time of the VMC image recording.
+        
+        The default wind model is the parametrisation of `Khatuntsev et al. (2013) <http://dx.doi.org/10.1016/j.icarus.2013.05.018s>`_ figures 10a (zonal) and 10b (meridional).
+        The uncertainties (standard deviation) `oneSigmaZonalWind` and `oneSigmaMeridionalWind` are estimated based on the grey areas in those figures.
+        Another :py:class:`~.VMCWindModel` can be passed with  windModel . 
+        '''
+                        
+
+        if windModel is None:
+        
+            windModel = KhatuntsevWindModel
+            
+        # Displacement rates (˚/s) of the wind model at the latitude of the sounding; the zonal rates are converted from the equator to that latitude.
+        zonalRate, meridionalRate, oneSigmaZonalRate, oneSigmaMeridionalRate = [ float (rate)  for rate in windModel.getDisplacementRates (latitudeVeRaSounding) ]
+        zonalRate /= np.cos ( np.pi * latitudeVeRaSounding / 180 )
+        oneSigmaZonalRate = ( oneSigmaZonalRate  if oneSigmaZonalWind is None  else oneSigmaZonalWind * windModel.degreesLatitudePerMetre ) / np.cos ( np.pi * latitudeVeRaSounding / 180 )
+        oneSigmaMeridionalRate = oneSigmaMeridionalRate  if oneSigmaMeridionalWind is None  else oneSigmaMeridionalWind * windModel.degreesLatitudePerMetre
+        
+        timeDifferenceSeconds = timeDifferenceHours * 3600
+            
+        longitudeCentre = longitudeVeRaSounding + zonalRate * timeDifferenceSeconds
+        
+        longitudeHalfRange = abs (oneSigmaZonalRate * timeDifferenceSeconds)
+        longitudeBorderMaximum = longitudeCentre + longitudeHalfRange
+        longitudeBorderMinimum = longitudeCentre - longitudeHalfRange
+
+
+
+        longitudeLimits = [ [longitudeBorderMinimum, longitudeBorderMaximum], [longitudeBorderMinimum, longitudeBorderMaximum] ]
+        # All values are negative, the box lies entirely beyond the 0˚ meridian.
+        if longitudeBorderMaximum < 0:
+
+            longitudeBorderMaximum += 360
+            longitudeCentre += 360
+            longitudeBorderMinimum += 360
+                    
+            longitudeLimits = [ [longitudeBorderMinimum, longitudeBorderMaximum], [longitudeBorderMinimum, longitudeBorderMaximum] ]
+
+
+        # The centre and the minimum border are beyond the 0˚ meridian.            
+        if longitudeCentre < 0 and longitudeBorderMaximum > 0:
+        
+            longitudeCentre += 360
+            longitudeBorderMinimum += 360                             
+
+            longitudeLimits = [ [longitudeBorderMinimum, 360], [0, longitudeBorderMaximum] ]
+
+
+        # Only the minimum border is beyond the 0˚ meridian. 
+        if longitudeBorderMinimum < 0 and longitudeCentre > 0:
+        
+            longitudeBorderMinimum += 360                             
+
+            longitudeLimits = [ [longitudeBorderMinimum, 360], [0, longitudeBorderMaximum] ]
+
+
+
+        # All values are > 360˚, the box lies entirely beyond the 360˚ meridian.
+        if longitudeBorderMinimum > 360:
+
+            longitudeBorderMaximum -= 360
+            longitudeCentre -= 360
+            longitudeBorderMinimum -= 360
+
+            longitudeLimits = [ [longitudeBorderMinimum, longitudeBorderMaximum], [longitudeBorderMinimum, longitudeBorderMaximum] ]
+        
+
+        # The centre and the maximum border are beyond the 360˚ meridian.            
+        if longitudeCentre > 360 and longitudeBorderMinimum < 360:
+        
+            longitudeCentre -= 360
+            longitudeBorderMaximum -= 360                             
+
+            longitudeLimits = [ [longitudeBorderMinimum, 360], [0, longitudeBorderMaximum] ]
+
+
+        # Only the maximum border is beyond the 360˚ meridian.
+        if longitudeCentre < 360 and longitudeBorderMaximum > 360:
+        
+            longitudeBorderMaximum -= 360                             
+
+            longitudeLimits = [ [longitudeBorderMinimum, 360], [0, longitudeBorderMaximum] ]
+
+
+
+        latitudeCentre = latitudeVeRaSounding + meridionalRate * timeDifferenceSeconds
+
+        latitudeHalfRange = abs (oneSigmaMeridionalRate * timeDifferenceSeconds)
+
+        latitudeBorderMinimum = max (-90, latitudeCentre - latitudeHalfRange)
+        latitudeBorderMaximum = max (-90, latitudeCentre + latitudeHalfRange)
+        
+        latitudeLimits  = [latitudeBorderMinimum, latitudeBorderMaximum]
+
+        return latitudeCentre, latitudeLimits, longitudeCentre, longitudeLimits 
+
+
+
+    # Array version of  getWindAdvectedBox  for many soundings and time differences at once.
+    @staticmethod
+    def getWindAdvectedBoxes (latitudesVeRaSoundings, longitudesVeRaSoundings, timeDifferencesHours, oneSigmaZonalWind = None, oneSigmaMeridionalWind = None, windModel = None):
+        '''
+        :param latitudesVeRaSoundings: latitudes (˚) of the VeRa sounding locations.
+        :type latitudesVeRaSoundings: float or NumPy array
+
+        :param longitudesVeRaSoundings: longitudes (˚) of the VeRa sounding locations.
+        :type longitudesVeRaSoundings: float or NumPy array
+
+        :param timeDifferencesHours: differences in hours between the VeRa soundings and the VMC image acquisitions.
+        :type timeDifferencesHours: float or NumPy array
+
+        :param oneSigmaZonalWind: the standard deviation for the zonal wind. Default is None, the value of the wind model.
+        :type oneSigmaZonalWind: float or NumPy array
+
+        :param oneSigmaMeridionalWind: the standard deviation for the meridional wind. Default is None, the value of the wind model.
+        :type oneSigmaMeridionalWind: float or NumPy array
+
+        :param windModel: the wind profiles, default = None (KhatuntsevWindModel).
+        :type windModel: VMCWindModel
+
+        :return: latitudeCentres, latitudeLimits, longitudeCentres, longitudeLimits.
+        :rtype: NumPy array (...), NumPy array (..., 2), NumPy array (...), NumPy array (..., 2, 2)
+        
+        **Description**:
+        Same as :py:meth:`~.getWindAdvectedBox`, for many (sounding, time difference) pairs at once. The input arrays are broadcast against each other, so for 
+        example one sounding can be combined with an array of time differences, and the outputs have the broadcast shape (...) of the inputs (at least 1D). 
+        Element  i  of each output gives the same values as :py:meth:`~.getWindAdvectedBox` for element  i  of the inputs, with  longitudeLimits [i]  structured as  [ [minimum, maximum], [minimum, maximum] ]  
+        or  [ [minimum, 360], [0, maximum] ]  when the box crosses the 0˚ meridian.
+        
+        The displacement rates are looked up in the tables of the wind model for all latitudes at once (see :py:class:`~.VMCWindModel`), and the branches 
+        of the meridian wrapping are evaluated with masks over the whole arrays instead of per pair.
+        '''
+        
+        latitudesVeRaSoundings, longitudesVeRaSoundings, timeDifferencesHours = \
+            np.broadcast_arrays ( np.atleast_1d ( np.asarray (latitudesVeRaSoundings, dtype = float) ), 
+                                  np.atleast_1d ( np.asarray (longitudesVeRaSoundings, dtype = float) ), 
+                                  np.atleast_1d ( np.asarray (timeDifferencesHours, dtype = float) ) )
+        
+        if windModel is None:
+        
+            windModel = KhatuntsevWindModel
+            
+        # Displacement rates (˚/s) of the wind model at the latitudes of the soundings; the zonal rates are converted from the equator to those latitudes.
+        zonalRates, meridionalRates, oneSigmaZonalRates, oneSigmaMeridionalRates = windModel.getDisplacementRates (latitudesVeRaSoundings)
+        
+        if oneSigmaZonalWind is not None:
+        
+            oneSigmaZonalRates = np.asarray (oneSigmaZonalWind, dtype = float) * windModel.degreesLatitudePerMetre
+            
+        if oneSigmaMeridionalWind is not None:
+        
+            oneSigmaMeridionalRates = np.asarray (oneSigmaMeridionalWind, dtype = float) * windModel.degreesLatitudePerMetre
+            
+        cosineLatitudes = np.cos ( np.pi * latitudesVeRaSoundings / 180 )
+        timeDifferencesSeconds = timeDifferencesHours * 3600
+
+        longitudeCentres = longitudesVeRaSoundings + zonalRates / cosineLatitudes * timeDifferencesSeconds
+
+        longitudeHalfRanges = np.abs (oneSigmaZonalRates / cosineLatitudes * timeDifferencesSeconds)
+        longitudeBordersMaximum = longitudeCentres + longitudeHalfRanges
+        longitudeBordersMinimum = longitudeCentres - longitudeHalfRanges
+        
+        # The meridian wrapping is applied in the same order as in  getWindAdvectedBox . Each step either sets the limits to one range or splits them in two.
+        splitLongitudeLimits = np.zeros ( latitudesVeRaSoundings.shape, dtype = bool )
+
+        # All values are negative, the box lies entirely beyond the 0˚ meridian.
+        iWrap = longitudeBordersMaximum < 0
+        longitudeBordersMaximum [iWrap] += 360
+        longitudeCentres [iWrap] += 360
+        longitudeBordersMinimum [iWrap] += 360
+        splitLongitudeLimits [iWrap] = False
+
+        # The centre and the minimum border are beyond the 0˚ meridian.
+        iWrap = np.logical_and (longitudeCentres < 0, longitudeBordersMaximum > 0)
+        longitudeCentres [iWrap] += 360
+        longitudeBordersMinimum [iWrap] += 360
+        splitLongitudeLimits [iWrap] = True
+
+        # Only the minimum border is beyond the 0˚ meridian. 
+        iWrap = np.logical_and (longitudeBordersMinimum < 0, longitudeCentres > 0)
+        longitudeBordersMinimum [iWrap] += 360
+        splitLongitudeLimits [iWrap] = True
+
+        # All values are > 360˚, the box lies entirely beyond the 360˚ meridian.
+        iWrap = longitudeBordersMinimum > 360
+        longitudeBordersMaximum [iWrap] -= 360
+        longitudeCentres [iWrap] -= 360
+        longitudeBordersMinimum [iWrap] -= 360
+        splitLongitudeLimits [iWrap] = False
+
+        # The centre and the maximum border are beyond the 360˚ meridian.            
+        iWrap = np.logical_and (longitudeCentres > 360, longitudeBordersMinimum < 360)
+        longitudeCentres [iWrap] -= 360
+        longitudeBordersMaximum [iWrap] -= 360
+        splitLongitudeLimits [iWrap] = True
+
+        # Only the maximum border is beyond the 360˚ meridian.
+        iWrap = np.logical_and (longitudeCentres < 360, longitudeBordersMaximum > 360)
+        longitudeBordersMaximum [iWrap] -= 360
+        splitLongitudeLimits [iWrap] = True
+
+
+        longitudeLimits = np.empty ( latitudesVeRaSoundings.shape + (2, 2) )
+        longitudeLimits [..., 0, 0] = longitudeBordersMinimum
+        longitudeLimits [..., 0, 1] = np.where (splitLongitudeLimits, 360, longitudeBordersMaximum)
+        longitudeLimits [..., 1, 0] = np.where (splitLongitudeLimits, 0, longitudeBordersMinimum)
+        longitudeLimits [..., 1, 1] = longitudeBordersMaximum
+
+
+        latitudeCentres = latitudesVeRaSoundings + meridionalRates * timeDifferencesSeconds
+
+        latitudeHalfRanges = np.abs (oneSigmaMeridionalRates * timeDifferencesSeconds)
+
+        latitudeLimits = np.empty ( latitudesVeRaSoundings.shape + (2,) )
+        latitudeLimits [..., 0] = np.maximum (-90, latitudeCentres - latitudeHalfRanges)
+        latitudeLimits [..., 1] = np.maximum (-90, latitudeCentres + latitudeHalfRanges)
+
+        return latitudeCentres, latitudeLimits, longitudeCentres, longitudeLimits
+
+
+
+    # Read the acquisition times of VMC images from their PDS3 labels.
+    @staticmethod
+    def getVMCImageTimes (VMCImageFileNames):
+        '''
+        :param VMCImageFileNames: list of VMC image file names (and paths).
+        :type VMCImageFileNames: list [str]
+
+        :return: acquisition (start) time of each image.
+        :rtype: NumPy array of datetime64 [ms]
+        
+        **Description:**
+        Read the  START_TIME  from the PDS3 label of each .IMG file with :py:meth:`~.readPDS3Label`; the image data are not read.
+        '''
+        
+        VMCImageTimes = []
+        for VMCImageFileName in VMCImageFileNames:
+        
+            if '.IMG' not in VMCImageFileName:
+            
+                VMCImageFileName = VMCImageFileName.replace ('.GEO', '') + '.IMG'
+                
+            label, labelSize = VMCTools.readPDS3Label (VMCImageFileName)
+            VMCImageTimes.append ( str ( label ['START_TIME'] ).rstrip ('Z') )
+            
+            
+        return np.array (VMCImageTimes, dtype = 'datetime64[ms]')
+
+
+
+    # Statistics of the calibrated pixels of one VMC image inside a list of latitude-longitude boxes.
+    @staticmethod
+    def getBoxStatistics ( VMCImageFileName,
+                           latitudeLimits,
+                           longitudeLimits,
+                           incidenceAngleLimit = 89,
+                           emissionAngleLimit = 89,
+                           applyLambertLaw = True ):
+        '''
+        :param VMCImageFileName: file name (and path) of the VMC image file. It is assumed the .IMG and .GEO have the same file name.
+        :type VMCImageFileName: str
+
+        :param latitudeLimits: latitude limits of M boxes, as returned by :py:meth:`~.getWindAdvectedBoxes`.
+        :type latitudeLimits: NumPy array (M, 2)
+
+        :param longitudeLimits: longitude limits of M boxes, as returned by :py:meth:`~.getWindAdvectedBoxes`.
+        :type longitudeLimits: NumPy array (M, 2, 2)
+
+        :param incidenceAngleLimit: valid pixels must have incidence angle smaller or equal to  incidenceAngleLimit .
+        :type incidenceAngleLimit: float
+
+        :param emissionAngleLimit: valid pixels must have emission angle smaller or equal to  emissionAngleLimit .
+        :type emissionAngleLimit: float
+
+        :param applyLambertLaw: apply Lambert limbdarkening law only, default = True.
+        :type applyLambertLaw: bool
+
+        :return: for each box: number of valid pixels, average and standard deviation of the calibrated radiance factor, average incidence angle, average emission angle.
+        :rtype: NumPy array (M, 5)
+        
+        **Description:**
+        Read (:py:meth:`~.readVMCImageAndGeoCubeMemoryMapped`) and calibrate (:py:meth:`~.VMCPhotometry`) the image once, index the geocube once with 
+        :py:class:`~.VMCGeoCubeIndex`, and return the statistics of the valid calibrated pixels inside each box. Boxes without valid pixels have NaN statistics.
+        '''
+        
+        VMCImage, VMCImageFlattened, VMCGeoCube, VMCGeoArraysFlattened = VMCTools.readVMCImageAndGeoCubeMemoryMapped (VMCImageFileName)
+        VMCImageCalibratedFlattened = VMCTools.VMCPhotometry ( VMCImage, VMCImageFlattened, VMCGeoCube, VMCGeoArraysFlattened,
+                                                               incidenceAngleLimit = incidenceAngleLimit, emissionAngleLimit = emissionAngleLimit, 
+                                                               applyLambertLaw = applyLambertLaw, silent = True ) [1]
         
+        VMCGeoCubeIndexImage = VMCGeoCubeIndex (VMCGeoArraysFlattened)
+        
+        boxStatistics = np.full ( ( len (latitudeLimits), 5 ), np.nan )
+        for iBox in range ( len (latitudeLimits) ):
+        
+            iPixelsInBox = VMCGeoCubeIndexImage.getPixelsInBox ( latitudeLimits [iBox], longitudeLimits [iBox] )
+            
+            # Only the calibrated pixels (invalid pixels have the value -1).
+            iPixelsInBox = iPixelsInBox [ VMCImageCalibratedFlattened [iPixelsInBox] >= 0 ]
+            boxStatistics [iBox, 0] = len (iPixelsInBox)
+            
+            if len (iPixelsInBox):
+            
+                boxStatistics [iBox, 1] = VMCImageCalibratedFlattened [iPixelsInBox].mean ()
+                boxStatistics [iBox, 2] = VMCImageCalibratedFlattened [iPixelsInBox].std (ddof = 1)  if len (iPixelsInBox) > 1  else np.nan
+                boxStatistics [iBox, 3] = VMCGeoArraysFlattened [0][iPixelsInBox].mean ()
+                boxStatistics [iBox, 4] = VMCGeoArraysFlattened [1][iPixelsInBox].mean ()
+            
+            
+        return boxStatistics
 
-    # Read the content of a VeRa .TAB file and return a numpy array.
+
+
+    # Find all VMC images taken within a time window of each VeRa sounding and extract the calibrated pixels in the wind-advected box.
     @staticmethod
-    def VMCPhotometry ( VMCImage, 
-                        VMCImageFlattened,
-                        VMCGeoCube,
-                        VMCGeoArraysFlattened,
-                        incidenceAngleLimit = 89,
-                        emissionAngleLimit = 89,
-                        applyLambertLaw = True,
-                        silent = False ):
+    def collocateVeRaSoundingsAndVMCImages ( VeRaSoundingTimes,
+                                             VeRaSoundingLatitudes,
+                                             VeRaSoundingLongitudes,
+                                             VMCImageFileNames,
+                                             VMCImageTimes = None,
+                                             maximumTimeDifferenceHours = 24,
+                                             numberOfProcesses = 4,
+                                             incidenceAngleLimit = 89,
+                                             emissionAngleLimit = 89,
+                                             applyLambertLaw = True,
+                                             collocationFileName = '',
+                                             windModel = None,
+                                             silent = False ):
         '''
-        :param VMCImage: PDS3Image object (`planetaryimage module <https://planetaryimage.readthedocs.io/en/latest/index.html>`_) from reading a VMC .IMG file.
-        :type VMCImage: planetaryimage.pds3image.PDS3Image
+        :param VeRaSoundingTimes: times of the VeRa soundings.
+        :type VeRaSoundingTimes: NumPy array of datetime64, or list of ISO time strings
 
-        :param VMCImageFlattened: flattened 1D array of the calibrated radiance factors of the entire VMC image.
-        :type VMCImageFlattened: 1D NumPy array
+        :param VeRaSoundingLatitudes: latitudes (˚) of the VeRa soundings.
+        :type VeRaSoundingLatitudes: list or NumPy array
 
-        :param VMCGeoCube: PDS3Image object (`planetaryimage module <https://planetaryimage.readthedocs.io/en/latest/index.html>`_) from reading a VMC .GEO file.
-        :type VMCGeoCube: planetaryimage.pds3image.PDS3Image
+        :param VeRaSoundingLongitudes: longitudes (˚) of the VeRa soundings.
+        :type VeRaSoundingLongitudes: list or NumPy array
 
-        :param VMCGeoArraysFlattened: flattened 1D array of the calibrated radiance factors of the entire VMC image.
-        :type VMCGeoArraysFlattened: list [NumPy array x 5], see description of :py:meth:`~.readVMCImageAndGeoCube`
+        :param VMCImageFileNames: top directory of a tree with VMC .IMG and .GEO files, or a list of VMC image file names (and paths).
+        :type VMCImageFileNames: str or list [str]
 
-        :param emissionAngleLimit: valid pixels must have emission angle smaller or equal to  incidenceAngleLimit .
-        :type emissionAngleLimit: float
+        :param VMCImageTimes: acquisition times of the images, default = None: read from the labels with :py:meth:`~.getVMCImageTimes`.
+        :type VMCImageTimes: NumPy array of datetime64
+
+        :param maximumTimeDifferenceHours: maximum time difference (h) between a sounding and an image, default = 24h.
+        :type maximumTimeDifferenceHours: float
+
+        :param numberOfProcesses: number of worker processes, default = 4. With 1 all images are processed in the current process.
+        :type numberOfProcesses: int
 
         :param incidenceAngleLimit: valid pixels must have incidence angle smaller or equal to  incidenceAngleLimit .
         :type incidenceAngleLimit: float
 
-        :param applyLambertLaw: apply Lambert limbdarkening law only, default = True (at this time, no other law has been programmed yet).
+        :param emissionAngleLimit: valid pixels must have emission angle smaller or equal to  emissionAngleLimit .
+        :type emissionAngleLimit: float
+
+        :param applyLambertLaw: apply Lambert limbdarkening law only, default = True.
         :type applyLambertLaw: bool
 
+        :param collocationFileName: if given, the table is also saved to this .npy file, default = ''.
+        :type collocationFileName: str
+
+        :param windModel: the wind profiles for the wind-advected boxes, default = None (KhatuntsevWindModel), see :py:class:`~.VMCWindModel`.
+        :type windModel: VMCWindModel
+
         :param silent: print information on run, default = False.
         :type silent: bool
 
-        :return: calibrated VMC image, flattened calibrated VMC image, average incidence angle, standard deviation incidence angle, average emission angle, standard emission incidence angle, average phase angle, standard deviation phase angle, radiance scaling factor 
-        :rtype: 2D NumPy array (512x512), 1d NumPy array, float, float, float, float, float, float,
+        :return: table with one row per (sounding, image) pair
+        :rtype: NumPy structured array
         
         **Description:**
-        This method is used to calibrate a VMC image.
-        The calibrated radiance factor :math:`RF_{x,y}` for a valid (= on Venus disk with incidence angle < :code:`incidenceAngleLimit` and emission 
-        angle < :code:`emissionAngleLimit`) pixel :math:`(x,y)` in a VMC image is:
-                
-            :math:`RF_{x,y} = \\pi \\beta R_{observed - x,y} \\frac {d_{Venus}}{S_{Sun}}`
-        
-        
-        where :math:`\\beta` is the calibration correction factor (see `Shalygina  et al. 2015 <https://doi.org/10.1016/j.pss.2014.11.012>`_, their Table 1), :math:`R_{observed - x,y}` is the value at the pixel in ADU times the radiance scaling factor read from the VMC image header (:code:`VMCImage.label ['RADIANCE_SCALING_FACTOR'].value`, when read with `planetaryimage module <https://planetaryimage.readthedocs.io/en/latest/index.html>`_ in Python) in :math:`W/m^2/\\mu m/ster/ADU`, :math:`d_{Venus}` is the distance of Venus to the Sun in AU and :math:`S_{Sun}` the solar flux in :math:`W/m^2/\\mu m` at 1AU (see `Lee et al. 2015 <http://dx.doi.org/10.1016/j.icarus.2015.02.015>`_ their Equation 2).
-        
-        
-        The :math:`\\beta` factor is 2.34 for orbits before 2639 and 1 for later orbits.
+        For each VeRa sounding, find all VMC images taken within  maximumTimeDifferenceHours  of the sounding, using a binary search on the time-sorted images
+        instead of comparing every sounding with every image. For each pair, the wind-advected box is calculated with :py:meth:`~.getWindAdvectedBoxes` 
+        and the statistics of the calibrated pixels inside the box with :py:meth:`~.getBoxStatistics`. The images are distributed over  numberOfProcesses  
+        worker processes, each image is read and calibrated only once for all the soundings it is paired with.
         
-        For :math:`S_{Sun}` (from `Lee et al. 2015 <http://dx.doi.org/10.1016/j.icarus.2015.02.015>`_ their Equation 1):
+        The columns of the returned table are:
         
-            :math:`S_{Sun} = \\frac {\\int S_{irradiance}(\\lambda) T(\\lambda) d\\lambda}{\\int T (\\lambda) d\\lambda}`
+            | iSounding: index of the sounding in the input arrays
+            | VMCImageFileName: file name of the image
+            | timeDifferenceHours: image time - sounding time (h)
+            | latitudeCentre, longitudeCentre: centre (˚) of the wind-advected box
+            | numberOfPixels: number of valid calibrated pixels in the box
+            | radianceFactorAverage, radianceFactorSD: average and standard deviation of the calibrated radiance factor in the box
+            | incidenceAngleAverage, emissionAngleAverage: average angles (˚) in the box
+            
+        The sounding times can be built from the output of  VeRaTools.readValuesFromVeRaTable : 
         
-        The :math:`S_{irradiance}` is determined using the `Solar Spectra website <https://www.nrel.gov/grid/solar-resource/spectra.html>`_ and the transmission function :math:`T (\\lamda)` is taken from a parametrisation of the UV part of the transmission function of the VMC camera as published by `Markiewicz et al. 2007 <https://doi.org/10.1016/j.pss.2007.01.004>`_ their Figure 3.
+        .. code-block:: python
         
-        This results in a value of :math:`S_{Sun} = 1081 W/m^2/\\mu m`.
+            VeRaSoundingTimes = np.array (dayOfYear, dtype = 'datetime64[ms]') + ( np.array (timeOfDay) * 3600000 ).astype ('timedelta64[ms]')
+        '''
         
-        The value of :math:`d_{Venus} = 0.723AU` to within 1% in :math:`d_{Venus}^2` over the orbit of Venus.
+        if type (VMCImageFileNames) == str:
         
-        Finally, a Lambert limb-darkening law is applied. 
+            VMCImageFileNames = sorted ( HandyTools.getFilesInDirectoryTree (VMCImageFileNames, extension = 'IMG') )
+            
+        if VMCImageTimes is None:
         
-        The calibration is only done for pixels that fall on the Venus disk, which have valid longitudes attached to them and an incidence angle of less than or equal to the limit set by the user (default = 89˚).
+            VMCImageTimes = VMCTools.getVMCImageTimes (VMCImageFileNames)
+            
         
-        The first four input variables come from reading a VMC image with the :py:meth:`~.readVMCImageAndGeoCube` method of this class.
-        '''
-    
-        # Make sure the longitudes are running from 0 through 360˚ and not -180˚ through 180˚.
-        iLongitude = np.where ( np.logical_and ( VMCGeoArraysFlattened [4] >= -180, VMCGeoArraysFlattened [4] < 0 ) ) [0]
-        VMCGeoArraysFlattened [4][iLongitude] += 360
+        # Time-sorted index of the images.
+        VMCImageTimes = np.asarray (VMCImageTimes, dtype = 'datetime64[ms]')
+        iVMCImagesSorted = np.argsort (VMCImageTimes, kind = 'stable')
+        VMCImageTimesSorted = VMCImageTimes [iVMCImagesSorted]
         
-        # Collect the indices of all the points on the illuminated part of the Venus disk.
-        iOnDiskValid1 = np.where ( np.logical_and ( abs ( VMCGeoArraysFlattened [4] ) <= 360, 
-                                                    abs ( VMCGeoArraysFlattened [0] ) <= incidenceAngleLimit ) ) [0]
-
+        VeRaSoundingTimes = np.asarray (VeRaSoundingTimes, dtype = 'datetime64[ms]')
+        maximumTimeDifference = np.timedelta64 ( int (maximumTimeDifferenceHours * 3600000), 'ms' )
         
-        iOnDiskValid2 = np.where ( VMCGeoArraysFlattened [1][iOnDiskValid1] <= emissionAngleLimit ) [0]
-                                                    
-        # Valid points with incidence and emission angle limits.
-        iOnDiskValid = iOnDiskValid1 [iOnDiskValid2]
+        # Range of candidate images in the sorted index for each sounding.
+        iCandidatesStart = np.searchsorted (VMCImageTimesSorted, VeRaSoundingTimes - maximumTimeDifference, side = 'left')
+        iCandidatesEnd = np.searchsorted (VMCImageTimesSorted, VeRaSoundingTimes + maximumTimeDifference, side = 'right')
+        numberOfCandidates = iCandidatesEnd - iCandidatesStart
         
-   
-        # Extract the Radiance Scaling Factor in the right units of W/m2/ster/micron, instead of the reported units W/m3/ster.   
-        radianceScalingFactor = VMCImage.label ['RADIANCE_SCALING_FACTOR'].value / 1000000.        
-
-        # The beta factor is ...
-        betaFactor = 2.34  if VMCImage.label ['ORBIT_NUMBER'] <= 2638  else  1
-
-        VMCImageCalibratedFlattened = np.zeros ( len (VMCImageFlattened) ) - 1.
-        VMCImageCalibratedFlattened [iOnDiskValid] = radianceScalingFactor * VMCImageFlattened [iOnDiskValid] * betaFactor * np.pi * (0.723 * 0.723) / 1081
-
-
-        # Use Lambert's law for the correction of the indicence angle.
-        if applyLambertLaw:
-     
-            VMCImageCalibratedFlattened [iOnDiskValid] /= np.cos  ( VMCGeoArraysFlattened [0][iOnDiskValid] * np.pi / 180 )
+        # All (sounding, image) pairs.
+        iPairSoundings = np.repeat ( np.arange ( len (VeRaSoundingTimes) ), numberOfCandidates )
+        iPairImages = iVMCImagesSorted [ np.repeat (iCandidatesStart - np.cumsum (numberOfCandidates) + numberOfCandidates, numberOfCandidates) + np.arange ( numberOfCandidates.sum () ) ]
+        pairTimeDifferencesHours = ( VMCImageTimes [iPairImages] - VeRaSoundingTimes [iPairSoundings] ) / np.timedelta64 (1, 'h')
 
+        latitudeCentres, latitudeLimits, longitudeCentres, longitudeLimits = \
+            VMCTools.getWindAdvectedBoxes ( np.asarray (VeRaSoundingLatitudes, dtype = float) [iPairSoundings], 
+                                            np.asarray (VeRaSoundingLongitudes, dtype = float) [iPairSoundings], pairTimeDifferencesHours, windModel = windModel )
 
         if not silent:
         
             print ()
-            print ( ' Calibrating image {}'.format (VMCImage.filename) )
-            print ( '  - valid point when longitude 0˚ - 360, incidence angle < {}˚ and emission angle < {}˚;'.format (incidenceAngleLimit, emissionAngleLimit) )
-            print ( '  - number of valid points = {:6d};'.format ( len (iOnDiskValid) ) )
-            print ( '  - radiance scaling factor = {} W/m2/micron/ster;'.format (radianceScalingFactor) )
+            print ( ' Collocating {} VeRa soundings with {} VMC images within {}h: {} pairs in {} images'.
+                    format ( len (VeRaSoundingTimes), len (VMCImageFileNames), maximumTimeDifferenceHours, len (iPairImages), len ( np.unique (iPairImages) ) ) )
 
-            if applyLambertLaw:
 
-                print ( '  - applying Lambert\'s law.')
+        collocationTable = np.zeros ( len (iPairImages), dtype = [ ('iSounding', 'i8'), ('VMCImageFileName', 'U{}'.format ( max ( [1] + [ len ( os.path.basename (VMCImageFileName) ) for VMCImageFileName in VMCImageFileNames ] ) ) ),
+                                                                   ('timeDifferenceHours', 'f8'), ('latitudeCentre', 'f8'), ('longitudeCentre', 'f8'), ('numberOfPixels', 'i8'), 
+                                                                   ('radianceFactorAverage', 'f8'), ('radianceFactorSD', 'f8'), ('incidenceAngleAverage', 'f8'), ('emissionAngleAverage', 'f8') ] )
+        collocationTable ['iSounding'] = iPairSoundings
+        collocationTable ['VMCImageFileName'] = [ os.path.basename ( VMCImageFileNames [iPairImage] ) for iPairImage in iPairImages ]
+        collocationTable ['timeDifferenceHours'] = pairTimeDifferencesHours
+        collocationTable ['latitudeCentre'] = latitudeCentres
+        collocationTable ['longitudeCentre'] = longitudeCentres
 
 
-        incidenceAngeAverage = DataTools.getAverageVarAndSDPYtoCPP ( VMCGeoArraysFlattened [0][iOnDiskValid] )
-        emissionAngleAverage = DataTools.getAverageVarAndSDPYtoCPP ( VMCGeoArraysFlattened [1][iOnDiskValid] )
-        phaseAngleAverage = DataTools.getAverageVarAndSDPYtoCPP ( VMCGeoArraysFlattened [2][iOnDiskValid] )
+        # One task per image, with all the boxes of the soundings paired with that image.
+        iPairsSortedOnImage = np.argsort (iPairImages, kind = 'stable')
+        iImageStarts = np.flatnonzero ( np.diff ( iPairImages [iPairsSortedOnImage], prepend = -1 ) )
+        imageTasks = [ iPairsSortedOnImage [iStart:iEnd]  for iStart, iEnd in zip ( iImageStarts, list (iImageStarts [1:]) + [ len (iPairImages) ] ) ]
+        
+        taskArguments = [ ( VMCImageFileNames [ iPairImages [iPairs [0]] ], latitudeLimits [iPairs], longitudeLimits [iPairs], incidenceAngleLimit, emissionAngleLimit, applyLambertLaw )
+                          for iPairs in imageTasks ]
 
-        return VMCImageCalibratedFlattened.reshape (512, 512), VMCImageCalibratedFlattened, \
-               incidenceAngeAverage [0], incidenceAngeAverage [1], \
-               emissionAngleAverage [0], emissionAngleAverage [1], \
-               phaseAngleAverage [0], phaseAngleAverage [1], radianceScalingFactor
+        if numberOfProcesses > 1 and len (imageTasks) > 1:
+        
+            with concurrent.futures.ProcessPoolExecutor ( max_workers = numberOfProcesses ) as workerPool:
+            
+                boxStatisticsPerImage = list ( workerPool.map ( VMCTools.getBoxStatistics, *zip (*taskArguments), chunksize = max ( 1, len (imageTasks) // (4 * numberOfProcesses) ) ) )
+                
+        else:
+        
+            boxStatisticsPerImage = [ VMCTools.getBoxStatistics (*arguments)  for arguments in taskArguments ]
+            
+        
+        for iPairs, boxStatistics in zip (imageTasks, boxStatisticsPerImage):
+        
+            collocationTable ['numberOfPixels'][iPairs] = boxStatistics [:, 0]
+            collocationTable ['radianceFactorAverage'][iPairs] = boxStatistics [:, 1]
+            collocationTable ['radianceFactorSD'][iPairs] = boxStatistics [:, 2]
+            collocationTable ['incidenceAngleAverage'][iPairs] = boxStatistics [:, 3]
+            collocationTable ['emissionAngleAverage'][iPairs] = boxStatistics [:, 4]
 
 
+        if collocationFileName:
+        
+            np.save (collocationFileName, collocationTable)
+            
+            
+        return collocationTable
 
-    # 
-    @staticmethod
-    def getWindAdvectedBox (latitudeVeRaSounding, longitudeVeRaSounding, timeDifferenceHours, oneSigmaZonalWind = 20, oneSigmaMeridionalWind = 12):
-        '''
-        :param latitudeVeRaSounding: latitude (˚) of the VeRa sounding location.
-        :type latitudeVeRaSounding: float
 
-        :param longitudeVeRaSounding: longitude (˚) of the VeRa sounding location.
-        :type longitudeVeRaSounding: float
 
-        :param timeDifferenceHours: difference in hours between the VeRa sounding and the VMC image acquisition.
-        :type timeDifferenceHours: float        
+    # Create or update an SQLite catalog with the metadata and footprints of VMC images.
+    @staticmethod
+    def createVMCCatalog (catalogFileName, VMCImageFileNames, footprintStep = 16, silent = False):
+        '''
+        :param catalogFileName: file name (and path) of the SQLite catalog. It is created if it does not exist.
+        :type catalogFileName: str
 
-        :param oneSigmaZonalWind: the standard deviation for the zonal wind. Default is 20m/s from Khatunstev et al. (2013) Figure 10a.
-        :type oneSigmaZonalWind: float        
+        :param VMCImageFileNames: top directory of a tree with VMC .IMG and .GEO files, or a list of VMC image file names (and paths).
+        :type VMCImageFileNames: str or list [str]
 
-        :param oneSigmaMeridionalWind: the standard deviation for the meridional wind. Default is 12m/s from Khatunstev et al. (2013) Figure 10b.
-        :type oneSigmaMeridionalWind: float        
+        :param footprintStep: only every  footprintStep -th line and sample of the geocube is read to determine the footprint, default = 16.
+        :type footprintStep: int
 
+        :param silent: print information on run, default = False.
+        :type silent: bool
 
-        :return: latitudeCentre, latitudeLimits, longitudeCentre, longitudeLimits.
-        :rtype: float, list [float, float], float, list [ [float, float], [float, float] ]
+        :return: number of images added or updated
+        :rtype: int
         
-        **Description**:   
-        Given the latitude and longitude of the VeRa sounding, as well as the time difference between the VeRa sounding and the VMC image, determine the
-        latitude-longitude box where the atmosphere of the VeRa sounding was positioned at the time of the VMC image recording.
+        **Description:**
+        Store for each image the orbit number, start time, radiance scaling factor, filter name and latitude-longitude footprint in the table  images  of an
+        indexed SQLite database, which can be queried with :py:meth:`~.queryVMCCatalog`. Only the PDS3 labels (:py:meth:`~.readPDS3Label`) and a downsampled
+        latitude and longitude plane of the geocube (:py:meth:`~.readPDS3ImageMemoryMapped`) are read.
         
-        The parametrisation is based on `Khatuntsev et al. (2013) <http://dx.doi.org/10.1016/j.icarus.2013.05.018s>`_ figures 10a (zonal) and 10b (meridional).
-        The uncertainties (standard deviation) `oneSigmaZonalWind` and `oneSigmaMeridionalWind` are estimated based on the grey areas in those figures.
+        The update is incremental: images whose .IMG and .GEO files have the same sizes and modification times as in the catalog are not read again, and 
+        images that no longer exist on disk are removed from the catalog. The start times are stored as ISO strings with millisecond precision 
+        (as  str ( np.datetime64 (startTime, 'ms') ) ), the same form as the times given to :py:meth:`~.queryVMCCatalog`, so that they compare correctly.
+        
+        The footprint is the latitude range and the longitude range of the valid pixels. When the footprint crosses the 0˚ meridian, 
+        longitudeMinimum > longitudeMaximum and the footprint covers longitudeMinimum - 360˚ and 0˚ - longitudeMaximum.
         '''
-                        
 
-        # conversion factor for metres to degrees longitude at the equator at 70km altitude (radius of Venus taken to be 6052km). 
-        degreesLatitudePerMetre = 180 / ( np.pi * (6052 + 70) * 1000 )
-        degreesLongitudePerMetreAtVeRaLatitude = degreesLatitudePerMetre / np.cos ( np.pi * latitudeVeRaSounding / 180 )
-        timeDifferenceSeconds = timeDifferenceHours * 3600
+        if type (VMCImageFileNames) == str:
+        
+            VMCImageFileNames = sorted ( HandyTools.getFilesInDirectoryTree (VMCImageFileNames, extension = 'IMG') )
             
-        if latitudeVeRaSounding <= -50:
         
-            longitudeCentre = longitudeVeRaSounding + degreesLongitudePerMetreAtVeRaLatitude * timeDifferenceSeconds * ( -94 - (latitudeVeRaSounding + 50) * (65.6 / 25) )
-                
-        elif latitudeVeRaSounding <= -40 and latitudeVeRaSounding >= -50:
+        catalog = sqlite3.connect (catalogFileName)
         
-            longitudeCentre = longitudeVeRaSounding + degreesLongitudePerMetreAtVeRaLatitude * timeDifferenceSeconds * ( -101.5 - (latitudeVeRaSounding + 40) * (7.5 / 10) )
+        # A catalog from before the .GEO file status was stored is created again.
+        catalogColumns = [ column [1]  for column in catalog.execute ('PRAGMA table_info (images)') ]
+        if catalogColumns and 'geoFileSize' not in catalogColumns:
         
-        elif latitudeVeRaSounding <= -15 and latitudeVeRaSounding >= -40:
+            catalog.execute ('DROP TABLE images')
+            
+        catalog.execute ( 'CREATE TABLE IF NOT EXISTS images (fileName TEXT PRIMARY KEY, fileSize INTEGER, modificationTime INTEGER, geoFileSize INTEGER, '
+                          'geoModificationTime INTEGER, orbitNumber INTEGER, startTime TEXT, radianceScalingFactor REAL, filterName TEXT, '
+                          'latitudeMinimum REAL, latitudeMaximum REAL, longitudeMinimum REAL, longitudeMaximum REAL)' )
+        catalog.execute ('CREATE INDEX IF NOT EXISTS imagesStartTime ON images (startTime)')
+        catalog.execute ('CREATE INDEX IF NOT EXISTS imagesOrbitNumber ON images (orbitNumber)')
+        catalog.execute ('CREATE INDEX IF NOT EXISTS imagesLatitude ON images (latitudeMinimum, latitudeMaximum)')
         
-            longitudeCentre = longitudeVeRaSounding + degreesLongitudePerMetreAtVeRaLatitude * timeDifferenceSeconds * ( -93 + (latitudeVeRaSounding + 15) * (8.5 / 35) )
-               
-        elif latitudeVeRaSounding > -15:
+        catalogFileStatus = { fileStatus [0]: fileStatus [1:]  for fileStatus in catalog.execute ('SELECT fileName, fileSize, modificationTime, geoFileSize, geoModificationTime FROM images') }
         
-            longitudeCentre = longitudeVeRaSounding + degreesLongitudePerMetreAtVeRaLatitude * timeDifferenceSeconds * -93
+        # Remove the images that no longer exist.
+        catalog.executemany ( 'DELETE FROM images WHERE fileName = ?', [ (fileName,)  for fileName in catalogFileStatus  if not os.path.isfile (fileName) ] )
         
 
-        longitudeHalfRange = abs (degreesLongitudePerMetreAtVeRaLatitude * timeDifferenceSeconds * oneSigmaZonalWind)
-        if longitudeVeRaSounding > longitudeCentre:
+        numberOfImagesUpdated = 0
+        for VMCImageFileName in VMCImageFileNames:
         
-            longitudeBorderMaximum = longitudeCentre + longitudeHalfRange
-            longitudeBorderMinimum = longitudeCentre - longitudeHalfRange
+            VMCImageFileName = os.path.abspath (VMCImageFileName)
+            if '.IMG' not in VMCImageFileName:
             
-        else:
-        
-            longitudeBorderMaximum = longitudeCentre + longitudeHalfRange
-            longitudeBorderMinimum = longitudeCentre - longitudeHalfRange
-
-
-
-        longitudeLimits = [ [longitudeBorderMinimum, longitudeBorderMaximum], [longitudeBorderMinimum, longitudeBorderMaximum] ]
-        # All values are negative, the box lies entirely beyond the 0˚ meridian.
-        if longitudeBorderMaximum < 0:
-
-            longitudeBorderMaximum += 360
-            longitudeCentre += 360
-            longitudeBorderMinimum += 360
+                VMCImageFileName = VMCImageFileName.replace ('.GEO', '') + '.IMG'
+            
+            try:
+            
+                fileStatus = os.stat (VMCImageFileName)
+                geoFileStatus = os.stat ( VMCImageFileName [:-4] + '.GEO' )
+                if catalogFileStatus.get (VMCImageFileName) == (fileStatus.st_size, fileStatus.st_mtime_ns, geoFileStatus.st_size, geoFileStatus.st_mtime_ns):
+                
+                    continue
                     
-            longitudeLimits = [ [longitudeBorderMinimum, longitudeBorderMaximum], [longitudeBorderMinimum, longitudeBorderMaximum] ]
+                label, labelSize = VMCTools.readPDS3Label (VMCImageFileName)
+                VMCGeoCube = VMCTools.readPDS3ImageMemoryMapped ( VMCImageFileName [:-4] + '.GEO' )
+                
+            except (OSError, KeyError, ValueError) as readError:
+            
+                print ()
+                print ( ' WARNING: could not read {}: {}'.format (VMCImageFileName, readError) )
+                
+                continue
+                
+                
+            # Downsampled latitudes and longitudes of the valid pixels, longitudes from 0˚ through 360˚.
+            latitudes = np.array ( VMCGeoCube.data [3, ::footprintStep, ::footprintStep], dtype = float ).flatten ()
+            longitudes = np.array ( VMCGeoCube.data [4, ::footprintStep, ::footprintStep], dtype = float ).flatten ()
+            iValid = np.where ( np.logical_and ( np.abs (latitudes) <= 90, np.abs (longitudes) <= 360 ) ) [0]
+            longitudes = np.sort ( np.mod (longitudes [iValid], 360) )
+            
+            if len (iValid):
+            
+                latitudeMinimum, latitudeMaximum = latitudes [iValid].min (), latitudes [iValid].max ()
+                
+                # The longitude range is the complement of the largest gap between the longitudes, going round the planet.
+                longitudeGaps = np.diff ( np.append ( longitudes, longitudes [0] + 360 ) )
+                iLargestGap = np.argmax (longitudeGaps)
+                longitudeMinimum = longitudes [ (iLargestGap + 1) % len (longitudes) ]
+                longitudeMaximum = longitudes [iLargestGap]
+                
+            else:
+            
+                latitudeMinimum = latitudeMaximum = longitudeMinimum = longitudeMaximum = None
+            
+            
+            radianceScalingFactor = label.get ('RADIANCE_SCALING_FACTOR')
+            if type (radianceScalingFactor) == PDS3Quantity:
+            
+                radianceScalingFactor = radianceScalingFactor.value
+                
+            # Same form as the times of the query, see  queryVMCCatalog .
+            startTime = label.get ('START_TIME')
+            if startTime is not None:
+            
+                startTime = str ( np.datetime64 ( str (startTime).rstrip ('Z'), 'ms' ) )
+                
+            catalog.execute ( 'INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', 
+                              ( VMCImageFileName, fileStatus.st_size, fileStatus.st_mtime_ns, geoFileStatus.st_size, geoFileStatus.st_mtime_ns, label.get ('ORBIT_NUMBER'), 
+                                startTime, radianceScalingFactor, str ( label.get ('FILTER_NAME', '') ), latitudeMinimum, latitudeMaximum, longitudeMinimum, longitudeMaximum ) )
+            
+            numberOfImagesUpdated += 1
+            
+            
+        catalog.commit ()
+        catalog.close ()
+        
+        if not silent:
+        
+            print ()
+            print ( ' Catalog {}: {} of {} images added or updated'.format ( catalogFileName, numberOfImagesUpdated, len (VMCImageFileNames) ) )
+            
+            
+        return numberOfImagesUpdated
 
 
-        # The centre and the minimum border are beyond the 0˚ meridian.            
-        if longitudeCentre < 0 and longitudeBorderMaximum > 0:
-        
-            longitudeCentre += 360
-            longitudeBorderMinimum += 360                             
 
-            longitudeLimits = [ [longitudeBorderMinimum, 360], [0, longitudeBorderMaximum] ]
+    # Select VMC images from the SQLite catalog.
+    @staticmethod
+    def queryVMCCatalog ( catalogFileName, 
+                          startTime = None, 
+                          endTime = None, 
+                          orbitMinimum = None, 
+                          orbitMaximum = None, 
+                          latitudeLimits = None, 
+                          longitudeLimits = None,
+                          filterName = None ):
+        '''
+        :param catalogFileName: file name (and path) of the SQLite catalog created with :py:meth:`~.createVMCCatalog`.
+        :type catalogFileName: str
 
+        :param startTime: earliest start time of the images, for example '2008-05-01T00:00:00', default = None (no limit).
+        :type startTime: str or NumPy datetime64
 
-        # Only the minimum border is beyond the 0˚ meridian. 
-        if longitudeBorderMinimum < 0 and longitudeCentre > 0:
-        
-            longitudeBorderMinimum += 360                             
+        :param endTime: latest start time of the images, default = None (no limit).
+        :type endTime: str or NumPy datetime64
 
-            longitudeLimits = [ [longitudeBorderMinimum, 360], [0, longitudeBorderMaximum] ]
+        :param orbitMinimum: lowest orbit number, default = None (no limit).
+        :type orbitMinimum: int
 
+        :param orbitMaximum: highest orbit number, default = None (no limit).
+        :type orbitMaximum: int
 
+        :param latitudeLimits: the footprint must overlap this latitude range (˚), default = None (no limit).
+        :type latitudeLimits: list [float, float]
 
-        # All values are > 360˚, the box lies entirely beyond the 360˚ meridian.
-        if longitudeBorderMinimum > 360:
+        :param longitudeLimits: the footprint must overlap this longitude range (˚), or one of these two ranges, as returned by :py:meth:`~.getWindAdvectedBox`. Default = None (no limit).
+        :type longitudeLimits: list [float, float] or list [ [float, float], [float, float] ]
 
-            longitudeBorderMaximum -= 360
-            longitudeCentre -= 360
-            longitudeBorderMinimum -= 360
+        :param filterName: filter name as in the PDS3 label, default = None (all filters).
+        :type filterName: str
 
-            longitudeLimits = [ [longitudeBorderMinimum, longitudeBorderMaximum], [longitudeBorderMinimum, longitudeBorderMaximum] ]
+        :return: file names of the selected .IMG files, sorted on start time, and their start times.
+        :rtype: list [str], NumPy array of datetime64 [ms]
         
-
-        # The centre and the maximum border are beyond the 360˚ meridian.            
-        if longitudeCentre > 360 and longitudeBorderMinimum < 360:
+        **Description:**
+        Select the images in a time range, orbit range and/or whose footprint intersects a latitude-longitude box. All criteria that are given must be met.
+        The time, orbit and latitude criteria use the indexes of the catalog, the longitude criterion (which has to deal with the 0˚ meridian) is applied to the result.
+        '''
         
-            longitudeCentre -= 360
-            longitudeBorderMaximum -= 360                             
-
-            longitudeLimits = [ [longitudeBorderMinimum, 360], [0, longitudeBorderMaximum] ]
-
-
-        # Only the maximum border is beyond the 360˚ meridian.
-        if longitudeCentre < 360 and longitudeBorderMaximum > 360:
+        conditions = []
+        values = []
+        for condition, value in [ ('startTime >= ?', startTime), ('startTime <= ?', endTime), ('orbitNumber >= ?', orbitMinimum), ('orbitNumber <= ?', orbitMaximum), ('filterName = ?', filterName) ]:
         
-            longitudeBorderMaximum -= 360                             
+            if value is not None:
+            
+                conditions.append (condition)
+                values.append ( str ( np.datetime64 (value, 'ms') )  if 'Time' in condition  else value )
+                
+        if latitudeLimits is not None:
+        
+            conditions += [ 'latitudeMaximum >= ?', 'latitudeMinimum <= ?' ]
+            values += [ latitudeLimits [0], latitudeLimits [1] ]
+            
+        
+        catalog = sqlite3.connect (catalogFileName)
+        selectedImages = catalog.execute ( 'SELECT fileName, startTime, longitudeMinimum, longitudeMaximum FROM images' + 
+                                           ( ' WHERE ' + ' AND '.join (conditions)  if conditions  else '' ) + ' ORDER BY startTime', values ).fetchall ()
+        catalog.close ()
+        
+        
+        if longitudeLimits is not None:
+        
+            if np.ndim (longitudeLimits) == 1:
+            
+                longitudeLimits = [longitudeLimits]
+                
+            selectedImagesInBox = []
+            for selectedImage in selectedImages:
+            
+                if selectedImage [2] is None:
+                
+                    continue
+                    
+                # Longitude ranges of the footprint, two when it crosses the 0˚ meridian.
+                if selectedImage [2] <= selectedImage [3]:
+                
+                    footprintLongitudeRanges = [ [ selectedImage [2], selectedImage [3] ] ]
+                    
+                else:
+                
+                    footprintLongitudeRanges = [ [ selectedImage [2], 360 ], [ 0, selectedImage [3] ] ]
+                    
+                if any ( footprintMinimum <= longitudeMaximum and footprintMaximum >= longitudeMinimum  
+                         for footprintMinimum, footprintMaximum in footprintLongitudeRanges  for longitudeMinimum, longitudeMaximum in longitudeLimits ):
+                         
+                    selectedImagesInBox.append (selectedImage)
+                    
+            selectedImages = selectedImagesInBox
+                    
+            
+        return [ selectedImage [0]  for selectedImage in selectedImages ], np.array ( [ selectedImage [1]  for selectedImage in selectedImages ], dtype = 'datetime64[ms]' )
 
-            longitudeLimits = [ [longitudeBorderMinimum, 360], [0, longitudeBorderMaximum] ]
 
 
+    # Determine the mission section of a VMC image or orbit.
+    @staticmethod
+    def getVEXMissionSection (orbitOrImageName):
+        '''
+        :param orbitOrImageName: ID of a VMC image, for example 'V2811_0080_UV2', or an orbit number.
+        :type orbitOrImageName: str or int
 
-        if latitudeVeRaSounding <= -75:
+        :return: index of the mission section in  VEXMissionSections , -1 for orbits outside the mission sections.
+        :rtype: int
         
-            latitudeCentre = latitudeVeRaSounding
-                
-        elif latitudeVeRaSounding <= -50 and latitudeVeRaSounding > -75:
+        **Description:**
+        Same mission sections as :py:meth:`~.getColourForVEXMissionSection`; orbits of the South Polar Dynamics Campaign get the index of the campaign, 
+        not that of Extension 4.
+        '''
         
-            latitudeCentre = latitudeVeRaSounding + degreesLatitudePerMetre * timeDifferenceSeconds * ( -9.58 - (latitudeVeRaSounding + 50) * (9.38 / 25) )
-               
-        elif latitudeVeRaSounding <= -20 and latitudeVeRaSounding > -50:
+        if type (orbitOrImageName) == str:
         
-            latitudeCentre = latitudeVeRaSounding + degreesLatitudePerMetre * timeDifferenceSeconds * ( -6.5 + (latitudeVeRaSounding + 20) * (3.08 / 30) )
-               
-        elif latitudeVeRaSounding > -20:
+            orbitOrImageName = os.path.basename (orbitOrImageName).split ('.')[0].split ('_')[0].replace ('V', '')
+            
+        orbitNumber = int (orbitOrImageName)
         
-            latitudeCentre = latitudeVeRaSounding + degreesLatitudePerMetre * timeDifferenceSeconds * ( -3.26 + latitudeVeRaSounding * (3.24 / 20) )
-
-
-        latitudeHalfRange = abs (degreesLatitudePerMetre * timeDifferenceSeconds * oneSigmaMeridionalWind)
-
-        latitudeBorderMinimum = max (-90, latitudeCentre - latitudeHalfRange)
-        latitudeBorderMaximum = max (-90, latitudeCentre + latitudeHalfRange)
+        iMissionSection = -1
+        for iSection, (sectionName, firstOrbit, lastOrbit) in enumerate (VEXMissionSections):
         
-        latitudeLimits  = [latitudeBorderMinimum, latitudeBorderMaximum]
-
-        return latitudeCentre, latitudeLimits, longitudeCentre, longitudeLimits 
+            # The later entry wins, so the South Polar Dynamics Campaign overrides Extension 4.
+            if firstOrbit <= orbitNumber <= lastOrbit:
+            
+                iMissionSection = iSection
+                
+                
+        return iMissionSection
 
 
 
@@ -6,13 +6,367 @@
 
 # Standard imports.
 import numpy as np
+import os
+import hashlib
+import concurrent.futures
+import json
 
 # Custom imports.
 from HandyTools import HandyTools
-from DataTools import DataTools
 
 venusSurfaceRadius = 6051.8 #km
 
+# Version of the content of the profile cache files, part of the cache key so that old entries are never used after a change in the parsing or filtering.
+VeRaProfileCacheVersion = 5
+
+# Version of the lines of the VeRa profiles table, stored in the state file of  createVeRaProfilesTable  so that lines of an older parser are never reused.
+VeRaProfilesTableVersion = 1
+
+
+# Sorted indexes on the columns of a VeRa table, for fast range selections.
+class VeRaTableIndex:
+    '''
+    Sorted indexes on the columns of a VeRa table as returned by :py:meth:`~.VeRaTools.readVeRaTableAsArray`, for range selections with a binary search
+    instead of a scan over all rows. The indexes on 'time' and 'latitude' are built when the object is created, those on other columns the first time they are used.
+    
+    .. code-block:: python
+    
+        VeRaTableSelection = VeRaTableIndex (VeRaTableValues).select ( latitude = (-90, -60), localSolarTime = (10, 14) )
+    '''
+
+    def __init__ (self, VeRaTableValues):
+        '''
+        :param VeRaTableValues: VeRa table as returned by :py:meth:`~.VeRaTools.readVeRaTableAsArray`.
+        :type VeRaTableValues: NumPy structured array
+        '''
+        
+        self.VeRaTableValues = VeRaTableValues
+        
+        # For each indexed column: the row indices sorted on the column, and the sorted column values.
+        self.sortedIndexes = {}
+        for columnName in ['time', 'latitude']:
+        
+            self.getSortedIndex (columnName)
+
+
+    # Return the sorted index of a column, creating it if needed.
+    def getSortedIndex (self, columnName):
+        '''
+        :param columnName: name of the column.
+        :type columnName: str
+
+        :return: row indices sorted on the column, sorted column values
+        :rtype: 1D NumPy array, 1D NumPy array
+        '''
+        
+        if columnName not in self.sortedIndexes:
+        
+            iSorted = np.argsort ( self.VeRaTableValues [columnName], kind = 'stable' )
+            self.sortedIndexes [columnName] = ( iSorted, self.VeRaTableValues [columnName][iSorted] )
+            
+        return self.sortedIndexes [columnName]
+
+
+    # Return the row indices with column values in a range.
+    def selectRange (self, columnName, minimum = None, maximum = None):
+        '''
+        :param columnName: name of the column.
+        :type columnName: str
+
+        :param minimum: lowest value (included), default = None (no limit). For 'time' a datetime64 or an ISO time string.
+        :type minimum: float, NumPy datetime64 or str
+
+        :param maximum: highest value (included), default = None (no limit).
+        :type maximum: float, NumPy datetime64 or str
+
+        :return: row indices, in increasing order
+        :rtype: 1D NumPy array
+        '''
+        
+        iSorted, sortedValues = self.getSortedIndex (columnName)
+        
+        if columnName == 'time':
+        
+            minimum = None  if minimum is None  else np.datetime64 (minimum, 'ms')
+            maximum = None  if maximum is None  else np.datetime64 (maximum, 'ms')
+            
+        iStart = 0  if minimum is None  else np.searchsorted (sortedValues, minimum, side = 'left')
+        iEnd = len (sortedValues)  if maximum is None  else np.searchsorted (sortedValues, maximum, side = 'right')
+        
+        return np.sort ( iSorted [iStart:iEnd] )
+
+
+    # Return the rows that are in all the given column ranges.
+    def select (self, **columnRanges):
+        '''
+        :param columnRanges: for each column to select on, a tuple (minimum, maximum); use None for no limit. For example  latitude = (-90, -60), time = ('2008-01-01', None) .
+        :type columnRanges: tuple
+
+        :return: selected rows, in the order of the table
+        :rtype: NumPy structured array
+        '''
+        
+        if not columnRanges:
+        
+            return self.VeRaTableValues.copy ()
+            
+        # Start from the smallest selection, so that every intersection is with the smallest set so far.
+        rowSelections = sorted ( [ self.selectRange (columnName, minimum, maximum)  for columnName, (minimum, maximum) in columnRanges.items () ], key = len )
+        
+        iSelected = rowSelections [0]
+        for iRows in rowSelections [1:]:
+        
+            iSelected = np.intersect1d ( iSelected, iRows, assume_unique = True )
+            
+        return self.VeRaTableValues [iSelected]
+
+
+
+# Spatio-temporal index of VeRa soundings on the sphere, for nearest-neighbour and radius queries.
+class VeRaSoundingIndex:
+    '''
+    Index of the 1-bar locations and times of VeRa soundings, as returned by :py:meth:`~.VeRaTools.readVeRaTableAsArray`, for k-nearest and radius 
+    queries on the sphere (:py:meth:`~.queryNearest`, :py:meth:`~.queryRadius`), optionally within a time window.
+    
+    The locations are stored as 3D unit vectors in a uniform grid of cubic cells. A query only computes distances to the soundings in the cells that 
+    can contain soundings within the search radius, and distances are great-circle distances, so there are no problems at the poles or at the 0˚ meridian.
+    '''
+
+    def __init__ (self, VeRaTableValues, cellSizeDegrees = 5.):
+        '''
+        :param VeRaTableValues: VeRa table as returned by :py:meth:`~.VeRaTools.readVeRaTableAsArray` (at least the columns 'latitude', 'longitude' and 'time').
+        :type VeRaTableValues: NumPy structured array
+
+        :param cellSizeDegrees: approximate size (˚) of the cells of the grid, default = 5˚.
+        :type cellSizeDegrees: float
+        '''
+        
+        self.latitudes = np.asarray ( VeRaTableValues ['latitude'], dtype = float )
+        self.longitudes = np.asarray ( VeRaTableValues ['longitude'], dtype = float )
+        self.times = np.asarray ( VeRaTableValues ['time'], dtype = 'datetime64[ms]' )
+        self.unitVectors = VeRaSoundingIndex.getUnitVectors (self.latitudes, self.longitudes)
+        
+        # Cubic cells with an edge equal to the chord of  cellSizeDegrees , covering the cube [-1, 1]^3 around the unit sphere.
+        self.cellSize = 2 * np.sin ( np.radians (cellSizeDegrees) / 2 )
+        self.numberOfCellsPerAxis = int ( np.ceil (2 / self.cellSize) ) + 1
+        
+        cellKeys = self.getCellKeys ( self.getCellCoordinates (self.unitVectors) )
+        self.iSorted = np.argsort (cellKeys, kind = 'stable')
+        self.sortedCellKeys = cellKeys [self.iSorted]
+
+
+    # Unit vectors for latitudes and longitudes.
+    @staticmethod
+    def getUnitVectors (latitudes, longitudes):
+        '''
+        :param latitudes: latitudes (˚).
+        :type latitudes: float or NumPy array
+
+        :param longitudes: longitudes (˚).
+        :type longitudes: float or NumPy array
+
+        :return: unit vectors (x, y, z)
+        :rtype: NumPy array (..., 3)
+        '''
+        
+        latitudes = np.radians (latitudes)
+        longitudes = np.radians (longitudes)
+        
+        return np.stack ( [ np.cos (latitudes) * np.cos (longitudes), np.cos (latitudes) * np.sin (longitudes), np.sin (latitudes) ], axis = -1 )
+
+
+    # Integer cell coordinates of points in the cube around the unit sphere.
+    def getCellCoordinates (self, points):
+    
+        return np.clip ( np.floor ( (np.asarray (points) + 1) / self.cellSize ).astype (int), 0, self.numberOfCellsPerAxis - 1 )
+
+
+    # Single integer key of each cell.
+    def getCellKeys (self, cellCoordinates):
+    
+        return ( cellCoordinates [..., 0] * self.numberOfCellsPerAxis + cellCoordinates [..., 1] ) * self.numberOfCellsPerAxis + cellCoordinates [..., 2]
+
+
+    # Return the soundings within a great-circle distance of a location.
+    def queryRadius (self, latitude, longitude, radiusDegrees, time = None, timeWindowHours = None):
+        '''
+        :param latitude: latitude (˚) of the location.
+        :type latitude: float
+
+        :param longitude: longitude (˚) of the location.
+        :type longitude: float
+
+        :param radiusDegrees: search radius (˚ of great-circle arc); multiply by  pi / 180  times the radius of Venus (plus altitude) to convert from km.
+        :type radiusDegrees: float
+
+        :param time: time of the location, default = None: no time constraint.
+        :type time: NumPy datetime64 or str
+
+        :param timeWindowHours: only soundings with an absolute time difference with  time  smaller than or equal to  timeWindowHours , default = None: no time constraint.
+        :type timeWindowHours: float
+
+        :return: indices of the soundings in the table and their distances (˚), sorted on distance.
+        :rtype: 1D NumPy array, 1D NumPy array
+        '''
+        
+        unitVector = VeRaSoundingIndex.getUnitVectors (latitude, longitude)
+        chordLength = 2 * np.sin ( np.radians ( min (radiusDegrees, 180) ) / 2 )
+        
+        # All cells that overlap the cube around the search sphere.
+        cellCoordinatesMinimum = self.getCellCoordinates (unitVector - chordLength)
+        cellCoordinatesMaximum = self.getCellCoordinates (unitVector + chordLength)
+        cellKeys = self.getCellKeys ( np.stack ( np.meshgrid ( *[ np.arange (cellCoordinatesMinimum [iAxis], cellCoordinatesMaximum [iAxis] + 1)  for iAxis in range (3) ], 
+                                                               indexing = 'ij' ), axis = -1 ).reshape (-1, 3) )
+        
+        iCellStarts = np.searchsorted (self.sortedCellKeys, cellKeys, side = 'left')
+        iCellEnds = np.searchsorted (self.sortedCellKeys, cellKeys, side = 'right')
+        iCandidates = self.iSorted [ np.concatenate ( [ np.arange (iCellStart, iCellEnd)  for iCellStart, iCellEnd in zip (iCellStarts, iCellEnds)  if iCellEnd > iCellStart ] + [ np.array ( [], dtype = int ) ] ) ]
+        
+        if time is not None and timeWindowHours is not None:
+        
+            iCandidates = iCandidates [ np.abs ( self.times [iCandidates] - np.datetime64 (time, 'ms') ) <= np.timedelta64 ( int (timeWindowHours * 3600000), 'ms' ) ]
+            
+        distances = np.degrees ( np.arccos ( np.clip ( self.unitVectors [iCandidates] @ unitVector, -1, 1 ) ) )
+        
+        iWithinRadius = np.where (distances <= radiusDegrees) [0]
+        iOrder = np.argsort (distances [iWithinRadius], kind = 'stable')
+        
+        return iCandidates [iWithinRadius][iOrder], distances [iWithinRadius][iOrder]
+
+
+    # Return the k nearest soundings of a location.
+    def queryNearest (self, latitude, longitude, k = 1, time = None, timeWindowHours = None):
+        '''
+        :param latitude: latitude (˚) of the location.
+        :type latitude: float
+
+        :param longitude: longitude (˚) of the location.
+        :type longitude: float
+
+        :param k: number of soundings, default = 1.
+        :type k: int
+
+        :param time: time of the location, default = None: no time constraint.
+        :type time: NumPy datetime64 or str
+
+        :param timeWindowHours: only soundings within  timeWindowHours  of  time , default = None: no time constraint.
+        :type timeWindowHours: float
+
+        :return: indices of the (at most) k nearest soundings in the table and their distances (˚), sorted on distance.
+        :rtype: 1D NumPy array, 1D NumPy array
+        
+        **Description:**
+        The search radius starts at the cell size and is doubled until k soundings are found (or the whole sphere is searched).
+        '''
+        
+        radiusDegrees = np.degrees ( 2 * np.arcsin (self.cellSize / 2) )
+        while True:
+        
+            iSoundings, distances = self.queryRadius (latitude, longitude, radiusDegrees, time = time, timeWindowHours = timeWindowHours)
+            
+            if len (iSoundings) >= k or radiusDegrees >= 180:
+            
+                return iSoundings [:k], distances [:k]
+                
+            radiusDegrees *= 2
+
+
+
+# Memory-mapped store of all the original VeRa profiles, with O(1) access to each profile.
+class VeRaProfileStore:
+    '''
+    Memory-mapped store of VeRa profiles of different lengths, created with :py:meth:`~.VeRaTools.createVeRaProfileStore`. 
+    
+    The levels of all profiles are stored one after the other in a single binary file  profiles.bin  (float64, one row of 7 values per level, in the order 
+    of :py:meth:`~.VeRaTools.readVeRaTAB`), with the start of each profile in  offsets.npy  and per-profile metadata in  metadata.npy . 
+    Nothing is parsed when the store is opened, and a store object can be sent to worker processes cheaply: only the directory name is pickled.
+    
+    .. code-block:: python
+    
+        VeRaProfiles = VeRaProfileStore ('/SomeWhere/VeRaStore')
+        VeRaProfileOriginal = VeRaProfiles [12]                          # (7, numberOfLevels), as from  readVeRaTAB 
+        VeRaProfileOriginal = VeRaProfiles.getProfile ('PROFILEID')
+        VeRaProfilesConcatenated, offsets = VeRaProfiles.getProfiles (0, 100)
+    '''
+
+    def __init__ (self, storeDirectory):
+        '''
+        :param storeDirectory: directory of the store.
+        :type storeDirectory: str
+        '''
+        
+        self.storeDirectory = storeDirectory
+        self.offsets = np.load ( os.path.join (storeDirectory, 'offsets.npy') )
+        self.metadata = np.load ( os.path.join (storeDirectory, 'metadata.npy') )
+        
+        if self.offsets [-1] > 0:
+        
+            self.levels = np.memmap ( os.path.join (storeDirectory, 'profiles.bin'), dtype = '<f8', mode = 'r', shape = (self.offsets [-1], 7) )
+            
+        else:
+        
+            self.levels = np.zeros ( (0, 7) )
+            
+        self.iProfileOfID = { str (profileID): iProfile  for iProfile, profileID in enumerate ( self.metadata ['profileID'] ) }
+
+
+    # Only the directory is pickled, the memory map is opened again in the other process.
+    def __getstate__ (self):
+    
+        return { 'storeDirectory': self.storeDirectory }
+        
+        
+    def __setstate__ (self, state):
+    
+        self.__init__ ( state ['storeDirectory'] )
+
+
+    def __len__ (self):
+    
+        return len (self.offsets) - 1
+
+
+    # Negative indices count from the end, as for a list; an index out of range raises an IndexError.
+    def __getitem__ (self, iProfile):
+    
+        iProfile = range ( len (self) ) [iProfile]
+        
+        return self.levels [ self.offsets [iProfile] : self.offsets [iProfile + 1] ].T
+
+
+    # Return a profile by its ID.
+    def getProfile (self, profileID):
+        '''
+        :param profileID: ID of the profile (the .TAB file name without extension).
+        :type profileID: str
+
+        :return: VeRaProfileOriginal, as from :py:meth:`~.VeRaTools.readVeRaTAB` (a read-only view on the memory map)
+        :rtype: NumPy array (7, numberOfLevels)
+        '''
+        
+        return self [ self.iProfileOfID [profileID] ]
+
+
+    # Return a range of profiles as one concatenated array.
+    def getProfiles (self, iProfileStart = 0, iProfileEnd = None):
+        '''
+        :param iProfileStart: index of the first profile, default = 0. Negative indices count from the end.
+        :type iProfileStart: int
+
+        :param iProfileEnd: index after the last profile, default = None (up to the last profile). Negative indices count from the end.
+        :type iProfileEnd: int
+
+        :return: VeRaProfilesConcatenated (a read-only view on the memory map), offsets; as for :py:meth:`~.VeRaTools.concatenateVeRaProfiles`.
+        :rtype: NumPy array (7, number of levels), 1D NumPy array
+        '''
+        
+        # The same range as the slice  [iProfileStart : iProfileEnd]  of a list.
+        iProfileStart, iProfileEnd, iProfileStep = slice (iProfileStart, iProfileEnd).indices ( len (self) )
+        offsets = self.offsets [ iProfileStart : max (iProfileStart, iProfileEnd) + 1 ]
+        
+        return self.levels [ offsets [0] : offsets [-1] ].T, offsets - offsets [0]
+
+
 
 # This is a Python class to wrangle Venus Express VeRa data.
 class VeRaTools:
@@ -23,71 +377,530 @@ class VeRaTools:
 
     # Read the content of a VeRa .TAB file and return a numpy array.
     @staticmethod
-    def readVeRaTAB (VeRaTABFileName):
+    def readVeRaTAB (VeRaTABFileName, includeOneBarLevel = False, cacheDirectory = ''):
         '''
         :param VeRaTABFileName: File name (and path) of the VeRa TAB file.
         :type VeRaTABFileName: str
 
-        :return: Values of 7 variables as a function of sounded level, numberOfLevels
-        :rtype: NumPy array (7, numberOfLevels), int
+        :param includeOneBarLevel: also read the values at the 1-bar level from the companion .TXT file, default = False.
+        :type includeOneBarLevel: bool
+
+        :param cacheDirectory: directory for the cache of parsed profiles, default = '' (no cache). See :py:meth:`~.getVeRaProfileCacheFileName`.
+        :type cacheDirectory: str
+
+        :return: Values of 7 variables as a function of sounded level, numberOfLevels (and the 1-bar level values when  includeOneBarLevel = True )
+        :rtype: NumPy array (7, numberOfLevels), int (, dict)
+        
+        **Description:**
+        Read the content of a VeRa .TAB file and return as a numpy array, where each row represents the values of a variable as a function of sounding level:
+        
+            | VeRaProfileOriginal [0] radius (km)
+            | VeRaProfileOriginal [1] Temperature (K)
+            | VeRaProfileOriginal [2] 1-sigma Temperature uncertainty (K)
+            | VeRaProfileOriginal [3] pressure (bar)
+            | VeRaProfileOriginal [4] 1-sigma pressure uncertainty (Pa, as in the file)
+            | VeRaProfileOriginal [5] latitude (˚)
+            | VeRaProfileOriginal [6] longitude (˚)
+        
+        Only the seven columns needed are converted, in one pass over the file. The levels are in the reverse order of the file (a view, no copy).
+        
+        The companion .TXT file is only read when  includeOneBarLevel = True , see :py:meth:`~.readVeRaOneBarLevel` for the returned dictionary.
+        
+        With a  cacheDirectory , the parsed profile is stored as a .npy file the first time and memory-mapped from that file afterwards, which costs 
+        next to nothing. The map is copy-on-write: the returned array is writable, and changes to it stay in memory and are never written to the cache file.
+        '''
+        
+        cacheFileName = VeRaTools.getVeRaProfileCacheFileName (VeRaTABFileName, cacheDirectory, 'original')  if cacheDirectory  else ''
+        
+        if cacheFileName and os.path.isfile (cacheFileName):
+        
+            VeRaProfileOriginal = np.load (cacheFileName, mmap_mode = 'c')
+            
+        else:
+        
+            # Columns in the file of radius, temperature, temperature uncertainty, pressure, pressure uncertainty, latitude and longitude.
+            VeRaProfileOriginal = np.loadtxt ( VeRaTABFileName, usecols = (3, 14, 15, 8, 9, 4, 5), ndmin = 2 ) [::-1].T
+
+            # Pascal to bar conversion factor.
+            PascalToBar = 1 / 100000
+            VeRaProfileOriginal [3] *= PascalToBar
+            
+            if cacheFileName:
+            
+                VeRaTools.writeVeRaProfileCacheFile (cacheFileName, VeRaProfileOriginal)
+                
+
+        # Determine the number of sounded levels in the file.
+        numberOfLevels = VeRaProfileOriginal.shape [1]
+        
+
+        if includeOneBarLevel:
+        
+            return VeRaProfileOriginal, numberOfLevels, VeRaTools.readVeRaOneBarLevel ( os.path.splitext (VeRaTABFileName) [0] + '.TXT' )
+            
+
+        # Return the results.
+        return VeRaProfileOriginal, numberOfLevels
+
+
+
+    # Read the values at the 1-bar level from a VeRa .TXT file.
+    @staticmethod
+    def readVeRaOneBarLevel (VeRaTXTFileName):
+        '''
+        :param VeRaTXTFileName: File name (and path) of the VeRa TXT file.
+        :type VeRaTXTFileName: str
+
+        :return: values at the 1-bar level
+        :rtype: dict
+        
+        **Description:**
+        The .TXT files have a section starting with the text  'values of 1 bar level' . The values in this section are returned in a dictionary with the keys
+        'measurementTime' (str, yyyy-mm-ddThh:mm:ss), 'latitude' (˚), 'longitude' (˚), 'radius' (km), 'temperature' (K), 'localTrueSolarTime' (h) and 'solarZenithAngle' (˚).
+        '''
+        
+        content = HandyTools.getTextFileContent (VeRaTXTFileName)
+        
+        iLine = 0
+        while 'values of 1 bar level' not in content [iLine]:
+
+            iLine += 1
+
+        iLine += 2
+        
+        oneBarLevel = {}
+        oneBarLevel ['measurementTime'] = content [iLine].split (':  ')[-1]
+        
+        iLine += 2
+        oneBarLevel ['latitude'] = float ( content [iLine].split (':')[-1] )
+
+        iLine += 1
+        oneBarLevel ['longitude'] = float ( content [iLine].split (':')[-1] )
+
+        iLine += 1
+        oneBarLevel ['radius'] = float ( content [iLine].split (':')[-1] )
+        
+        iLine += 2
+        oneBarLevel ['temperature'] = float ( content [iLine].split (':')[-1] )
+            
+        iLine += 2
+        oneBarLevel ['localTrueSolarTime'] = float ( content [iLine].split (':')[-1] )
+        
+        iLine += 1
+        oneBarLevel ['solarZenithAngle'] = float ( content [iLine].split (':')[-1] )
+        
+        return oneBarLevel
+
+        
+    
+    # Calculate an average filtered VeRa profile at fixed altitudes.
+    @staticmethod
+    def getFilteredVeRaProfile (VeRaTABFileName, startAltitude = 6098., endAltitude = 6154., filteredAltitudeLevelsStep = 1., cacheDirectory = ''):
+        '''
+        :param VeRaTABFileName: File name (and path) of the VeRa TAB file.
+        :type VeRaTABFileName: str
+
+        :param startAltitude: Start altitude (km) of the filtered profile, default = 6098km.
+        :type startAltitude: float
+
+        :param endAltitude: End altitude (km) of the filtered profile, default = 6154km.
+        :type endAltitude: float
+
+        :param filteredAltitudeLevelsStep: the step-size (km) of the filtered profile, default = 1km.
+        :type filteredAltitudeLevelsStep: float
+
+        :param cacheDirectory: directory for the cache of parsed and filtered profiles, default = '' (no cache). See :py:meth:`~.getVeRaProfileCacheFileName`.
+        :type cacheDirectory: str
+        
+        :return: VeRaProfileFiltered, numberOfFilteredLevels, VeRaProfileOriginal, numberOfOriginalLevels
+        :rtype: list (10 lists), int, list (7 lists), int
+
+
+        **Description:**
+        Calculate an average filtered VeRa profile at two altitudes between radius the  startAltitude  and  endAltitude with step  filteredAltitudeLevelsStep. 
+        The default values result in 56 levels between 6098km and 6154km.
+
+        Take a window with a total width of  filteredAltitudeLevelsStep  around each altitude level and average the temperatures and latitudes
+        (see :py:meth:`~.getBinAveragesAndSDs`). When there is only one original level in the window, the standard deviations are NaN; 
+        when there are none, all values are NaN.
+
+            | VeRaProfileFiltered [0] radius (km)
+            | VeRaProfileFiltered [1] Temperature (K)
+            | VeRaProfileFiltered [2] 1-sigma Temperature uncertainty (K)
+            | VeRaProfileFiltered [3] pressure (bar)
+            | VeRaProfileFiltered [4] 1-sigma pressure uncertainty (bar)
+            | VeRaProfileFiltered [5] latitude (˚)
+            | VeRaProfileFiltered [6] longitude (˚)
+            | VeRaProfileFiltered [7] dT/dz (K/km)
+            | VeRaProfileFiltered [8] 1-sigma dT/dz (K/km)
+            | VeRaProfileFiltered [9] number of original levels used to calculate the average / filtered values
+
+        With a  cacheDirectory , the filtered profile is stored as a .npy file the first time and memory-mapped (copy-on-write, so writable) from that file 
+        afterwards, for the same file and the same start and end altitudes and step.
+        '''
+
+        # Read the content of the VeRa file, using the  VeRaTools.readVeRaTAB  method.
+        VeRaProfileOriginal, numberOfOriginalLevels = VeRaTools.readVeRaTAB (VeRaTABFileName, cacheDirectory = cacheDirectory)
+
+        # Make sure the user selects a valid start and end altitude, as well as altitude step.
+        if filteredAltitudeLevelsStep <= 0:
+        
+            print ()
+            print (' WARNING: filteredAltitudeLevelsStep has to be larger than 0km.')
+            
+            return None, None
+
+        if (endAltitude - startAltitude) < filteredAltitudeLevelsStep:
+        
+            print ()
+            print ( ' WARNING: difference between start and end altitudes needs to be larger than filteredAltitudeLevelsStep {}km.'.format (filteredAltitudeLevelsStep) )
+            
+            return None, None
+            
+            
+        # Calculate altitude levels evenly spaced in km and average inside each altitude bin.
+        numberOfFilteredLevels = int ( (endAltitude - startAltitude) / filteredAltitudeLevelsStep )
+        
+        cacheFileName = VeRaTools.getVeRaProfileCacheFileName ( VeRaTABFileName, cacheDirectory, 'filtered', (startAltitude, endAltitude, filteredAltitudeLevelsStep) )  if cacheDirectory  else ''
+        if cacheFileName and os.path.isfile (cacheFileName):
+        
+            return np.load (cacheFileName, mmap_mode = 'c'), numberOfFilteredLevels, VeRaProfileOriginal, numberOfOriginalLevels
+
+        # Create the NumPy array that will contain the resulting profiles.
+        VeRaProfileFiltered = np.zeros ( (10, numberOfFilteredLevels) )
+        VeRaProfileFiltered [0] = startAltitude + np.arange (numberOfFilteredLevels) * filteredAltitudeLevelsStep
+        
+        # Average and standard deviation of temperature, pressure, latitude and longitude for all levels at once.
+        binAverages, binStandardDeviations, VeRaProfileFiltered [9] = \
+            VeRaTools.getBinAveragesAndSDs ( VeRaProfileOriginal [0], VeRaProfileOriginal [ [1, 3, 5, 6] ], VeRaProfileFiltered [0], filteredAltitudeLevelsStep )
+            
+        VeRaProfileFiltered [ [1, 3, 5, 6] ] = binAverages
+        VeRaProfileFiltered [ [2, 4] ] = binStandardDeviations [ [0, 1] ]
+            
+        # dT/dz [7] and corresponding uncertainty estimate [8].           
+        VeRaProfileFiltered [7][:-1] = np.diff ( VeRaProfileFiltered [1] ) / filteredAltitudeLevelsStep
+        VeRaProfileFiltered [8][:-1] = np.sqrt ( VeRaProfileFiltered [2][1:]**2 + VeRaProfileFiltered [2][:-1]**2 ) / filteredAltitudeLevelsStep
+        
+        VeRaProfileFiltered [7][numberOfFilteredLevels - 1] = VeRaProfileFiltered [7][numberOfFilteredLevels - 2]
+
+        if cacheFileName:
+        
+            VeRaTools.writeVeRaProfileCacheFile (cacheFileName, VeRaProfileFiltered)
+
+
+        return VeRaProfileFiltered, numberOfFilteredLevels, VeRaProfileOriginal, numberOfOriginalLevels
+        
+
+
+    # Determine the name of the cache file of a parsed or filtered VeRa profile.
+    @staticmethod
+    def getVeRaProfileCacheFileName (VeRaTABFileName, cacheDirectory, cacheType, parameters = ()):
+        '''
+        :param VeRaTABFileName: File name (and path) of the VeRa TAB file.
+        :type VeRaTABFileName: str
+
+        :param cacheDirectory: directory of the cache.
+        :type cacheDirectory: str
+
+        :param cacheType: 'original' for the output of :py:meth:`~.readVeRaTAB`, 'filtered' for the output of :py:meth:`~.getFilteredVeRaProfile`.
+        :type cacheType: str
+
+        :param parameters: parameters that change the cached array, for example the start and end altitudes and step of the filtered profile.
+        :type parameters: tuple
+
+        :return: file name (and path) of the .npy cache file
+        :rtype: str
+        
+        **Description:**
+        The name of the cache file consists of two SHA-1 hashes: one of the full path of the .TAB file, the cache type and the parameters, which identifies the 
+        entry, and one of the cache version and the size and modification time of the .TAB file. When the .TAB file changes, the second hash changes too, 
+        so a stale cache file is never used; it is removed by :py:meth:`~.writeVeRaProfileCacheFile` when the new one is written.
+        '''
+        
+        entryKey = '{} {} {}'.format ( os.path.abspath (VeRaTABFileName), cacheType, [ float (parameter)  for parameter in parameters ] )
+        
+        fileStatus = os.stat (VeRaTABFileName)
+        fileStatusKey = '{} {} {}'.format ( VeRaProfileCacheVersion, fileStatus.st_size, fileStatus.st_mtime_ns )
+        
+        return os.path.join ( cacheDirectory, os.path.basename (VeRaTABFileName).split ('.')[0] + '_' + cacheType + '_' + hashlib.sha1 ( entryKey.encode () ).hexdigest () + 
+                                              '_' + hashlib.sha1 ( fileStatusKey.encode () ).hexdigest () + '.npy' )
+
+
+
+    # Write an array to a cache file.
+    @staticmethod
+    def writeVeRaProfileCacheFile (cacheFileName, VeRaProfile):
+        '''
+        :param cacheFileName: file name (and path) of the .npy cache file, see :py:meth:`~.getVeRaProfileCacheFileName`.
+        :type cacheFileName: str
+
+        :param VeRaProfile: the array to store.
+        :type VeRaProfile: NumPy array
+        
+        **Description:**
+        The array is first written to a temporary file, which is then renamed, so that other processes never read a half-written cache file.
+        Cache files of the same entry with another .TAB file status or cache version (same name up to the last hash) are stale and removed.
+        '''
+        
+        cacheDirectory = os.path.dirname ( os.path.abspath (cacheFileName) )
+        os.makedirs (cacheDirectory, exist_ok = True)
+        
+        temporaryFileName = cacheFileName + '.{}.tmp'.format ( os.getpid () )
+        with open (temporaryFileName, 'wb') as fileOpen:
+        
+            np.save ( fileOpen, np.ascontiguousarray (VeRaProfile) )
+            
+        os.replace (temporaryFileName, cacheFileName)
+        
+        # Remove the stale cache files of this entry; another process may remove them at the same time.
+        entryPrefix = os.path.basename (cacheFileName).rsplit ('_', 1)[0] + '_'
+        for fileName in os.listdir (cacheDirectory):
+        
+            if fileName.startswith (entryPrefix) and fileName.endswith ('.npy') and fileName != os.path.basename (cacheFileName):
+            
+                try:
+                
+                    os.remove ( os.path.join (cacheDirectory, fileName) )
+                    
+                except FileNotFoundError:
+                
+                    pass
+
+
+
+    # Average and standard deviation of variables in altitude bins, for all bins at once.
+    @staticmethod
+    def getBinAveragesAndSDs (radii, values, binCentres, binWidth, calculateSDs = True):
+        '''
+        :param radii: radius (km) of each original level.
+        :type radii: 1D NumPy array (numberOfOriginalLevels)
+
+        :param values: values of one or more variables at each original level.
+        :type values: NumPy array (numberOfVariables, numberOfOriginalLevels)
+
+        :param binCentres: radius (km) of the centre of each bin, in increasing order.
+        :type binCentres: 1D NumPy array (numberOfBins)
+
+        :param binWidth: total width (km) of each bin.
+        :type binWidth: float
+
+        :param calculateSDs: also calculate the standard deviations, default = True. With False, None is returned for the standard deviations.
+        :type calculateSDs: bool
+
+        :return: averages, standard deviations, number of original levels in each bin
+        :rtype: NumPy array (numberOfVariables, numberOfBins), NumPy array (numberOfVariables, numberOfBins), 1D NumPy array (numberOfBins)
+        
+        **Description:**
+        An original level is in a bin when its radius is strictly between  binCentre - binWidth / 2  and  binCentre + binWidth / 2 .
+        Instead of scanning all original levels for each bin, the radii are sorted once and the first and last level of each bin are found with a binary search
+        ( np.searchsorted ), after which the sums of all bins and all variables are calculated in one go with  np.add.reduceat .
+        
+        The standard deviation is the sample standard deviation (normalised by N - 1). Bins with one original level get that level's values and 
+        a NaN standard deviation, empty bins get NaN for both.
+        '''
+
+        values = np.atleast_2d (values)
+        binCentres = np.asarray (binCentres, dtype = float)
+        
+        iSorted = np.argsort (radii, kind = 'stable')
+        radiiSorted = np.asarray (radii) [iSorted]
+        
+        # A zero column is appended so that a bin ending at the last original level still has a valid index for  np.add.reduceat .
+        valuesSorted = np.zeros ( ( len (values), len (radiiSorted) + 1 ) )
+        valuesSorted [:, :-1] = values [:, iSorted]
+        
+        # First level in each bin (radius > lower border) and first level beyond each bin (radius >= upper border).
+        iBinStarts = np.searchsorted (radiiSorted, binCentres - binWidth / 2, side = 'right')
+        iBinEnds = np.searchsorted (radiiSorted, binCentres + binWidth / 2, side = 'left')
+        numberOfLevelsInBins = np.maximum (iBinEnds - iBinStarts, 0)
+        
+        # With the start and end of each bin interleaved, every other sum of  np.add.reduceat  is the sum over a bin. Empty bins are masked below.
+        iBinBorders = np.empty ( 2 * len (binCentres), dtype = int )
+        iBinBorders [0::2] = iBinStarts
+        iBinBorders [1::2] = np.maximum (iBinEnds, iBinStarts)
+        
+        with np.errstate (invalid = 'ignore', divide = 'ignore'):
+        
+            binAverages = np.add.reduceat (valuesSorted, iBinBorders, axis = 1) [:, 0::2] / numberOfLevelsInBins
+            
+        binAverages [:, numberOfLevelsInBins == 0] = np.nan
+        
+        if not calculateSDs:
+        
+            return binAverages, None, numberOfLevelsInBins
+            
+            
+        with np.errstate (invalid = 'ignore', divide = 'ignore'):
+        
+            # Bin of each sorted original level; levels that are not inside any bin get a zero deviation.
+            iBinOfLevels = np.clip ( np.searchsorted (iBinStarts, np.arange ( len (radiiSorted) + 1 ), side = 'right') - 1, 0, None )
+            levelsInBin = np.arange ( len (radiiSorted) + 1 ) < iBinEnds [iBinOfLevels]
+            
+            deviations = np.where ( levelsInBin, valuesSorted - binAverages [:, iBinOfLevels], 0. )
+            binStandardDeviations = np.sqrt ( np.add.reduceat (deviations * deviations, iBinBorders, axis = 1) [:, 0::2] / (numberOfLevelsInBins - 1) )
+
+        binStandardDeviations [:, numberOfLevelsInBins <= 1] = np.nan
+        
+        return binAverages, binStandardDeviations, numberOfLevelsInBins
+
+
+
+    # Names of the variables of a filtered VeRa profile, as used for the columns of the file written by  getFilteredVeRaProfiles .
+    filteredVeRaProfileVariables = [ 'radius', 'temperature', 'temperatureSD', 'pressure', 'pressureSD', 'latitude', 'longitude', 'dTdz', 'dTdzSD', 'numberOfOriginalLevels' ]
+
+
+
+    # Calculate the filtered profile of a VeRa .TAB file and return only the filtered profile.
+    @staticmethod
+    def getFilteredVeRaProfileOnly (VeRaTABFileName, startAltitude = 6098., endAltitude = 6154., filteredAltitudeLevelsStep = 1., cacheDirectory = ''):
+        '''
+        :param VeRaTABFileName: File name (and path) of the VeRa TAB file.
+        :type VeRaTABFileName: str
+
+        :return: VeRaProfileFiltered, see :py:meth:`~.getFilteredVeRaProfile`; all NaN when the file cannot be read.
+        :rtype: NumPy array (10, numberOfFilteredLevels)
+        
+        **Description:**
+        Worker of :py:meth:`~.getFilteredVeRaProfiles`: the same as :py:meth:`~.getFilteredVeRaProfile` with the same parameters, but only the filtered profile is
+        returned, so that the original profile does not have to be sent back from the worker process.
+        '''
+        
+        try:
+        
+            return np.asarray ( VeRaTools.getFilteredVeRaProfile (VeRaTABFileName, startAltitude, endAltitude, filteredAltitudeLevelsStep, cacheDirectory = cacheDirectory) [0] )
+            
+        except (OSError, ValueError, IndexError) as readError:
+        
+            print ()
+            print ( ' WARNING: could not read {}: {}'.format (VeRaTABFileName, readError) )
+            
+            return np.full ( ( 10, int ( (endAltitude - startAltitude) / filteredAltitudeLevelsStep ) ), np.nan )
+
+
+
+    # Calculate the filtered profiles of many VeRa .TAB files in parallel and stack them in one array.
+    @staticmethod
+    def getFilteredVeRaProfiles ( VeRaTABFileNames, 
+                                  startAltitude = 6098., 
+                                  endAltitude = 6154., 
+                                  filteredAltitudeLevelsStep = 1., 
+                                  numberOfProcesses = 4, 
+                                  cacheDirectory = '', 
+                                  filteredProfilesFileName = '' ):
+        '''
+        :param VeRaTABFileNames: top directory of a tree with VeRa .TAB files, or a list of .TAB file names (and paths), for example from  HandyTools.getFilesInDirectoryTree .
+        :type VeRaTABFileNames: str or list [str]
+
+        :param startAltitude: Start altitude (km) of the filtered profiles, default = 6098km.
+        :type startAltitude: float
+
+        :param endAltitude: End altitude (km) of the filtered profiles, default = 6154km.
+        :type endAltitude: float
+
+        :param filteredAltitudeLevelsStep: the step-size (km) of the filtered profiles, default = 1km.
+        :type filteredAltitudeLevelsStep: float
+
+        :param numberOfProcesses: number of worker processes, default = 4. With 1 all profiles are filtered in the current process.
+        :type numberOfProcesses: int
+
+        :param cacheDirectory: directory for the cache of parsed and filtered profiles, default = '' (no cache), see :py:meth:`~.getFilteredVeRaProfile`.
+        :type cacheDirectory: str
+
+        :param filteredProfilesFileName: if given, the result is also written to this compressed .npz file, default = ''.
+        :type filteredProfilesFileName: str
+
+        :return: VeRaProfilesFiltered, profileIDs, numberOfFilteredLevels
+        :rtype: NumPy array (numberOfProfiles, 10, numberOfFilteredLevels), list [str], int
+        
+        **Description:**
+        Filter all profiles onto the same altitude grid with :py:meth:`~.getFilteredVeRaProfile`, distributed over  numberOfProcesses  worker processes, and 
+        stack the results in one contiguous array.  VeRaProfilesFiltered [i]  is the filtered profile of the .TAB file with ID  profileIDs [i]  (the file name 
+        without extension), in the order of the (sorted) file names. Profiles of files that cannot be read are all NaN.
+        
+        The file  filteredProfilesFileName  is columnar: it contains one (numberOfProfiles, numberOfFilteredLevels) array per variable, with the names in 
+        VeRaTools.filteredVeRaProfileVariables , and the array  profileIDs . Read it back with :py:meth:`~.readFilteredVeRaProfiles`.
+        '''
+
+        # Make sure the user selects a valid start and end altitude, as well as altitude step.
+        if filteredAltitudeLevelsStep <= 0 or (endAltitude - startAltitude) < filteredAltitudeLevelsStep:
         
-        **Description:**
-        Read the content of a VeRa .TAB file and return as a numpy array, where each row represents the values of a variable as a function of sounding level:
+            print ()
+            print ( ' WARNING: filteredAltitudeLevelsStep has to be larger than 0km and smaller than the difference between start and end altitudes.' )
+            
+            return None, None, None
+            
+            
+        if type (VeRaTABFileNames) == str:
         
-            | VeRaProfileOriginal [0] radius (km)
-            | VeRaProfileOriginal [1] Temperature (K)
-            | VeRaProfileOriginal [2] 1-sigma Temperature uncertainty (K)
-            | VeRaProfileOriginal [3] pressure (bar)
-            | VeRaProfileOriginal [4] 1-sigma pressure uncertainty (bar)
-            | VeRaProfileOriginal [5] latitude (˚)
-            | VeRaProfileOriginal [6] longitude (˚)
+            VeRaTABFileNames = HandyTools.getFilesInDirectoryTree (VeRaTABFileNames, extension = 'TAB')
+            
+        VeRaTABFileNames = sorted (VeRaTABFileNames)
+        profileIDs = [ os.path.basename (VeRaTABFileName).split ('.')[0]  for VeRaTABFileName in VeRaTABFileNames ]
+        
+        numberOfFilteredLevels = int ( (endAltitude - startAltitude) / filteredAltitudeLevelsStep )
+        VeRaProfilesFiltered = np.empty ( ( len (VeRaTABFileNames), 10, numberOfFilteredLevels ) )
+        
+        taskArguments = [ VeRaTABFileNames, [startAltitude] * len (VeRaTABFileNames), [endAltitude] * len (VeRaTABFileNames), 
+                          [filteredAltitudeLevelsStep] * len (VeRaTABFileNames), [cacheDirectory] * len (VeRaTABFileNames) ]
+                          
+        if numberOfProcesses > 1 and len (VeRaTABFileNames) > 1:
+        
+            with concurrent.futures.ProcessPoolExecutor ( max_workers = numberOfProcesses ) as workerPool:
+            
+                for iProfile, VeRaProfileFiltered in enumerate ( workerPool.map ( VeRaTools.getFilteredVeRaProfileOnly, *taskArguments, 
+                                                                                  chunksize = max ( 1, len (VeRaTABFileNames) // (4 * numberOfProcesses) ) ) ):
                 
-        '''
+                    VeRaProfilesFiltered [iProfile] = VeRaProfileFiltered
+                    
+        else:
+        
+            for iProfile, VeRaProfileFiltered in enumerate ( map ( VeRaTools.getFilteredVeRaProfileOnly, *taskArguments ) ):
             
-        # Read the file content as text.
-        fileContentTAB = HandyTools.getTextFileContent (VeRaTABFileName)
-
-        # Determine the number of sounded levels in the file.
-        numberOfLevels = len (fileContentTAB)
+                VeRaProfilesFiltered [iProfile] = VeRaProfileFiltered
 
-        # Pascal to bar conversion factor.        
-        PascalToBar = 1 / 100000
 
-        # Extract the seven variables as a function of sounded level.        
-        VeRaProfileOriginal = np.zeros ( (7, numberOfLevels) )
-        for iFileLine, fileLine in enumerate (fileContentTAB):
+        if filteredProfilesFileName:
+        
+            np.savez_compressed ( filteredProfilesFileName, profileIDs = np.array (profileIDs), 
+                                  **{ variableName: VeRaProfilesFiltered [:, iVariable]  for iVariable, variableName in enumerate (VeRaTools.filteredVeRaProfileVariables) } )
         
-            fileLineElements = [ element  for element in fileLine.split (' ')  if element != '' ]
-                        
-            iLevel = numberOfLevels - iFileLine - 1
-            VeRaProfileOriginal [0][iLevel] = float ( fileLineElements [3] ) # radius (km)
-            VeRaProfileOriginal [1][iLevel] = float ( fileLineElements [14] ) # Temperature (K)
-            VeRaProfileOriginal [2][iLevel] = float ( fileLineElements [15] ) # 1-sigma Temperature uncertainty (K)
-            VeRaProfileOriginal [3][iLevel] = float ( fileLineElements [8] )  * PascalToBar # pressure (bar)
-            VeRaProfileOriginal [4][iLevel] = float ( fileLineElements [9] ) # 1-sigma pressure uncertainty (bar)
-            VeRaProfileOriginal [5][iLevel] = float ( fileLineElements [4] ) # latitude (˚)
-            VeRaProfileOriginal [6][iLevel] = float ( fileLineElements [5] ) # longitude (˚)
+        
+        return VeRaProfilesFiltered, profileIDs, numberOfFilteredLevels
 
 
-        fileContentTXT = HandyTools.getTextFileContent (VeRaTABFileName.split ('TAB')[0] + 'TXT')
 
-        iLine = 0
-        while 'values of 1 bar level' not in fileContentTXT [iLine]:
+    # Read the filtered profiles written by  getFilteredVeRaProfiles .
+    @staticmethod
+    def readFilteredVeRaProfiles (filteredProfilesFileName):
+        '''
+        :param filteredProfilesFileName: file name (and path) of the .npz file written by :py:meth:`~.getFilteredVeRaProfiles`.
+        :type filteredProfilesFileName: str
+
+        :return: VeRaProfilesFiltered, profileIDs, numberOfFilteredLevels
+        :rtype: NumPy array (numberOfProfiles, 10, numberOfFilteredLevels), list [str], int
+        '''
         
-            iLine += 1
+        with np.load (filteredProfilesFileName) as filteredProfilesContent:
         
+            VeRaProfilesFiltered = np.stack ( [ filteredProfilesContent [variableName]  for variableName in VeRaTools.filteredVeRaProfileVariables ], axis = 1 )
+            profileIDs = [ str (profileID)  for profileID in filteredProfilesContent ['profileIDs'] ]
+            
+            
+        return VeRaProfilesFiltered, profileIDs, VeRaProfilesFiltered.shape [2]
 
-        iLine += 1
-        
 
-        # Return the results.
-        return VeRaProfileOriginal, numberOfLevels
 
-        
-    
-    # Calculate an average filtered VeRa profile at fixed altitudes.
+    # Percentiles of the filtered temperature, pressure and dT/dz from Monte Carlo realisations of a VeRa profile.
     @staticmethod
-    def getFilteredVeRaProfile (VeRaTABFileName, startAltitude = 6098., endAltitude = 6154., filteredAltitudeLevelsStep = 1., ):
+    def getFilteredVeRaProfileMonteCarlo ( VeRaTABFileName, 
+                                           startAltitude = 6098., 
+                                           endAltitude = 6154., 
+                                           filteredAltitudeLevelsStep = 1., 
+                                           numberOfRealisations = 1000, 
+                                           percentiles = (2.5, 16., 50., 84., 97.5), 
+                                           randomSeed = None, 
+                                           realisationsPerBatch = 250, 
+                                           cacheDirectory = '' ):
         '''
         :param VeRaTABFileName: File name (and path) of the VeRa TAB file.
         :type VeRaTABFileName: str
@@ -100,129 +913,374 @@ class VeRaTools:
 
         :param filteredAltitudeLevelsStep: the step-size (km) of the filtered profile, default = 1km.
         :type filteredAltitudeLevelsStep: float
-        
-        :return: VeRaProfileFiltered, numberOfFilteredLevels, VeRaProfileOriginal, numberOfOriginalLevels
-        :rtype: list (10 lists), int, list (7 lists), int
 
+        :param numberOfRealisations: number of perturbed realisations of the profile, default = 1000.
+        :type numberOfRealisations: int
 
-        **Description:**
-        Calculate an average filtered VeRa profile at two altitudes between radius the  startAltitude  and  endAltitude with step  filteredAltitudeLevelsStep. 
-        The default values result in 56 levels between 6098km and 6154km.
+        :param percentiles: percentiles (%) to return, default = (2.5, 16, 50, 84, 97.5).
+        :type percentiles: list [float]
 
-        Take a window with a total width of  filteredAltitudeLevelsStep  around each altitude level and average the temperatures and latitudes.
+        :param randomSeed: seed of the random generator, default = None (a new seed every call). Anything accepted by  np.random.default_rng .
+        :type randomSeed: int or np.random.SeedSequence
 
-            | VeRaProfileFiltered [0] radius (km)
-            | VeRaProfileFiltered [1] Temperature (K)
-            | VeRaProfileFiltered [2] 1-sigma Temperature uncertainty (K)
-            | VeRaProfileFiltered [3] pressure (bar)
-            | VeRaProfileFiltered [4] 1-sigma pressure uncertainty (bar)
-            | VeRaProfileFiltered [5] latitude (˚)
-            | VeRaProfileFiltered [6] longitude (˚)
-            | VeRaProfileFiltered [7] dT/dz (K/km)
-            | VeRaProfileFiltered [8] 1-sigma dT/dz (K/km)
-            | VeRaProfileFiltered [9] number of original levels used to calculate the average / filtered values
+        :param realisationsPerBatch: number of realisations binned in one array operation, default = 250. Limits the memory use for long profiles.
+        :type realisationsPerBatch: int
 
+        :param cacheDirectory: directory for the cache of parsed profiles, default = '' (no cache), see :py:meth:`~.readVeRaTAB`.
+        :type cacheDirectory: str
+
+        :return: VeRaProfilePercentiles, radii
+        :rtype: NumPy array (3, numberOfPercentiles, numberOfFilteredLevels), 1D NumPy array (numberOfFilteredLevels)
+        
+        **Description:**
+        Draw  numberOfRealisations  realisations of the original profile, with the temperature and pressure of each original level perturbed by Gaussian noise 
+        with the reported 1-sigma uncertainties (independently for each level and each variable). All realisations are binned onto the same altitude 
+        levels as :py:meth:`~.getFilteredVeRaProfile` in one go, by handing them to :py:meth:`~.getBinAveragesAndSDs` as extra variables (averages only), and dT/dz is 
+        calculated for all realisations with one  np.diff . 
+        
+            | VeRaProfilePercentiles [0] percentiles of the temperature (K)
+            | VeRaProfilePercentiles [1] percentiles of the pressure (bar)
+            | VeRaProfilePercentiles [2] percentiles of dT/dz (K/km)
+            
+        Unlike the quadrature uncertainty of :py:meth:`~.getFilteredVeRaProfile`, the spread is also defined for levels with only one original level in 
+        the window. Levels with no original level in the window are NaN. Only the original levels inside the altitude range are perturbed.
         '''
 
-        # Read the content of the VeRa file, using the  VeRaTools.readVeRaTAB  method.
-        VeRaProfileOriginal, numberOfOriginalLevels = VeRaTools.readVeRaTAB (VeRaTABFileName)
+        VeRaProfileOriginal, numberOfOriginalLevels = VeRaTools.readVeRaTAB (VeRaTABFileName, cacheDirectory = cacheDirectory)
 
         # Make sure the user selects a valid start and end altitude, as well as altitude step.
-        if filteredAltitudeLevelsStep <= 0:
+        if filteredAltitudeLevelsStep <= 0 or (endAltitude - startAltitude) < filteredAltitudeLevelsStep:
         
             print ()
-            print (' WARNING: filteredAltitudeLevelsStep has to be larger than 0km.')
+            print ( ' WARNING: filteredAltitudeLevelsStep has to be larger than 0km and smaller than the difference between start and end altitudes.' )
             
             return None, None
+            
+        numberOfFilteredLevels = int ( (endAltitude - startAltitude) / filteredAltitudeLevelsStep )
+        radii = startAltitude + np.arange (numberOfFilteredLevels) * filteredAltitudeLevelsStep
+        
+        # Original levels that fall in one of the bins.
+        VeRaProfileOriginal = np.asarray (VeRaProfileOriginal)
+        VeRaProfileOriginal = VeRaProfileOriginal [ :, ( VeRaProfileOriginal [0] > radii [0] - filteredAltitudeLevelsStep / 2 ) & 
+                                                       ( VeRaProfileOriginal [0] < radii [-1] + filteredAltitudeLevelsStep / 2 ) ]
+        
+        randomGenerator = np.random.default_rng (randomSeed)
+        
+        # The pressure uncertainty of  readVeRaTAB  is in Pa, the pressure in bar.
+        PascalToBar = 1 / 100000
+        
+        # Filtered temperature [0] and pressure [1] of every realisation.
+        filteredRealisations = np.empty ( (2, numberOfRealisations, numberOfFilteredLevels) )
+        
+        for iRealisationStart in range ( 0, numberOfRealisations, realisationsPerBatch ):
+        
+            numberOfRealisationsInBatch = min ( realisationsPerBatch, numberOfRealisations - iRealisationStart )
+            
+            # Drawn one realisation after the other, so that the result does not depend on  realisationsPerBatch . 
+            # Variables 0 .. n - 1 are then the temperatures, n .. 2n - 1 the pressures of the  n  realisations in this batch.
+            perturbedValues = randomGenerator.standard_normal ( ( numberOfRealisationsInBatch, 2, VeRaProfileOriginal.shape [1] ) ).transpose (1, 0, 2).copy ()
+            perturbedValues [0] *= VeRaProfileOriginal [2]
+            perturbedValues [1] *= VeRaProfileOriginal [4] * PascalToBar
+            perturbedValues += VeRaProfileOriginal [ [1, 3], np.newaxis ]
+            
+            binAverages = VeRaTools.getBinAveragesAndSDs ( VeRaProfileOriginal [0], perturbedValues.reshape ( 2 * numberOfRealisationsInBatch, -1 ), 
+                                                           radii, filteredAltitudeLevelsStep, calculateSDs = False ) [0]
+            
+            filteredRealisations [:, iRealisationStart : iRealisationStart + numberOfRealisationsInBatch] = binAverages.reshape (2, numberOfRealisationsInBatch, -1)
+            
+            
+        # dT/dz of every realisation, with the last level equal to the one below, as in  getFilteredVeRaProfile .
+        dTdzRealisations = np.empty ( (numberOfRealisations, numberOfFilteredLevels) )
+        dTdzRealisations [:, :-1] = np.diff ( filteredRealisations [0], axis = 1 ) / filteredAltitudeLevelsStep
+        dTdzRealisations [:, -1] = dTdzRealisations [:, -2]
+        
+        VeRaProfilePercentiles = np.stack ( [ np.percentile ( filteredRealisations [0], percentiles, axis = 0 ), 
+                                              np.percentile ( filteredRealisations [1], percentiles, axis = 0 ), 
+                                              np.percentile ( dTdzRealisations, percentiles, axis = 0 ) ] )
+                                              
+                                              
+        return VeRaProfilePercentiles, radii
 
-        if (endAltitude - startAltitude) < filteredAltitudeLevelsStep:
+
+
+    # Monte Carlo percentiles of many VeRa .TAB files in parallel.
+    @staticmethod
+    def getFilteredVeRaProfilesMonteCarlo ( VeRaTABFileNames, 
+                                            startAltitude = 6098., 
+                                            endAltitude = 6154., 
+                                            filteredAltitudeLevelsStep = 1., 
+                                            numberOfRealisations = 1000, 
+                                            percentiles = (2.5, 16., 50., 84., 97.5), 
+                                            randomSeed = None, 
+                                            numberOfProcesses = 4, 
+                                            cacheDirectory = '' ):
+        '''
+        :param VeRaTABFileNames: top directory of a tree with VeRa .TAB files, or a list of .TAB file names (and paths).
+        :type VeRaTABFileNames: str or list [str]
+
+        :param randomSeed: seed for the whole run, default = None. With a seed the result does not depend on  numberOfProcesses .
+        :type randomSeed: int
+
+        :param numberOfProcesses: number of worker processes, default = 4. With 1 all profiles are handled in the current process.
+        :type numberOfProcesses: int
+
+        :return: VeRaProfilesPercentiles, profileIDs, radii
+        :rtype: NumPy array (numberOfProfiles, 3, numberOfPercentiles, numberOfFilteredLevels), list [str], 1D NumPy array (numberOfFilteredLevels)
+        
+        **Description:**
+        :py:meth:`~.getFilteredVeRaProfileMonteCarlo` for all profiles, distributed over  numberOfProcesses  worker processes, in the same order as
+        :py:meth:`~.getFilteredVeRaProfiles`. The other parameters are those of :py:meth:`~.getFilteredVeRaProfileMonteCarlo`. 
+        Each profile gets its own independent random stream, spawned from  randomSeed . Profiles of files that cannot be read are all NaN.
+        '''
+
+        if filteredAltitudeLevelsStep <= 0 or (endAltitude - startAltitude) < filteredAltitudeLevelsStep:
         
             print ()
-            print ( ' WARNING: difference between start and end altitudes needs to be larger than filteredAltitudeLevelsStep {}km.'.format (filteredAltitudeLevelsStep) )
+            print ( ' WARNING: filteredAltitudeLevelsStep has to be larger than 0km and smaller than the difference between start and end altitudes.' )
             
-            return None, None
+            return None, None, None
             
             
-        # Calculate altitude levels evenly spaced in km and average inside each altitude bin.
+        if type (VeRaTABFileNames) == str:
+        
+            VeRaTABFileNames = HandyTools.getFilesInDirectoryTree (VeRaTABFileNames, extension = 'TAB')
+            
+        VeRaTABFileNames = sorted (VeRaTABFileNames)
+        profileIDs = [ os.path.basename (VeRaTABFileName).split ('.')[0]  for VeRaTABFileName in VeRaTABFileNames ]
+        
         numberOfFilteredLevels = int ( (endAltitude - startAltitude) / filteredAltitudeLevelsStep )
-
-        # Create the NumPy array that will contain the resulting profiles.
-        VeRaProfileFiltered = np.zeros ( (10, numberOfFilteredLevels) )
+        radii = startAltitude + np.arange (numberOfFilteredLevels) * filteredAltitudeLevelsStep
+        VeRaProfilesPercentiles = np.empty ( ( len (VeRaTABFileNames), 3, len (percentiles), numberOfFilteredLevels ) )
+        
+        numberOfProfiles = len (VeRaTABFileNames)
+        taskArguments = [ VeRaTABFileNames, [startAltitude] * numberOfProfiles, [endAltitude] * numberOfProfiles, [filteredAltitudeLevelsStep] * numberOfProfiles,
+                          [numberOfRealisations] * numberOfProfiles, [percentiles] * numberOfProfiles, 
+                          np.random.SeedSequence (randomSeed).spawn (numberOfProfiles), [cacheDirectory] * numberOfProfiles ]
+                          
+        if numberOfProcesses > 1 and numberOfProfiles > 1:
+        
+            with concurrent.futures.ProcessPoolExecutor ( max_workers = numberOfProcesses ) as workerPool:
+            
+                for iProfile, VeRaProfilePercentiles in enumerate ( workerPool.map ( VeRaTools.getFilteredVeRaProfileMonteCarloOnly, *taskArguments, 
+                                                                                     chunksize = max ( 1, numberOfProfiles // (4 * numberOfProcesses) ) ) ):
                 
-        # Calculate the values for each level.      
-        for iFilteredAltitudeLevel in range (numberOfFilteredLevels):
-                       
-            VeRaProfileFiltered [0][iFilteredAltitudeLevel] = startAltitude + iFilteredAltitudeLevel
+                    VeRaProfilesPercentiles [iProfile] = VeRaProfilePercentiles
+                    
+        else:
+        
+            for iProfile, VeRaProfilePercentiles in enumerate ( map ( VeRaTools.getFilteredVeRaProfileMonteCarloOnly, *taskArguments ) ):
             
-            iLevelsToAverage = \
-             np.where ( np.logical_and ( VeRaProfileOriginal [0] > VeRaProfileFiltered [0][iFilteredAltitudeLevel] - ( filteredAltitudeLevelsStep / 2 ),
-                                         VeRaProfileOriginal [0] < VeRaProfileFiltered [0][iFilteredAltitudeLevel] + ( filteredAltitudeLevelsStep / 2 ) ) )[0]
-
+                VeRaProfilesPercentiles [iProfile] = VeRaProfilePercentiles
+        
+        
+        return VeRaProfilesPercentiles, profileIDs, radii
 
-            # The number of levels in the filtered profiles.
-            VeRaProfileFiltered [9][iFilteredAltitudeLevel] = len (iLevelsToAverage)
 
-            # Loop over the filtered levels.
-            if VeRaProfileFiltered [9][iFilteredAltitudeLevel] > 1:              
 
-                # Average temperature and pressure and their uncertainty estimates (standard deviation).
-                VeRaProfileFiltered [1][iFilteredAltitudeLevel], VeRaProfileFiltered [2][iFilteredAltitudeLevel], variance = \
-                    DataTools.getAverageVarAndSDPYtoCPP ( VeRaProfileOriginal [1][iLevelsToAverage] )            
-                VeRaProfileFiltered [3][iFilteredAltitudeLevel], VeRaProfileFiltered [4][iFilteredAltitudeLevel], variance = \
-                    DataTools.getAverageVarAndSDPYtoCPP ( VeRaProfileOriginal [3][iLevelsToAverage] )
+    # Worker of  getFilteredVeRaProfilesMonteCarlo : only the percentiles, NaN when the file cannot be read.
+    @staticmethod
+    def getFilteredVeRaProfileMonteCarloOnly ( VeRaTABFileName, startAltitude, endAltitude, filteredAltitudeLevelsStep, numberOfRealisations, percentiles, 
+                                               randomSeed, cacheDirectory ):
+        '''
+        :return: VeRaProfilePercentiles, see :py:meth:`~.getFilteredVeRaProfileMonteCarlo`; all NaN when the file cannot be read.
+        :rtype: NumPy array (3, numberOfPercentiles, numberOfFilteredLevels)
+        '''
         
+        try:
         
-                # Average latitude and longitude.
-                VeRaProfileFiltered [5][iFilteredAltitudeLevel] = DataTools.getAverageVarAndSDPYtoCPP ( VeRaProfileOriginal [5][iLevelsToAverage] )[0]
-                VeRaProfileFiltered [6][iFilteredAltitudeLevel] = DataTools.getAverageVarAndSDPYtoCPP ( VeRaProfileOriginal [6][iLevelsToAverage] )[0]
-
+            return VeRaTools.getFilteredVeRaProfileMonteCarlo ( VeRaTABFileName, startAltitude, endAltitude, filteredAltitudeLevelsStep, numberOfRealisations, 
+                                                                percentiles, randomSeed, cacheDirectory = cacheDirectory ) [0]
             
-            # In case there is only one level within the altitude bin, take the value corresponding to this level.
-            elif VeRaProfileFiltered [9][iFilteredAltitudeLevel] == 1:
+        except (OSError, ValueError, IndexError) as readError:
+        
+            print ()
+            print ( ' WARNING: could not read {}: {}'.format (VeRaTABFileName, readError) )
             
-                VeRaProfileFiltered [1][iFilteredAltitudeLevel] = VeRaProfileOriginal [1][iLevelsToAverage]
-                VeRaProfileFiltered [2][iFilteredAltitudeLevel] = np.nan
+            return np.full ( ( 3, len (percentiles), int ( (endAltitude - startAltitude) / filteredAltitudeLevelsStep ) ), np.nan )
 
-                VeRaProfileFiltered [3][iFilteredAltitudeLevel] = VeRaProfileOriginal [3][iLevelsToAverage]
-                VeRaProfileFiltered [4][iFilteredAltitudeLevel] = np.nan
- 
-                VeRaProfileFiltered [5][iFilteredAltitudeLevel] = VeRaProfileOriginal [5][iLevelsToAverage]
-                VeRaProfileFiltered [6][iFilteredAltitudeLevel] = VeRaProfileOriginal [6][iLevelsToAverage]
-            
-            # In case there are no levels in the altitude bin, set all values to NaN.
-            else:
 
-                VeRaProfileFiltered [1][iFilteredAltitudeLevel] = np.nan
-                VeRaProfileFiltered [2][iFilteredAltitudeLevel] = np.nan
 
-                VeRaProfileFiltered [3][iFilteredAltitudeLevel] = np.nan
-                VeRaProfileFiltered [4][iFilteredAltitudeLevel] = np.nan
- 
-                VeRaProfileFiltered [5][iFilteredAltitudeLevel] = np.nan
-                VeRaProfileFiltered [6][iFilteredAltitudeLevel] = np.nan
-            
-                                
+    # Concatenate VeRa profiles of different lengths into one array with an offsets index.
+    @staticmethod
+    def concatenateVeRaProfiles (VeRaProfilesOriginal):
+        '''
+        :param VeRaProfilesOriginal: list of profiles as returned by :py:meth:`~.readVeRaTAB`.
+        :type VeRaProfilesOriginal: list [NumPy array (7, numberOfLevels)]
+
+        :return: VeRaProfilesConcatenated, offsets
+        :rtype: NumPy array (7, total number of levels), 1D NumPy array (numberOfProfiles + 1)
+        
+        **Description:**
+        Profile  i  is  VeRaProfilesConcatenated [:, offsets [i] : offsets [i + 1] ] .
+        '''
+        
+        offsets = np.zeros ( len (VeRaProfilesOriginal) + 1, dtype = np.int64 )
+        offsets [1:] = np.cumsum ( [ np.shape (VeRaProfileOriginal) [1]  for VeRaProfileOriginal in VeRaProfilesOriginal ] )
+        
+        if not len (VeRaProfilesOriginal):
+        
+            return np.zeros ( (7, 0) ), offsets
+        
+        return np.concatenate (VeRaProfilesOriginal, axis = 1), offsets
+
+
+
+    # Interpolate many VeRa profiles onto a common pressure grid in one go.
+    @staticmethod
+    def getVeRaProfilesOnPressureLevels (VeRaProfilesOriginal, pressureLevels, offsets = None):
+        '''
+        :param VeRaProfilesOriginal: list of profiles as returned by :py:meth:`~.readVeRaTAB`, or the concatenated profiles with  offsets , see :py:meth:`~.concatenateVeRaProfiles`.
+        :type VeRaProfilesOriginal: list [NumPy array (7, numberOfLevels)] or NumPy array (7, total number of levels)
+
+        :param pressureLevels: pressure levels (bar) to interpolate to.
+        :type pressureLevels: 1D NumPy array (numberOfPressureLevels)
+
+        :param offsets: start of each profile in the concatenated profiles plus the total number of levels, default = None (VeRaProfilesOriginal is a list).
+        :type offsets: 1D NumPy array (numberOfProfiles + 1)
+
+        :return: VeRaProfilesOnPressureLevels
+        :rtype: NumPy array (numberOfProfiles, 7, numberOfPressureLevels)
+        
+        **Description:**
+        Interpolate the radius, temperature, 1-sigma temperature, 1-sigma pressure, latitude and longitude of all profiles linearly in log-pressure onto  
+        pressureLevels . The rows are the same as those of :py:meth:`~.readVeRaTAB`, with row [3] equal to  pressureLevels . 
+        
+        All profiles are handled in one batched operation: the levels of all profiles are sorted once on (profile, log-pressure), and the two
+        neighbouring levels of each (profile, pressure level) pair are found with a single  np.searchsorted . Pressure levels outside the range of a profile 
+        get NaN (no extrapolation). Longitudes are interpolated continuously across the 0˚ meridian and returned from 0˚ through 360˚.
+        '''
+        
+        if offsets is None:
+        
+            VeRaProfilesOriginal, offsets = VeRaTools.concatenateVeRaProfiles (VeRaProfilesOriginal)
             
-        # dT/dz [7] and corresponding uncertainty estimate [8].           
-        for iFilteredAltitudeLevel in range (numberOfFilteredLevels - 1):
+        VeRaProfilesOriginal = np.asarray (VeRaProfilesOriginal, dtype = float)
+        offsets = np.asarray (offsets)
+        numberOfProfiles = len (offsets) - 1
+        logPressureLevels = np.log ( np.asarray (pressureLevels, dtype = float) )
+        
+        # Profile of each level; levels without a valid pressure are left out.
+        iProfileOfLevels = np.repeat ( np.arange (numberOfProfiles), np.diff (offsets) )
+        validLevels = np.logical_and ( np.isfinite ( VeRaProfilesOriginal [3] ), VeRaProfilesOriginal [3] > 0 )
         
-            VeRaProfileFiltered [7][iFilteredAltitudeLevel] = \
-             ( VeRaProfileFiltered [1][iFilteredAltitudeLevel + 1] - VeRaProfileFiltered [1][iFilteredAltitudeLevel] ) / filteredAltitudeLevelsStep
+        # Longitudes made continuous within each profile (no jumps of 360˚), so they can be interpolated.
+        longitudes = VeRaProfilesOriginal [6].copy ()
+        longitudeJumps = np.zeros_like (longitudes)
+        longitudeJumps [1:] = -360 * np.round ( np.diff (longitudes) / 360 )
+        longitudeJumps [ offsets [:-1][ offsets [:-1] < len (longitudes) ] ] = 0
+        longitudeJumps = np.nan_to_num (longitudeJumps)
+        cumulativeLongitudeJumps = np.cumsum (longitudeJumps)
+        longitudes += cumulativeLongitudeJumps - np.repeat ( cumulativeLongitudeJumps [ offsets [:-1][ np.diff (offsets) > 0 ] ], np.diff (offsets) [ np.diff (offsets) > 0 ] )
 
-            VeRaProfileFiltered [8][iFilteredAltitudeLevel] = \
-             np.sqrt ( VeRaProfileFiltered [2][iFilteredAltitudeLevel + 1]**2 + VeRaProfileFiltered [2][iFilteredAltitudeLevel]**2 ) / filteredAltitudeLevelsStep
-             
+        # Sort key that increases with log-pressure within each profile and between profiles.
+        logPressures = np.log ( VeRaProfilesOriginal [3][validLevels] )
+        logPressureMinimum = min ( logPressures.min ()  if len (logPressures)  else 0, logPressureLevels.min () )
+        logPressureRange = max ( logPressures.max ()  if len (logPressures)  else 0, logPressureLevels.max () ) - logPressureMinimum + 1
         
-        VeRaProfileFiltered [7][numberOfFilteredLevels - 1] = VeRaProfileFiltered [7][numberOfFilteredLevels - 2]
+        sortKeys = iProfileOfLevels [validLevels] * logPressureRange + ( logPressures - logPressureMinimum )
+        iSorted = np.argsort (sortKeys, kind = 'stable')
+        sortKeys = sortKeys [iSorted]
+        
+        VeRaProfilesSorted = np.stack ( [ VeRaProfilesOriginal [0], VeRaProfilesOriginal [1], VeRaProfilesOriginal [2], VeRaProfilesOriginal [4], 
+                                          VeRaProfilesOriginal [5], longitudes ] ) [:, validLevels][:, iSorted]
+        validLevelsPerProfile = np.bincount ( iProfileOfLevels [validLevels], minlength = numberOfProfiles )
+        validOffsets = np.concatenate ( ( [0], np.cumsum (validLevelsPerProfile) ) )
+        
+        # Neighbouring levels of all (profile, pressure level) pairs.
+        targetKeys = np.arange (numberOfProfiles) [:, None] * logPressureRange + ( logPressureLevels - logPressureMinimum ) [None, :]
+        iRight = np.searchsorted (sortKeys, targetKeys, side = 'right')
+        iLeft = iRight - 1
+        profileStarts = validOffsets [:-1][:, None]
+        profileEnds = validOffsets [1:][:, None]
+        
+        insideProfile = np.logical_and ( iLeft >= profileStarts, np.logical_or ( iRight < profileEnds, sortKeys [ np.clip (iLeft, 0, None) ] == targetKeys  if len (sortKeys)  else False ) )
+        iLeft = np.clip (iLeft, 0, max (0, len (sortKeys) - 1) )
+        iRight = np.where ( iRight < profileEnds, iRight, iLeft )
+        
+        with np.errstate (invalid = 'ignore', divide = 'ignore'):
+        
+            weights = np.where ( iRight > iLeft, ( targetKeys - sortKeys [iLeft] ) / ( sortKeys [iRight] - sortKeys [iLeft] ), 0. )  if len (sortKeys)  else np.zeros (targetKeys.shape)
+            
+        
+        VeRaProfilesOnPressureLevels = np.full ( (numberOfProfiles, 7, len (logPressureLevels)), np.nan )
+        if len (sortKeys):
+        
+            interpolatedValues = VeRaProfilesSorted [:, iLeft] * (1 - weights) + VeRaProfilesSorted [:, iRight] * weights
+            interpolatedValues [:, ~insideProfile] = np.nan
+            
+            VeRaProfilesOnPressureLevels [:, [0, 1, 2, 4, 5, 6] ] = interpolatedValues.transpose (1, 0, 2)
+            VeRaProfilesOnPressureLevels [:, 6] = np.mod ( VeRaProfilesOnPressureLevels [:, 6], 360 )
+            
+        VeRaProfilesOnPressureLevels [:, 3] = pressureLevels
+        
+        return VeRaProfilesOnPressureLevels
 
 
-        return VeRaProfileFiltered, numberOfFilteredLevels, VeRaProfileOriginal, numberOfOriginalLevels
+
+    # Create a memory-mapped store of the original profiles of many VeRa .TAB files.
+    @staticmethod
+    def createVeRaProfileStore (storeDirectory, VeRaTABFileNames):
+        '''
+        :param storeDirectory: directory of the store. It is created if it does not exist; an existing store is overwritten.
+        :type storeDirectory: str
+
+        :param VeRaTABFileNames: top directory of a tree with VeRa .TAB files, or a list of .TAB file names (and paths).
+        :type VeRaTABFileNames: str or list [str]
+
+        :return: the store
+        :rtype: VeRaProfileStore
+        
+        **Description:**
+        Read all .TAB files with :py:meth:`~.readVeRaTAB` (in the order of the sorted file names) and write the profiles one after the other to a single 
+        binary file, with an offsets index and per-profile metadata (see :py:class:`~.VeRaProfileStore`). The profiles are appended one at a time, so only one
+        profile is in memory while the store is written. The metadata has the fields 'profileID' (file name without extension), 'fileName', 'numberOfLevels', 
+        'radiusMinimum', 'radiusMaximum' (km), 'latitude' and 'longitude' (˚, average of the levels). The longitude is the circular mean, from 0˚ through 360˚, 
+        so that a profile crossing the 0˚ meridian gets a longitude near 0˚ instead of 180˚.
+        '''
+        
+        if type (VeRaTABFileNames) == str:
+        
+            VeRaTABFileNames = HandyTools.getFilesInDirectoryTree (VeRaTABFileNames, extension = 'TAB')
+            
+        VeRaTABFileNames = sorted (VeRaTABFileNames)
+        
+        os.makedirs (storeDirectory, exist_ok = True)
+        
+        offsets = np.zeros ( len (VeRaTABFileNames) + 1, dtype = np.int64 )
+        metadata = np.zeros ( len (VeRaTABFileNames), dtype = [ ('profileID', 'U{}'.format ( max ( [1] + [ len ( os.path.basename (VeRaTABFileName) ) for VeRaTABFileName in VeRaTABFileNames ] ) ) ), 
+                                                                ('fileName', 'U{}'.format ( max ( [1] + [ len (VeRaTABFileName) for VeRaTABFileName in VeRaTABFileNames ] ) ) ), 
+                                                                ('numberOfLevels', 'i8'), ('radiusMinimum', 'f8'), ('radiusMaximum', 'f8'), ('latitude', 'f8'), ('longitude', 'f8') ] )
+        
+        with open ( os.path.join (storeDirectory, 'profiles.bin'), 'wb' ) as fileOpen:
+        
+            for iProfile, VeRaTABFileName in enumerate (VeRaTABFileNames):
+            
+                VeRaProfileOriginal, numberOfLevels = VeRaTools.readVeRaTAB (VeRaTABFileName)
+                
+                # One row of 7 values per level.
+                fileOpen.write ( np.ascontiguousarray ( VeRaProfileOriginal.T, dtype = '<f8' ).tobytes () )
+                
+                offsets [iProfile + 1] = offsets [iProfile] + numberOfLevels
+                
+                # Circular mean of the longitudes, the direction of the average unit vector.
+                longitudesRadians = np.radians ( VeRaProfileOriginal [6] )
+                longitudeAverage = np.degrees ( np.arctan2 ( np.mean ( np.sin (longitudesRadians) ), np.mean ( np.cos (longitudesRadians) ) ) ) % 360  if numberOfLevels  else np.nan
+                
+                metadata [iProfile] = ( os.path.basename (VeRaTABFileName).split ('.')[0], VeRaTABFileName, numberOfLevels,
+                                        np.min ( VeRaProfileOriginal [0], initial = np.inf ), np.max ( VeRaProfileOriginal [0], initial = -np.inf ),
+                                        np.mean ( VeRaProfileOriginal [5] )  if numberOfLevels  else np.nan, longitudeAverage )
+                
         
+        np.save ( os.path.join (storeDirectory, 'offsets.npy'), offsets )
+        np.save ( os.path.join (storeDirectory, 'metadata.npy'), metadata )
+        
+        return VeRaProfileStore (storeDirectory)
+
 
 
     # Create the table with the name  tableFileName  from the list of .TXT files present in the  topDirectory .
     @staticmethod
-    def createVeRaProfilesTable (VeRaTableFileName, topDirectory, extension = 'TXT'):
+    def createVeRaProfilesTable (VeRaTableFileName, topDirectory, extension = 'TXT', numberOfProcesses = 1, incremental = False):
         '''
         :param VeRaTableFileName: file name for the table to be written.
         :type VeRaTableFileName: str
@@ -233,10 +1291,23 @@ class VeRaTools:
         :param extension: extension of the .TXT files, default = 'TXT'
         :type extension: str
 
+        :param numberOfProcesses: number of worker processes parsing the .TXT files, default = 1 (all files are parsed in the current process). With more 
+            processes, scripts calling this method need an  if __name__ == '__main__':  guard on platforms that start new processes with  spawn  (Windows, macOS).
+        :type numberOfProcesses: int
+
+        :param incremental: only parse the .TXT files that were added or changed since the previous run, default = False. This writes the state file 
+            VeRaTableFileName + '.state.json'  next to the table.
+        :type incremental: bool
+
 
         **Description**: Create the tables with the orbit IDs and information at the one-bar pressure level of the corresponding VeRa 
         temperature profiles. The information is the Day Of Year, time of observation, Local Solar Time, Latitude, Longitude, and Solar 
         Zenith Angle at the one-bar pressure level.
+        
+        With  incremental = True , the size, modification time and table line of each .TXT file are recorded in the file  VeRaTableFileName + '.state.json' , 
+        together with  VeRaProfilesTableVersion . The files that have not changed since the previous run are not parsed again; the new and changed files 
+        are parsed (in parallel with  numberOfProcesses > 1 , see :py:meth:`~.getVeRaProfilesTableLine`) and merged with the others. A state file of another 
+        version is not used. The table is always rewritten completely, sorted on file name (= orbit), with the same header and format.
         '''
     
         # Retrieve the list of .TXT files names in the sub-directories of the  topDirectory .
@@ -245,6 +1316,53 @@ class VeRaTools:
         # Go through the list and create the table.
         if listOfVeRaProfileTXTList:
         
+            # Table lines of the previous run, for the files that have not changed since.
+            stateFileName = VeRaTableFileName + '.state.json'
+            previousState = {}
+            if incremental and os.path.isfile (stateFileName):
+            
+                with open (stateFileName) as stateFileOpen:
+                
+                    stateFileContent = json.load (stateFileOpen)
+                    
+                if stateFileContent.get ('version') == VeRaProfilesTableVersion:
+                
+                    previousState = stateFileContent ['files']
+                    
+            
+            state = {}
+            listOfVeRaProfileTXTToParse = []
+            for listOfVeRaProfileTXT in sorted (listOfVeRaProfileTXTList):
+            
+                fileStatus = os.stat (listOfVeRaProfileTXT)
+                state [listOfVeRaProfileTXT] = [ fileStatus.st_size, fileStatus.st_mtime_ns, None ]
+                
+                if listOfVeRaProfileTXT in previousState and previousState [listOfVeRaProfileTXT][:2] == state [listOfVeRaProfileTXT][:2]:
+                
+                    state [listOfVeRaProfileTXT][2] = previousState [listOfVeRaProfileTXT][2]
+                    
+                else:
+                
+                    listOfVeRaProfileTXTToParse.append (listOfVeRaProfileTXT)
+                    
+                    
+            # Parse the new and changed files.
+            if numberOfProcesses > 1 and len (listOfVeRaProfileTXTToParse) > 1:
+            
+                with concurrent.futures.ProcessPoolExecutor ( max_workers = numberOfProcesses ) as workerPool:
+                
+                    tableLines = list ( workerPool.map ( VeRaTools.getVeRaProfilesTableLine, listOfVeRaProfileTXTToParse, 
+                                                         chunksize = max ( 1, len (listOfVeRaProfileTXTToParse) // (4 * numberOfProcesses) ) ) )
+                                                         
+            else:
+            
+                tableLines = [ VeRaTools.getVeRaProfilesTableLine (listOfVeRaProfileTXT)  for listOfVeRaProfileTXT in listOfVeRaProfileTXTToParse ]
+                
+            for listOfVeRaProfileTXT, tableLine in zip (listOfVeRaProfileTXTToParse, tableLines):
+            
+                state [listOfVeRaProfileTXT][2] = tableLine
+                
+            
             fileOpen = open (VeRaTableFileName, 'w')
             
             headerLines = [
@@ -262,52 +1380,18 @@ class VeRaTools:
             print (headerString, file = fileOpen)
             
                 
-            for listOfVeRaProfileTXT in sorted (listOfVeRaProfileTXTList):
+            for listOfVeRaProfileTXT in sorted (state):
             
-                content = HandyTools.getTextFileContent (listOfVeRaProfileTXT)
-                
-                # The .TXT files have a section starting with the text  'values of 1 bar level'  that contain the information extracted here.
-                iLine = 0
-                while 'values of 1 bar level' not in content [iLine]:
-    
-                    iLine += 1
-    
-                iLine += 2
-                
-                measurementTime = content [iLine].split (':  ')[-1]
-                
-                iLine += 2
-                latitudeOneBar = float ( content [iLine].split (':')[-1] )
-    
-                iLine += 1
-                longitudeOneBar = float ( content [iLine].split (':')[-1] )
- 
-                iLine += 1
-                radiusOneBar = float ( content [iLine].split (':')[-1] )
-                
-                iLine += 2
-                temperatureOneBar = float ( content [iLine].split (':')[-1] )
-                    
-                iLine += 2
-                localTrueSolarTime = float ( content [iLine].split (':')[-1] )
-                
-                iLine += 1
-                solarZenithAngle = float ( content [iLine].split (':')[-1] )
-                
-                
-                print ( '  {}       {}        {}        {:4.1f}       {:6.2f}           {:5.2f}        {:6.2f}      {:6.2f}        {:6.2f}'.
-                 format ( listOfVeRaProfileTXT.split ('/') [-2][3:7],
-                          measurementTime.split ('T')[0],
-                          measurementTime.split ('T')[-1],
-                          radiusOneBar - venusSurfaceRadius,
-                          temperatureOneBar,
-                          localTrueSolarTime, 
-                          latitudeOneBar,
-                          longitudeOneBar,
-                          solarZenithAngle ), file = fileOpen )                
+                print ( state [listOfVeRaProfileTXT][2], file = fileOpen )                
                     
             
             fileOpen.close ()
+            
+            if incremental:
+            
+                with open (stateFileName, 'w') as stateFileOpen:
+                
+                    json.dump ( { 'version': VeRaProfilesTableVersion, 'files': state }, stateFileOpen )
            
            
         else:
@@ -317,6 +1401,34 @@ class VeRaTools:
 
 
 
+    # Create the line of the VeRa profiles table for one .TXT file.
+    @staticmethod
+    def getVeRaProfilesTableLine (VeRaProfileTXTFileName):
+        '''
+        :param VeRaProfileTXTFileName: File name (and path) of the VeRa TXT file.
+        :type VeRaProfileTXTFileName: str
+
+        :return: line of the table written by :py:meth:`~.createVeRaProfilesTable`
+        :rtype: str
+        '''
+        
+        # The .TXT files have a section starting with the text  'values of 1 bar level'  that contain the information extracted here.
+        oneBarLevel = VeRaTools.readVeRaOneBarLevel (VeRaProfileTXTFileName)
+        measurementTime = oneBarLevel ['measurementTime']
+        
+        return '  {}       {}        {}        {:4.1f}       {:6.2f}           {:5.2f}        {:6.2f}      {:6.2f}        {:6.2f}'. \
+                format ( VeRaProfileTXTFileName.split ('/') [-2][3:7],
+                         measurementTime.split ('T')[0],
+                         measurementTime.split ('T')[-1],
+                         oneBarLevel ['radius'] - venusSurfaceRadius,
+                         oneBarLevel ['temperature'],
+                         oneBarLevel ['localTrueSolarTime'], 
+                         oneBarLevel ['latitude'],
+                         oneBarLevel ['longitude'],
+                         oneBarLevel ['solarZenithAngle'] )
+
+
+
     # Read the values from the VeRa tables as created by the  createVeRaProfilesTable  method.
     @staticmethod
     def readValuesFromVeRaTable (VeRaTableFileName):
@@ -368,8 +1480,54 @@ class VeRaTools:
     
     
         return orbitID, dayOfYear, timeOfDay, localSolarTime, altitude, temperature, latitude, longitude, solarZenithAngle
-  
 
 
+
+    # Read the values from the VeRa tables as created by the  createVeRaProfilesTable  method into a NumPy structured array.
+    @staticmethod
+    def readVeRaTableAsArray (VeRaTableFileName):
+        '''
+        :param VeRaTableFileName: file name for the table to be read.
+        :type VeRaTableFileName: str
+
+        :return: one record per VeRa profile
+        :rtype: NumPy structured array
+        
+        **Description**: Read a table as created by the  createVeRaProfilesTable  of this static class, like :py:meth:`~.readValuesFromVeRaTable`, but return
+        a NumPy structured array with typed columns instead of lists. The columns are converted as a whole, not line by line:
+        
+            | 'orbitID' (int)
+            | 'time' (datetime64 [ms]): date and time of the 1-bar level
+            | 'timeOfDay' (h): hour + minutes / 60 + seconds / 3600
+            | 'altitude' (km), 'temperature' (K), 'localSolarTime' (h), 'latitude' (˚), 'longitude' (˚), 'solarZenithAngle' (˚)
+            
+        Use :py:class:`~.VeRaTableIndex` for fast selections on the columns.
+        '''
+    
+        VeRaTableContent = HandyTools.getTextFileContent (VeRaTableFileName)
+    
+        iLine = 0
+        while iLine < len (VeRaTableContent) and 'C_END' not in VeRaTableContent [iLine]:
+        
+            iLine += 1
+            
+        iLine += 1
+        
+        tableColumns = np.loadtxt ( VeRaTableContent [iLine:], dtype = str, ndmin = 2 ).T
+        
+        VeRaTableValues = np.zeros ( tableColumns.shape [1], dtype = [ ('orbitID', 'i8'), ('time', 'datetime64[ms]'), ('timeOfDay', 'f8'), ('altitude', 'f8'), ('temperature', 'f8'), 
+                                                                       ('localSolarTime', 'f8'), ('latitude', 'f8'), ('longitude', 'f8'), ('solarZenithAngle', 'f8') ] )
+        if not len (VeRaTableValues):
+        
+            return VeRaTableValues
+            
+        VeRaTableValues ['orbitID'] = tableColumns [0].astype (int)
+        VeRaTableValues ['time'] = np.char.add ( np.char.add (tableColumns [1], 'T'), tableColumns [2] ).astype ('datetime64[ms]')
+        VeRaTableValues ['timeOfDay'] = ( VeRaTableValues ['time'] - tableColumns [1].astype ('datetime64[D]') ) / np.timedelta64 (1, 'h')
+        
+        for iColumn, columnName in enumerate ( ['altitude', 'temperature', 'localSolarTime', 'latitude', 'longitude', 'solarZenithAngle'] ):
         
-        
\ No newline at end of file
+            VeRaTableValues [columnName] = tableColumns [iColumn + 3].astype (float)
+            
+            
+        return VeRaTableValues
@@ -17,7 +17,7 @@ sys.path.append ( os.path.abspath ('..') )
 sys.path.append ( os.path.abspath ('../VeRaTools') )
 sys.path.append ( os.path.abspath ('../VMCTools') )
 
-autodoc_mock_imports = ['HandyTools', 'DataTools', 'planetaryimage']
+autodoc_mock_imports = ['HandyTools', 'planetaryimage']
 
 
 # -- Project information -----------------------------------------------------
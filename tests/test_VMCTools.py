@@ -0,0 +1,991 @@
+import os
+import sys
+import threading
+
+import numpy as np
+import pytest
+
+pytest.importorskip ('HandyTools')
+pytest.importorskip ('planetaryimage')
+
+sys.path.insert ( 0, os.path.join ( os.path.dirname (__file__), '..', 'VMCTools' ) )
+from VMCTools import VMCTools, KhatuntsevWindModel, VMCGeoCubeIndex, VMCMosaic, VMCClimatology
+from planetaryimage import PDS3Image
+
+
+
+# Write a synthetic VMC .IMG and .GEO file pair: a 512 x 512 image and a geocube of five planes with a disk of radius 240 pixels.
+def writeVMCImageAndGeoCube (VMCImageFileName, orbitNumber = 2700, radianceScalingFactor = 1.5e-4, seed = 0, bandStorageType = 'BAND_SEQUENTIAL', endStatement = 'END', 
+                             startTime = '2008-05-01T12:00:00.000', longitudeRange = (-180., 180.), subSolarLongitude = None ):
+
+    randomGenerator = np.random.default_rng (seed)
+    VMCImageData = randomGenerator.integers ( 0, 4000, (512, 512) ).astype ('>u2')
+    
+    label = '\n'.join ( [ 'PDS_VERSION_ID = PDS3', 'RECORD_TYPE = FIXED_LENGTH', 'RECORD_BYTES = 1024', 'LABEL_RECORDS = 2', '^IMAGE = 3', 
+                           'ORBIT_NUMBER = {}'.format (orbitNumber), 'START_TIME = {}'.format (startTime), 'FILTER_NAME = "VEN-UV"', 
+                           'RADIANCE_SCALING_FACTOR = {} <W/m**3/sr>'.format (radianceScalingFactor), 
+                           *( []  if subSolarLongitude is None  else [ 'SUB_SOLAR_LONGITUDE = {} <deg>'.format (subSolarLongitude) ] ), 
+                           'OBJECT = IMAGE', '  LINES = 512', '  LINE_SAMPLES = 512', '  SAMPLE_TYPE = MSB_UNSIGNED_INTEGER', '  SAMPLE_BITS = 16', 
+                           'END_OBJECT = IMAGE', endStatement, '' ] )
+    
+    with open (VMCImageFileName + '.IMG', 'wb') as fileOpen:
+    
+        fileOpen.write ( label.encode ().ljust (2048, b' ') + VMCImageData.tobytes () )
+        
+    # Incidence, emission and phase angles, latitudes and longitudes (in  longitudeRange ) on the disk, -1000 off the disk.
+    iLines, iSamples = np.mgrid [0:512, 0:512]
+    radii = np.hypot (iLines - 256, iSamples - 256) / 240 * ( 1 + 0.05 * randomGenerator.random () )
+    VMCGeoCubeData = np.stack ( [ np.where (radii < 1, values, -1000.)  for values in [ radii * 100, radii * 80, 50 + radii, -90 + iLines / 512 * 90, longitudeRange [0] + iSamples / 512 * ( longitudeRange [1] - longitudeRange [0] ) ] ] ).astype ('<f4')
+    
+    if bandStorageType == 'SAMPLE_INTERLEAVED':
+    
+        VMCGeoCubeData = VMCGeoCubeData.transpose (1, 2, 0)
+        
+    elif bandStorageType == 'LINE_INTERLEAVED':
+    
+        VMCGeoCubeData = VMCGeoCubeData.transpose (1, 0, 2)
+        
+    geoLabel = '\n'.join ( [ 'PDS_VERSION_ID = PDS3', 'RECORD_TYPE = FIXED_LENGTH', 'RECORD_BYTES = 2048', 'LABEL_RECORDS = 1', '^IMAGE = 2', 'OBJECT = IMAGE', 
+                              '  BANDS = 5', '  BAND_STORAGE_TYPE = {}'.format (bandStorageType), '  LINES = 512', '  LINE_SAMPLES = 512', 
+                              '  SAMPLE_TYPE = PC_REAL', '  SAMPLE_BITS = 32', 'END_OBJECT = IMAGE', endStatement, '' ] )
+    
+    with open (VMCImageFileName + '.GEO', 'wb') as fileOpen:
+    
+        fileOpen.write ( geoLabel.encode ().ljust (2048, b' ') + np.ascontiguousarray (VMCGeoCubeData).tobytes () )
+
+
+
+def test_getWindAdvectedBoxes_broadcastMatchesScalar ():
+
+    # Soundings of shape (2, 1) against time differences of shape (3,), one of them crossing the 0˚ meridian.
+    latitudes = np.array ( [ [-60.], [-20.] ] )
+    longitudes = np.array ( [ [4.6], [200.] ] )
+    timeDifferences = np.array ( [-5., 1., 12.] )
+    
+    latitudeCentres, latitudeLimits, longitudeCentres, longitudeLimits = VMCTools.getWindAdvectedBoxes (latitudes, longitudes, timeDifferences)
+    
+    assert latitudeCentres.shape == (2, 3)
+    assert latitudeLimits.shape == (2, 3, 2)
+    assert longitudeCentres.shape == (2, 3)
+    assert longitudeLimits.shape == (2, 3, 2, 2)
+    
+    for iSounding in range (2):
+    
+        for iTime in range (3):
+        
+            latitudeCentre, latitudeLimit, longitudeCentre, longitudeLimit = VMCTools.getWindAdvectedBox ( latitudes [iSounding, 0], longitudes [iSounding, 0], 
+                                                                                                        timeDifferences [iTime] )
+            
+            np.testing.assert_allclose ( latitudeCentres [iSounding, iTime], latitudeCentre )
+            np.testing.assert_allclose ( latitudeLimits [iSounding, iTime], latitudeLimit )
+            np.testing.assert_allclose ( longitudeCentres [iSounding, iTime], longitudeCentre )
+            np.testing.assert_allclose ( longitudeLimits [iSounding, iTime], longitudeLimit )
+
+
+
+# The zonal and meridional winds (m/s) of the Khatuntsev et al. (2013) parametrisation as branches on latitude, as  getWindAdvectedBox  had them before  VMCWindModel .
+def getKhatuntsevWindsWithBranches (latitude):
+
+    if latitude <= -50:
+    
+        zonalWind = -94 - (latitude + 50) * (65.6 / 25)
+        
+    elif latitude <= -40 and latitude >= -50:
+    
+        zonalWind = -101.5 - (latitude + 40) * (7.5 / 10)
+        
+    elif latitude <= -15 and latitude >= -40:
+    
+        zonalWind = -93 + (latitude + 15) * (8.5 / 35)
+        
+    else:
+    
+        zonalWind = -93.
+        
+    if latitude <= -75:
+    
+        meridionalWind = 0.
+        
+    elif latitude <= -50 and latitude > -75:
+    
+        meridionalWind = -9.58 - (latitude + 50) * (9.38 / 25)
+        
+    elif latitude <= -20 and latitude > -50:
+    
+        meridionalWind = -6.5 + (latitude + 20) * (3.08 / 30)
+        
+    else:
+    
+        meridionalWind = -3.26 + latitude * (3.24 / 20)
+        
+    return zonalWind, meridionalWind
+
+
+
+@pytest.mark.parametrize ( 'latitude', [-89., -75.5, -75., -74.5, -60., -50.5, -50., -49.5, -45., -40.5, -40., -39.5, -30., -20.5, -20., -19.5, -15.5, -15., -14.5, 0., 45.] )
+def test_KhatuntsevWindModel_matchesBranches (latitude):
+
+    zonalWind, meridionalWind = getKhatuntsevWindsWithBranches (latitude)
+    np.testing.assert_allclose ( KhatuntsevWindModel.getWinds (latitude) [:2], [zonalWind, meridionalWind], rtol = 1e-12, atol = 1e-12 )
+    
+    # The box centres as computed with the branches, away from the meridians.
+    timeDifferenceHours = 3.
+    latitudeCentre, latitudeLimits, longitudeCentre, longitudeLimits = VMCTools.getWindAdvectedBox (latitude, 180., timeDifferenceHours)
+    
+    degreesLatitudePerMetre = 180 / ( np.pi * (6052 + 70) * 1000 )
+    np.testing.assert_allclose ( latitudeCentre, latitude + degreesLatitudePerMetre * timeDifferenceHours * 3600 * meridionalWind, rtol = 1e-12 )
+    np.testing.assert_allclose ( longitudeCentre, 180 + degreesLatitudePerMetre / np.cos ( np.pi * latitude / 180 ) * timeDifferenceHours * 3600 * zonalWind, rtol = 1e-12 )
+    np.testing.assert_allclose ( np.diff (longitudeLimits [0]), 2 * degreesLatitudePerMetre / np.cos ( np.pi * latitude / 180 ) * timeDifferenceHours * 3600 * 20, rtol = 1e-12 )
+
+
+
+# Smooth random field on a periodic grid, and the same field moved by  shift  (rows, columns) grid cells.
+def getShiftedFields (gridSize, shift, seed = 0):
+
+    randomGenerator = np.random.default_rng (seed)
+    frequencies = np.fft.fftfreq (gridSize)
+    
+    fieldSpectrum = np.fft.fft2 ( randomGenerator.standard_normal ( (gridSize, gridSize) ) ) * \
+                    np.exp ( - ( frequencies [:, np.newaxis]**2 + frequencies [np.newaxis, :]**2 ) / (2 * 0.08**2) )
+    shiftPhases = np.exp ( -2j * np.pi * ( frequencies [:, np.newaxis] * shift [0] + frequencies [np.newaxis, :] * shift [1] ) )
+    
+    return np.fft.ifft2 (fieldSpectrum).real, np.fft.ifft2 (fieldSpectrum * shiftPhases).real
+
+
+
+@pytest.mark.parametrize ( 'shift, numberOfPasses', [ ( (3., -5.), 1 ), ( (2.4, -1.7), 2 ), ( (9.6, -10.3), 3 ) ] )
+def test_getCloudTrackingDisplacements_knownShift (shift, numberOfPasses):
+
+    # Positive displacements are towards larger row and column indices in the second image.
+    VMCGrid1, VMCGrid2 = getShiftedFields (128, shift)
+    
+    templateCentreRows, templateCentreColumns, rowDisplacements, columnDisplacements, peakCorrelations = \
+        VMCTools.getCloudTrackingDisplacements (VMCGrid1, VMCGrid2, templateSize = 32, templateStep = 16, numberOfPasses = numberOfPasses)
+        
+    assert rowDisplacements.shape == columnDisplacements.shape == ( len (templateCentreRows), len (templateCentreColumns) )
+    assert np.abs ( np.nanmedian (rowDisplacements) - shift [0] ) < 0.1
+    assert np.abs ( np.nanmedian (columnDisplacements) - shift [1] ) < 0.1
+
+
+
+def test_getCloudTrackingDisplacements_multipassRefinement ():
+
+    # A large shift is underestimated in one pass, the next passes move the templates with the clouds.
+    VMCGrid1, VMCGrid2 = getShiftedFields ( 128, (9.6, -10.3) )
+    
+    medianErrors = []
+    for numberOfPasses in [1, 3]:
+    
+        rowDisplacements, columnDisplacements = VMCTools.getCloudTrackingDisplacements (VMCGrid1, VMCGrid2, 32, 16, numberOfPasses = numberOfPasses) [2:4]
+        medianErrors.append ( np.abs ( np.nanmedian (rowDisplacements) - 9.6 ) + np.abs ( np.nanmedian (columnDisplacements) + 10.3 ) )
+        
+    assert medianErrors [1] < 0.1 < medianErrors [0]
+
+
+
+def test_getCloudTrackingDisplacements_templatesMovedOntoNoData ():
+
+    # No data in the right part of both images; in the second pass some templates are moved into it.
+    VMCGrid1, VMCGrid2 = getShiftedFields ( 64, (0., 6.) )
+    VMCGrid1 [:, 40:] = np.nan
+    VMCGrid2 [:, 40:] = np.nan
+    
+    columnDisplacements = [ VMCTools.getCloudTrackingDisplacements (VMCGrid1, VMCGrid2, 16, 8, numberOfPasses = numberOfPasses) [3]  for numberOfPasses in [1, 2, 3] ]
+    
+    for iPass in [1, 2]:
+    
+        np.testing.assert_array_equal ( np.isfinite ( columnDisplacements [iPass] ), np.isfinite ( columnDisplacements [0] ) )
+
+
+
+def test_VMCPhotometryStack_matchesVMCPhotometry (tmp_path):
+
+    VMCImages = []
+    VMCGeoCubes = []
+    radianceScalingFactors = []
+    orbitNumbers = []
+    VMCPhotometryResults = []
+    for iImage, orbitNumber in enumerate ( [600, 2700, 2811] ):
+    
+        writeVMCImageAndGeoCube ( str ( tmp_path / 'V{:04d}_0001_UV2'.format (orbitNumber) ), orbitNumber = orbitNumber, radianceScalingFactor = 1e-4 * (iImage + 1), seed = iImage )
+        VMCImage, VMCImageFlattened, VMCGeoCube, VMCGeoArraysFlattened = VMCTools.readVMCImageAndGeoCubeMemoryMapped ( str ( tmp_path / 'V{:04d}_0001_UV2.IMG'.format (orbitNumber) ) )
+        
+        VMCImages.append ( np.array (VMCImage.image) )
+        VMCGeoCubes.append ( np.array (VMCGeoCube.data) )
+        radianceScalingFactors.append ( VMCImage.label ['RADIANCE_SCALING_FACTOR'].value )
+        orbitNumbers.append ( VMCImage.label ['ORBIT_NUMBER'] )
+        VMCPhotometryResults.append ( VMCTools.VMCPhotometry (VMCImage, VMCImageFlattened, VMCGeoCube, VMCGeoArraysFlattened, incidenceAngleLimit = 70, silent = True) )
+        
+    VMCPhotometryStackResults = VMCTools.VMCPhotometryStack ( np.stack (VMCImages), np.stack (VMCGeoCubes), radianceScalingFactors, orbitNumbers, 
+                                                              incidenceAngleLimit = 70, silent = True )
+    
+    for iImage in range (3):
+    
+        np.testing.assert_allclose ( VMCPhotometryStackResults [1][iImage], VMCPhotometryResults [iImage][1], rtol = 1e-6 )
+        
+        for iResult in range (2, 9):
+        
+            np.testing.assert_allclose ( VMCPhotometryStackResults [iResult][iImage], VMCPhotometryResults [iImage][iResult], rtol = 1e-9 )
+            
+            
+    # An empty stack.
+    VMCPhotometryStackResults = VMCTools.VMCPhotometryStack ( np.zeros ( (0, 512, 512) ), np.zeros ( (0, 5, 512, 512) ), [], [], silent = False )
+    
+    assert VMCPhotometryStackResults [0].shape == (0, 512, 512)
+    assert len ( VMCPhotometryStackResults [2] ) == 0
+
+
+
+def test_getVMCImageStatistics_matchesNumPy ():
+
+    randomGenerator = np.random.default_rng (1)
+    VMCGeoArraysFlattened = [ randomGenerator.uniform (-5, 185, 10000)  for iPlane in range (5) ]
+    VMCImageCalibratedFlattened = randomGenerator.normal (0.5, 0.5, 10000)
+    
+    # Off-disk pixels are -1; valid pixels with a negative radiance factor are kept.
+    VMCImageCalibratedFlattened [::7] = -1.
+    onDiskValid = VMCImageCalibratedFlattened != -1
+    assert np.any ( VMCImageCalibratedFlattened [onDiskValid] < 0 )
+    
+    quantiles = (0.1, 0.5, 0.9)
+    histogramRanges = ( (0., 90.), (0., 90.), (0., 180.), (0., 2.) )
+    statistics, histograms, binEdges = VMCTools.getVMCImageStatistics ( VMCImageCalibratedFlattened, VMCGeoArraysFlattened, quantiles = quantiles, 
+                                                                        histogramRanges = histogramRanges, numberOfHistogramBins = 45 )
+    
+    for iVariable, values in enumerate ( VMCGeoArraysFlattened [:3] + [VMCImageCalibratedFlattened] ):
+    
+        validValues = values [onDiskValid]
+        numpyHistogram, numpyBinEdges = np.histogram ( validValues, bins = 45, range = histogramRanges [iVariable] )
+        
+        assert statistics [iVariable, 0] == len (validValues)
+        np.testing.assert_allclose ( statistics [iVariable, 1:5], [ validValues.mean (), validValues.std (ddof = 1), validValues.min (), validValues.max () ], rtol = 1e-12 )
+        np.testing.assert_allclose ( statistics [iVariable, 5:], np.quantile (validValues, quantiles), rtol = 1e-12 )
+        np.testing.assert_array_equal ( histograms [iVariable], numpyHistogram )
+        np.testing.assert_allclose ( binEdges [iVariable], numpyBinEdges, rtol = 1e-12 )
+        
+    # Without histograms.
+    assert VMCTools.getVMCImageStatistics ( VMCImageCalibratedFlattened, VMCGeoArraysFlattened, numberOfHistogramBins = 0 ) [1].shape == (4, 0)
+
+
+
+@pytest.mark.parametrize ( 'latitudeBandWidth', [1., 2.5] )
+def test_VMCGeoCubeIndex_matchesMask (latitudeBandWidth):
+
+    # Pixels on and off the disk, with longitudes in both conventions and latitudes on the poles and on the band edges.
+    randomGenerator = np.random.default_rng (4)
+    latitudes = np.round ( randomGenerator.uniform (-90, 90, 20000), 1 )
+    longitudes = np.round ( randomGenerator.uniform (-180, 360, 20000), 1 )
+    latitudes [:50] = 90.
+    latitudes [50:100] = -90.
+    latitudes [100:150] = 10.
+    longitudes [150:200] = 0.
+    latitudes [::9] = -1000.
+    VMCGeoArraysFlattened = [ np.zeros (20000), np.zeros (20000), np.zeros (20000), latitudes.astype ('<f4'), longitudes.astype ('<f4') ]
+    
+    # The float32 planes compared in double precision, as the index does.
+    latitudesOnDisk = VMCGeoArraysFlattened [3].astype (float)
+    longitudesOnDisk = VMCGeoArraysFlattened [4].astype (float)
+    longitudesOnDisk = np.where ( np.logical_and (longitudesOnDisk >= -180, longitudesOnDisk < 0), longitudesOnDisk + 360, longitudesOnDisk )
+    
+    VMCGeoCubeIndexOfPixels = VMCGeoCubeIndex (VMCGeoArraysFlattened, latitudeBandWidth)
+    
+    # A normal box, a box across the meridian, boxes touching the poles, a box inside one latitude band and an empty box.
+    for latitudeLimits, longitudeLimits in [ ( [-40, -20], [100, 150] ), ( [-40, -20], [ [100, 150], [100, 150] ] ), ( [-70, 30], [ [340, 360], [0, 15] ] ), 
+                                             ( [85, 90], [0, 360] ), ( [-90, -88], [ [350, 360], [0, 40] ] ), ( [10, 10.6], [20, 200] ), ( [10.2, 10.6], [20, 200] ), 
+                                             ( [-10, 10], [ [200, 360], [0, 0] ] ), ( [30, 31], [400, 500] ) ]:
+    
+        longitudeRanges = np.reshape (longitudeLimits, (-1, 2))
+        iInLongitudeRanges = np.zeros (20000, dtype = bool)
+        for longitudeMinimum, longitudeMaximum in longitudeRanges:
+        
+            iInLongitudeRanges |= np.logical_and ( longitudesOnDisk >= longitudeMinimum, longitudesOnDisk <= longitudeMaximum )
+            
+        iExpected = np.where ( np.logical_and.reduce ( [ latitudesOnDisk >= latitudeLimits [0], latitudesOnDisk <= latitudeLimits [1], 
+                                                         iInLongitudeRanges ] ) ) [0]
+        
+        np.testing.assert_array_equal ( VMCGeoCubeIndexOfPixels.getPixelsInBox (latitudeLimits, longitudeLimits), iExpected )
+        
+    # The boxes touching the poles and across the meridian are not empty.
+    assert len ( VMCGeoCubeIndexOfPixels.getPixelsInBox ( [85, 90], [0, 360] ) ) > 50
+    assert len ( VMCGeoCubeIndexOfPixels.getPixelsInBox ( [-90, -88], [ [350, 360], [0, 40] ] ) ) > 0
+    assert len ( VMCGeoCubeIndexOfPixels.getPixelsInBox ( [-10, 10], [ [200, 360], [0, 0] ] ) ) > 0
+
+
+
+@pytest.mark.parametrize ( 'endStatement', ['END', 'END   ', 'END /* end of the label */'] )
+@pytest.mark.parametrize ( 'bandStorageType', ['BAND_SEQUENTIAL', 'SAMPLE_INTERLEAVED', 'LINE_INTERLEAVED'] )
+def test_readVMCImageAndGeoCubeMemoryMapped (tmp_path, endStatement, bandStorageType):
+
+    VMCImageFileName = str (tmp_path / 'V2700_0001_UV2')
+    writeVMCImageAndGeoCube (VMCImageFileName, bandStorageType = bandStorageType, endStatement = endStatement)
+    
+    label, labelSize = VMCTools.readPDS3Label (VMCImageFileName + '.IMG')
+    assert label ['IMAGE']['LINES'] == 512 and label ['RADIANCE_SCALING_FACTOR'].value == 1.5e-4
+    assert labelSize < 2048
+    
+    VMCImage, VMCImageFlattened, VMCGeoCube, VMCGeoArraysFlattened = VMCTools.readVMCImageAndGeoCubeMemoryMapped (VMCImageFileName)
+    
+    # The data as written, after the label records.
+    VMCImageData = np.fromfile ( VMCImageFileName + '.IMG', dtype = '>u2', offset = 2048 ).reshape (512, 512)
+    VMCGeoCubeData = np.fromfile ( VMCImageFileName + '.GEO', dtype = '<f4', offset = 2048 )
+    VMCGeoCubeData = { 'BAND_SEQUENTIAL': VMCGeoCubeData.reshape (5, 512, 512), 'SAMPLE_INTERLEAVED': VMCGeoCubeData.reshape (512, 512, 5).transpose (2, 0, 1), 
+                       'LINE_INTERLEAVED': VMCGeoCubeData.reshape (512, 5, 512).transpose (1, 0, 2) } [bandStorageType]
+    VMCGeoCubeData = VMCGeoCubeData.copy ()
+    VMCGeoCubeData [4] = np.where ( np.logical_and (VMCGeoCubeData [4] >= -180, VMCGeoCubeData [4] < 0), VMCGeoCubeData [4] + 360, VMCGeoCubeData [4] )
+    
+    np.testing.assert_array_equal (VMCImage.image, VMCImageData)
+    np.testing.assert_array_equal (VMCImageFlattened, VMCImageData.reshape (-1))
+    np.testing.assert_array_equal (VMCGeoCube.data, VMCGeoCubeData)
+    
+    # The flattened planes are views on the geocube, also for interleaved bands, so that the longitudes of the geocube are changed as well.
+    for iPlane in range (5):
+    
+        np.testing.assert_array_equal ( VMCGeoArraysFlattened [iPlane], VMCGeoCubeData [iPlane].reshape (-1) )
+        assert np.shares_memory ( VMCGeoArraysFlattened [iPlane], VMCGeoCube.data )
+        
+    
+
+
+
+# planetaryimage  only decodes band-sequential cubes; the interleaved layouts are checked in  test_readVMCImageAndGeoCubeMemoryMapped .
+@pytest.mark.skipif ( PDS3Image is None, reason = 'planetaryimage.PDS3Image is not available' )
+@pytest.mark.parametrize ( 'bandStorageType', ['BAND_SEQUENTIAL'] )
+def test_readVMCImageAndGeoCubeMemoryMapped_matchesPlanetaryImage (tmp_path, bandStorageType):
+
+    # The same labels, image and geocube as  planetaryimage  reads them.
+    VMCImageFileName = str (tmp_path / 'V2700_0001_UV2')
+    writeVMCImageAndGeoCube (VMCImageFileName, bandStorageType = bandStorageType)
+    
+    VMCImage, VMCImageFlattened, VMCGeoCube, VMCGeoArraysFlattened = VMCTools.readVMCImageAndGeoCubeMemoryMapped (VMCImageFileName)
+    VMCImageReference, VMCImageFlattenedReference, VMCGeoCubeReference, VMCGeoArraysFlattenedReference = VMCTools.readVMCImageAndGeoCube (VMCImageFileName)
+    
+    # The dates are parsed by  planetaryimage , not by  readPDS3Label .
+    for keyword in ['RECORD_BYTES', 'LABEL_RECORDS', '^IMAGE', 'ORBIT_NUMBER', 'FILTER_NAME', 'RADIANCE_SCALING_FACTOR']:
+    
+        assert getattr ( VMCImage.label [keyword], 'value', VMCImage.label [keyword] ) == getattr ( VMCImageReference.label [keyword], 'value', VMCImageReference.label [keyword] )
+        
+    assert dict ( VMCGeoCube.label ['IMAGE'] ) == dict ( VMCGeoCubeReference.label ['IMAGE'] )
+    
+    np.testing.assert_array_equal (VMCImage.image, VMCImageReference.image)
+    np.testing.assert_array_equal (VMCImageFlattened, VMCImageFlattenedReference)
+    np.testing.assert_array_equal (VMCGeoCube.data, VMCGeoCubeReference.data)
+    for iPlane in range (5):
+    
+        np.testing.assert_array_equal ( VMCGeoArraysFlattened [iPlane], VMCGeoArraysFlattenedReference [iPlane] )
+
+
+
+# Replace reading and calibration in  processVMCImages  by stand-ins that record the file names that are read.
+def setVMCImageReaderAndPhotometry (monkeypatch, readFileNames, readBlockedEvent = None, unreadableFileName = None):
+
+    def readVMCImageAndGeoCube (VMCImageFileName):
+    
+        readFileNames.append (VMCImageFileName)
+        if readBlockedEvent is not None and len (readFileNames) > 1:
+        
+            readBlockedEvent.wait (5)
+            
+        if VMCImageFileName == unreadableFileName:
+        
+            raise OSError ('unreadable')
+            
+        return VMCImageFileName, None, None, None
+        
+    monkeypatch.setattr ( VMCTools, 'readVMCImageAndGeoCube', readVMCImageAndGeoCube )
+    monkeypatch.setattr ( VMCTools, 'VMCPhotometry', lambda VMCImage, *arguments, **keywordArguments: 'calibrated ' + VMCImage )
+
+
+
+def test_processVMCImages_listOrder (monkeypatch):
+
+    readFileNames = []
+    setVMCImageReaderAndPhotometry (monkeypatch, readFileNames, unreadableFileName = 'V0003_0001_UV2')
+    
+    # A list is processed in the order as given, and an image that cannot be read is skipped.
+    VMCImageFileNames = [ 'V{:04d}_0001_UV2'.format (iOrbit)  for iOrbit in [5, 1, 3, 4, 2] ]
+    processedImages = list ( VMCTools.processVMCImages (VMCImageFileNames, numberOfReaderThreads = 3, prefetchSize = 2) )
+    
+    assert [ VMCImageFileName  for VMCImageFileName, VMCImage, VMCGeoCube, VMCPhotometryResults in processedImages ] == [ 'V0005_0001_UV2', 'V0001_0001_UV2', 'V0004_0001_UV2', 'V0002_0001_UV2' ]
+    assert all ( VMCPhotometryResults == 'calibrated ' + VMCImageFileName  for VMCImageFileName, VMCImage, VMCGeoCube, VMCPhotometryResults in processedImages )
+    assert sorted (readFileNames) == sorted (VMCImageFileNames)
+
+
+
+def test_processVMCImages_unexpectedErrorPropagates (monkeypatch):
+
+    readFileNames = []
+    setVMCImageReaderAndPhotometry (monkeypatch, readFileNames)
+    
+    # Only read errors skip an image; a bug in the reader stops the loop.
+    def readVMCImageAndGeoCube (VMCImageFileName):
+    
+        raise TypeError ('bug in the reader')
+        
+    monkeypatch.setattr ( VMCTools, 'readVMCImageAndGeoCube', readVMCImageAndGeoCube )
+    
+    with pytest.raises (TypeError):
+    
+        list ( VMCTools.processVMCImages (['V0001_0001_UV2', 'V0002_0001_UV2'], numberOfReaderThreads = 1, prefetchSize = 1) )
+
+
+
+def test_processVMCImages_closeCancelsReads (monkeypatch):
+
+    # One reader thread: the first image is read, the second blocks the thread, and the other prefetched reads wait in the pool.
+    readFileNames = []
+    readBlockedEvent = threading.Event ()
+    setVMCImageReaderAndPhotometry (monkeypatch, readFileNames, readBlockedEvent = readBlockedEvent)
+    
+    VMCImageFileNames = [ 'V{:04d}_0001_UV2'.format (iOrbit)  for iOrbit in range (10) ]
+    VMCImageGenerator = VMCTools.processVMCImages (VMCImageFileNames, numberOfReaderThreads = 1, prefetchSize = 4)
+    
+    assert next (VMCImageGenerator) [0] == VMCImageFileNames [0]
+    
+    # Closing the generator cancels the reads that have not started, and waits for the read that is running.
+    threading.Timer (0.2, readBlockedEvent.set).start ()
+    VMCImageGenerator.close ()
+    
+    assert readFileNames [0] == VMCImageFileNames [0]
+    assert set (readFileNames) <= set (VMCImageFileNames [:2])
+
+
+
+@pytest.mark.parametrize ( 'pairError, propagates', [ (OSError ('unreadable'), False), (TypeError ('bug'), True) ] )
+def test_getCloudTrackingWindsOfOrbits_pairErrors (monkeypatch, pairError, propagates):
+
+    # Two images of one orbit, one hour apart, make one pair; the winds of that pair fail with  pairError .
+    VMCImageFileNames = [ 'V0001_0001_UV2.IMG', 'V0001_0002_UV2.IMG' ]
+    monkeypatch.setattr ( VMCTools, 'getVMCImageTimes', lambda VMCImageFileNames: np.array ( ['2008-05-01T00:00:00.000', '2008-05-01T01:00:00.000'], dtype = 'datetime64[ms]' ) )
+    
+    def getCloudTrackingWinds (*VMCImagePair, **cloudTrackingParameters):
+    
+        raise pairError
+        
+    monkeypatch.setattr ( VMCTools, 'getCloudTrackingWinds', getCloudTrackingWinds )
+    
+    # A read error only skips the pair, anything else propagates.
+    if propagates:
+    
+        with pytest.raises ( type (pairError) ):
+        
+            VMCTools.getCloudTrackingWindsOfOrbits (VMCImageFileNames, numberOfProcesses = 1)
+            
+    else:
+    
+        VMCImagePairs, cloudTrackingWinds = VMCTools.getCloudTrackingWindsOfOrbits (VMCImageFileNames, numberOfProcesses = 1)
+        
+        assert VMCImagePairs == [ tuple (VMCImageFileNames) ]
+        assert cloudTrackingWinds == [None]
+
+
+
+def test_collocateVeRaSoundingsAndVMCImages_matchesDoubleLoop (monkeypatch):
+
+    # Images at random times (not sorted), one exactly 24h after the first sounding; the last sounding has no image within 24h.
+    randomGenerator = np.random.default_rng (7)
+    VMCImageTimes = np.datetime64 ('2008-05-01T00:00:00.000') + ( randomGenerator.uniform (0, 10 * 24, 40) * 3600000 ).astype ('timedelta64[ms]')
+    VMCImageTimes [5] = np.datetime64 ('2008-05-04T06:00:00.000')
+    VMCImageFileNames = [ '/data/V{:04d}_{:04d}_UV2.IMG'.format (2700 + iImage // 10, iImage)  for iImage in range ( len (VMCImageTimes) ) ]
+    
+    VeRaSoundingTimes = np.array ( ['2008-05-03T06:00:00.000', '2008-05-06T17:45:10.500', '2008-05-01T02:00:00.000', '2008-05-30T00:00:00.000'], dtype = 'datetime64[ms]' )
+    VeRaSoundingLatitudes = [-70., -30., -5., -60.]
+    VeRaSoundingLongitudes = [2., 180., 359., 90.]
+    
+    # Box statistics that identify the image and the box.
+    def getBoxStatistics (VMCImageFileName, latitudeLimits, longitudeLimits, *arguments):
+    
+        return np.stack ( [ np.full ( len (latitudeLimits), int ( os.path.basename (VMCImageFileName).split ('_') [1] ) ), latitudeLimits [:, 0], latitudeLimits [:, 1], 
+                            longitudeLimits [:, 0, 0], longitudeLimits [:, 1, 1] ], axis = 1 )
+        
+    monkeypatch.setattr ( VMCTools, 'getBoxStatistics', getBoxStatistics )
+    
+    collocationTable = VMCTools.collocateVeRaSoundingsAndVMCImages ( VeRaSoundingTimes, VeRaSoundingLatitudes, VeRaSoundingLongitudes, VMCImageFileNames, 
+                                                                     VMCImageTimes = VMCImageTimes, numberOfProcesses = 1, silent = True )
+    
+    # Every sounding against every image.
+    expectedRows = []
+    for iSounding in range ( len (VeRaSoundingTimes) ):
+    
+        for iImage in range ( len (VMCImageTimes) ):
+        
+            timeDifferenceHours = ( VMCImageTimes [iImage] - VeRaSoundingTimes [iSounding] ) / np.timedelta64 (1, 'h')
+            if abs (timeDifferenceHours) <= 24:
+            
+                latitudeCentre, latitudeLimits, longitudeCentre, longitudeLimits = VMCTools.getWindAdvectedBox ( VeRaSoundingLatitudes [iSounding], 
+                                                                                                                 VeRaSoundingLongitudes [iSounding], timeDifferenceHours )
+                expectedRows.append ( ( iSounding, os.path.basename ( VMCImageFileNames [iImage] ), timeDifferenceHours, latitudeCentre, longitudeCentre, 
+                                        iImage, latitudeLimits [0], latitudeLimits [1], longitudeLimits [0][0], longitudeLimits [1][1] ) )
+                
+    
+    assert len (collocationTable) == len (expectedRows)
+    assert 3 not in collocationTable ['iSounding']
+    assert 'V2700_0005_UV2.IMG' in collocationTable ['VMCImageFileName'] [ collocationTable ['iSounding'] == 0 ]
+    
+    collocationRows = sorted ( zip ( *[ collocationTable [columnName].tolist ()  for columnName in collocationTable.dtype.names ] ) )
+    for collocationRow, expectedRow in zip ( collocationRows, sorted (expectedRows) ):
+    
+        assert collocationRow [:2] == expectedRow [:2]
+        np.testing.assert_allclose ( collocationRow [2:], expectedRow [2:], rtol = 1e-12, atol = 1e-9 )
+
+
+
+def test_createVMCCatalog_andQueryVMCCatalog (tmp_path):
+
+    # One footprint across the 0˚ meridian (340˚ - 28˚) and one normal footprint (100˚ - 148˚).
+    writeVMCImageAndGeoCube ( str (tmp_path / 'V2700_0001_UV2'), orbitNumber = 2700, startTime = '2008-05-01T12:00:00.000Z', longitudeRange = (-20., 30.) )
+    writeVMCImageAndGeoCube ( str (tmp_path / 'V2701_0002_UV2'), orbitNumber = 2701, startTime = '2008-05-02T12:00:00.000Z', longitudeRange = (100., 150.) )
+    
+    catalogFileName = str (tmp_path / 'VMC.sqlite')
+    assert VMCTools.createVMCCatalog (catalogFileName, str (tmp_path), silent = True) == 2
+    
+    acrossMeridian = str (tmp_path / 'V2700_0001_UV2.IMG')
+    normal = str (tmp_path / 'V2701_0002_UV2.IMG')
+    
+    # Longitude ranges on both sides of the meridian, the two ranges of a box across the meridian, and ranges outside both footprints.
+    for longitudeLimits, selectedFileNames in [ ( None, [acrossMeridian, normal] ), ( [345, 350], [acrossMeridian] ), ( [10, 20], [acrossMeridian] ), 
+                                                ( [120, 130], [normal] ), ( [ [355, 360], [0, 5] ], [acrossMeridian] ), ( [ [140, 360], [0, 5] ], [acrossMeridian, normal] ), 
+                                                ( [40, 90], [] ), ( [ [160, 360], [0, 0] ], [acrossMeridian] ), ( [160, 330], [] ) ]:
+    
+        assert VMCTools.queryVMCCatalog (catalogFileName, longitudeLimits = longitudeLimits) [0] == selectedFileNames
+        
+    VMCImageFileNames, VMCImageTimes = VMCTools.queryVMCCatalog ( catalogFileName, startTime = '2008-05-02', latitudeLimits = [-90, -60] )
+    assert VMCImageFileNames == [normal]
+    np.testing.assert_array_equal ( VMCImageTimes, np.array ( ['2008-05-02T12:00:00.000'], dtype = 'datetime64[ms]' ) )
+    assert VMCTools.queryVMCCatalog (catalogFileName, orbitMaximum = 2700, latitudeLimits = [10, 20]) [0] == []
+    
+    # A second run reads nothing, until a file is changed.
+    assert VMCTools.createVMCCatalog (catalogFileName, str (tmp_path), silent = True) == 0
+    
+    os.utime ( str (tmp_path / 'V2701_0002_UV2.GEO'), ns = (0, 0) )
+    assert VMCTools.createVMCCatalog (catalogFileName, str (tmp_path), silent = True) == 1
+    assert VMCTools.queryVMCCatalog (catalogFileName) [0] == [acrossMeridian, normal]
+
+
+
+def test_VMCPhotometryCached_hitsKeysAndEviction (tmp_path, monkeypatch):
+
+    VMCImageFileNames = []
+    for iImage in range (3):
+    
+        VMCImageFileNames.append ( str ( tmp_path / 'V{:04d}_0001_UV2'.format (2700 + iImage) ) )
+        writeVMCImageAndGeoCube ( VMCImageFileNames [-1], orbitNumber = 2700 + iImage, seed = iImage )
+        
+    cacheDirectory = str ( tmp_path / 'cache' )
+    
+    # A miss and a hit give the same result as  VMCPhotometry .
+    VMCPhotometryResults = VMCTools.VMCPhotometry ( *VMCTools.readVMCImageAndGeoCubeMemoryMapped ( VMCImageFileNames [0] ), silent = True )
+    for iCall in range (2):
+    
+        VMCPhotometryCachedResults = VMCTools.VMCPhotometryCached ( VMCImageFileNames [0], cacheDirectory, silent = True )
+        
+        np.testing.assert_array_equal ( VMCPhotometryCachedResults [0], VMCPhotometryResults [0] )
+        np.testing.assert_array_equal ( VMCPhotometryCachedResults [1], VMCPhotometryResults [1] )
+        np.testing.assert_allclose ( VMCPhotometryCachedResults [2:], VMCPhotometryResults [2:], rtol = 1e-12 )
+        assert len ( os.listdir (cacheDirectory) ) == 1
+        
+    # Other calibration parameters and a changed .GEO file have their own entries.
+    cacheKey = VMCTools.getVMCPhotometryCacheKey ( VMCImageFileNames [0] )
+    assert VMCTools.getVMCPhotometryCacheKey ( VMCImageFileNames [0], incidenceAngleLimit = 70 ) != cacheKey
+    assert VMCTools.getVMCPhotometryCacheKey ( VMCImageFileNames [0], applyLambertLaw = False ) != cacheKey
+    
+    VMCPhotometryCachedResults = VMCTools.VMCPhotometryCached ( VMCImageFileNames [0], cacheDirectory, incidenceAngleLimit = 70, silent = True )
+    assert not np.array_equal ( VMCPhotometryCachedResults [0], VMCPhotometryResults [0] )
+    
+    os.utime ( VMCImageFileNames [0] + '.GEO', ns = (0, 0) )
+    assert VMCTools.getVMCPhotometryCacheKey ( VMCImageFileNames [0] ) != cacheKey
+    VMCTools.VMCPhotometryCached ( VMCImageFileNames [0], cacheDirectory, silent = True )
+    assert len ( os.listdir (cacheDirectory) ) == 3
+    
+    # An entry removed by another process between the lookup and the read is calculated again.
+    cacheFileName = os.path.join ( cacheDirectory, VMCTools.getVMCPhotometryCacheKey ( VMCImageFileNames [0] ) + '.npz' )
+    load = np.load
+    
+    def loadAfterEviction (fileName, *arguments, **keywordArguments):
+    
+        if os.path.isfile (fileName):
+        
+            os.remove (fileName)
+            
+        return load (fileName, *arguments, **keywordArguments)
+        
+    monkeypatch.setattr ( np, 'load', loadAfterEviction )
+    VMCPhotometryCachedResults = VMCTools.VMCPhotometryCached ( VMCImageFileNames [0], cacheDirectory, silent = True )
+    monkeypatch.undo ()
+    
+    np.testing.assert_array_equal ( VMCPhotometryCachedResults [0], VMCPhotometryResults [0] )
+    assert os.path.isfile (cacheFileName)
+    
+    
+    # The sizes of the entries of the three images.
+    cacheFileSizes = []
+    for VMCImageFileName in VMCImageFileNames:
+    
+        VMCTools.VMCPhotometryCached ( VMCImageFileName, str ( tmp_path / 'sizes' ), silent = True )
+        cacheFileSizes.append ( os.path.getsize ( os.path.join ( str ( tmp_path / 'sizes' ), VMCTools.getVMCPhotometryCacheKey (VMCImageFileName) + '.npz' ) ) )
+        
+    # The first image is used after the second one, so the second one is the least recently used when the third one does not fit.
+    cacheDirectory = str ( tmp_path / 'lru' )
+    cacheFileNames = [ os.path.join ( cacheDirectory, VMCTools.getVMCPhotometryCacheKey (VMCImageFileName) + '.npz' )  for VMCImageFileName in VMCImageFileNames ]
+    
+    for iImage in range (2):
+    
+        VMCTools.VMCPhotometryCached ( VMCImageFileNames [iImage], cacheDirectory, silent = True )
+        os.utime ( cacheFileNames [iImage], ns = (10**9 * (iImage + 1), 10**9 * (iImage + 1)) )
+        
+    VMCTools.VMCPhotometryCached ( VMCImageFileNames [0], cacheDirectory, silent = True )
+    
+    maximumCacheSizeMB = ( cacheFileSizes [0] + cacheFileSizes [1] / 2 + cacheFileSizes [2] ) / 1048576
+    VMCTools.VMCPhotometryCached ( VMCImageFileNames [2], cacheDirectory, maximumCacheSizeMB = maximumCacheSizeMB, silent = True )
+    
+    assert [ os.path.isfile (cacheFileName)  for cacheFileName in cacheFileNames ] == [True, False, True]
+    
+    # Within the budget nothing is removed.
+    assert VMCTools.evictVMCPhotometryCache (cacheDirectory, maximumCacheSizeMB) == 0
+    assert VMCTools.evictVMCPhotometryCache (cacheDirectory, 0) == 2
+    
+    # With a large budget the directory is scanned only for the first new entry.
+    evictVMCPhotometryCache = VMCTools.evictVMCPhotometryCache
+    evictedDirectories = []
+    monkeypatch.setattr ( VMCTools, 'evictVMCPhotometryCache', lambda *arguments: evictedDirectories.append (arguments [0]) or evictVMCPhotometryCache (*arguments) )
+    
+    for VMCImageFileName in VMCImageFileNames:
+    
+        VMCTools.VMCPhotometryCached ( VMCImageFileName, str ( tmp_path / 'scans' ), silent = True )
+        
+    assert evictedDirectories == [ str ( tmp_path / 'scans' ) ]
+
+
+
+def test_VMCPhotometryLowMemory_matchesVMCPhotometry (tmp_path):
+
+    # Two images with different geocubes, calibrated with the same buffers; the second one is from before orbit 2638 and has longitudes from -180˚ through 180˚.
+    VMCPhotometryLowMemoryBuffers = { 'out': np.empty ( (512, 512), dtype = np.float32 ), 'onDiskValid': np.empty (512 * 512, dtype = bool), 
+                                      'scratch': np.empty (512 * 512, dtype = np.float32) }
+    
+    for iImage, (orbitNumber, longitudeRange) in enumerate ( [ (2700, (0., 360.)), (600, (-180., 180.)) ] ):
+    
+        VMCImageFileName = str ( tmp_path / 'V{:04d}_0001_UV2'.format (orbitNumber) )
+        writeVMCImageAndGeoCube ( VMCImageFileName, orbitNumber = orbitNumber, seed = iImage, longitudeRange = longitudeRange )
+        
+        for applyLambertLaw in [True, False]:
+        
+            VMCPhotometryResults = VMCTools.VMCPhotometry ( *VMCTools.readVMCImageAndGeoCubeMemoryMapped (VMCImageFileName), incidenceAngleLimit = 70, 
+                                                            applyLambertLaw = applyLambertLaw, silent = True )
+            
+            # Writable copies of the inputs, with the longitudes back in -180˚ through 180˚, to check that they are not changed.
+            VMCImage, VMCImageFlattened, VMCGeoCube, VMCGeoArraysFlattened = VMCTools.readVMCImageAndGeoCubeMemoryMapped (VMCImageFileName)
+            VMCImageFlattened = np.array (VMCImageFlattened)
+            VMCGeoArraysFlattened = [ np.array (VMCGeoArrayFlattened)  for VMCGeoArrayFlattened in VMCGeoArraysFlattened ]
+            VMCGeoArraysFlattened [4] = np.where ( VMCGeoArraysFlattened [4] >= 180, VMCGeoArraysFlattened [4] - 360, VMCGeoArraysFlattened [4] )
+            VMCImageFlattenedBefore = VMCImageFlattened.copy ()
+            VMCGeoArraysFlattenedBefore = [ VMCGeoArrayFlattened.copy ()  for VMCGeoArrayFlattened in VMCGeoArraysFlattened ]
+            
+            VMCPhotometryLowMemoryResults = VMCTools.VMCPhotometryLowMemory ( VMCImage, VMCImageFlattened, VMCGeoCube, VMCGeoArraysFlattened, incidenceAngleLimit = 70, 
+                                                                              applyLambertLaw = applyLambertLaw, silent = True, **VMCPhotometryLowMemoryBuffers )
+            
+            np.testing.assert_allclose ( VMCPhotometryLowMemoryResults [0], VMCPhotometryResults [0], rtol = 1e-5 )
+            np.testing.assert_allclose ( VMCPhotometryLowMemoryResults [2:], VMCPhotometryResults [2:], rtol = 1e-6 )
+            
+            # The results are in the buffers, and the inputs are unchanged.
+            assert np.shares_memory ( VMCPhotometryLowMemoryResults [0], VMCPhotometryLowMemoryBuffers ['out'] )
+            assert np.shares_memory ( VMCPhotometryLowMemoryResults [1], VMCPhotometryLowMemoryBuffers ['out'] )
+            np.testing.assert_array_equal ( VMCPhotometryLowMemoryBuffers ['onDiskValid'], VMCPhotometryResults [1] != -1 )
+            
+            np.testing.assert_array_equal ( VMCImageFlattened, VMCImageFlattenedBefore )
+            for VMCGeoArrayFlattened, VMCGeoArrayFlattenedBefore in zip (VMCGeoArraysFlattened, VMCGeoArraysFlattenedBefore):
+            
+                np.testing.assert_array_equal ( VMCGeoArrayFlattened, VMCGeoArrayFlattenedBefore )
+                
+                
+    # A buffer that is not C-contiguous, or has the wrong size, is refused.
+    for bufferName, bufferArray in [ ('out', np.empty ( (512, 1024), dtype = np.float32 ) [:, ::2]), ('onDiskValid', np.empty ( (1024, 512), dtype = bool ).T [:, :512]), 
+                                     ('scratch', np.empty (512 * 512 + 1, dtype = np.float32)) ]:
+    
+        with pytest.raises (ValueError, match = bufferName):
+        
+            VMCTools.VMCPhotometryLowMemory ( VMCImage, VMCImageFlattened, VMCGeoCube, VMCGeoArraysFlattened, silent = True, **{ bufferName: bufferArray } )
+
+
+
+def test_processVMCImages_sparseOutputRoundTrip (tmp_path, monkeypatch):
+
+    VMCImageFileNames = []
+    for iImage in range (2):
+    
+        VMCImageFileNames.append ( str ( tmp_path / 'V{:04d}_0001_UV2.IMG'.format (2700 + iImage) ) )
+        writeVMCImageAndGeoCube ( VMCImageFileNames [-1] [:-4], orbitNumber = 2700 + iImage, seed = iImage )
+        
+    monkeypatch.setattr ( VMCTools, 'readVMCImageAndGeoCube', VMCTools.readVMCImageAndGeoCubeMemoryMapped )
+    
+    for VMCImageFileName, VMCImage, VMCGeoCube, sparseVMCPhotometry in VMCTools.processVMCImages (VMCImageFileNames, sparseOutput = True):
+    
+        VMCPhotometryResults = VMCTools.VMCPhotometry ( *VMCTools.readVMCImageAndGeoCubeMemoryMapped (VMCImageFileName), silent = True )
+        
+        # Sparse to file and back to dense: the valid pixels in float32 and -1 elsewhere.
+        sparseFileName = VMCImageFileName [:-4] + '.npz'
+        VMCTools.writeSparseVMCPhotometry ( sparseFileName, sparseVMCPhotometry )
+        sparseVMCPhotometryRead = VMCTools.readSparseVMCPhotometry (sparseFileName)
+        
+        assert sorted (sparseVMCPhotometryRead) == sorted (sparseVMCPhotometry)
+        for arrayName in sparseVMCPhotometry:
+        
+            np.testing.assert_array_equal ( sparseVMCPhotometryRead [arrayName], sparseVMCPhotometry [arrayName] )
+            
+        VMCImageCalibrated, VMCImageCalibratedFlattened = VMCTools.getDenseVMCPhotometry (sparseVMCPhotometryRead)
+        
+        assert VMCImageCalibrated.shape == (512, 512) and np.shares_memory (VMCImageCalibrated, VMCImageCalibratedFlattened)
+        np.testing.assert_array_equal ( VMCImageCalibratedFlattened, VMCPhotometryResults [1].astype (np.float32) )
+        np.testing.assert_allclose ( sparseVMCPhotometryRead ['statistics'], VMCPhotometryResults [2:], rtol = 1e-12 )
+        
+        # The geocube values of the valid pixels, with the longitudes from 0˚ through 360˚.
+        iValid = np.flatnonzero ( VMCPhotometryResults [1] != -1 )
+        np.testing.assert_array_equal ( sparseVMCPhotometryRead ['iPixels'], iValid )
+        VMCGeoArraysFlattened = VMCTools.readVMCImageAndGeoCubeMemoryMapped (VMCImageFileName) [3]
+        for iPlane, quantity in enumerate ( ['incidenceAngle', 'emissionAngle', 'phaseAngle', 'latitude', 'longitude'] ):
+        
+            np.testing.assert_array_equal ( VMCTools.getDenseVMCPhotometry (sparseVMCPhotometryRead, quantity) [1] [iValid], VMCGeoArraysFlattened [iPlane] [iValid] )
+            
+        assert np.all ( sparseVMCPhotometryRead ['longitude'] >= 0 )
+
+
+
+# Flattened geocube planes of random pixels, a third of them off the disk, with longitudes from -180˚ through 180˚.
+def getRandomVMCGeoArraysFlattened (randomGenerator, numberOfPixels):
+
+    latitudes = randomGenerator.uniform (-90, 90, numberOfPixels)
+    longitudes = randomGenerator.uniform (-180, 180, numberOfPixels)
+    latitudes [ randomGenerator.random (numberOfPixels) < 1 / 3 ] = -1000.
+    
+    return [ np.zeros (numberOfPixels), np.zeros (numberOfPixels), np.zeros (numberOfPixels), latitudes, longitudes ]
+
+
+
+# Values of the valid pixels in each cell of a grid, with a mask per cell.
+def getPixelValuesInCells (VMCImagesFlattened, VMCGeoArraysFlattenedOfImages, gridStep, latitudeLimits, longitudeLimits):
+
+    gridShape = ( int ( (latitudeLimits [1] - latitudeLimits [0]) / gridStep ), int ( (longitudeLimits [1] - longitudeLimits [0]) / gridStep ) )
+    pixelValuesInCells = [ []  for iCell in range ( gridShape [0] * gridShape [1] ) ]
+    
+    for VMCImageFlattened, VMCGeoArraysFlattened in zip (VMCImagesFlattened, VMCGeoArraysFlattenedOfImages):
+    
+        longitudes = VMCGeoArraysFlattened [4] % 360
+        for iLatitude in range ( gridShape [0] ):
+        
+            for iLongitude in range ( gridShape [1] ):
+            
+                iInCell = ( VMCGeoArraysFlattened [3] >= latitudeLimits [0] + iLatitude * gridStep ) & ( VMCGeoArraysFlattened [3] < latitudeLimits [0] + (iLatitude + 1) * gridStep ) & \
+                          ( longitudes >= longitudeLimits [0] + iLongitude * gridStep ) & ( longitudes < longitudeLimits [0] + (iLongitude + 1) * gridStep ) & \
+                          ( VMCImageFlattened != -1 ) & np.isfinite (VMCImageFlattened)
+                pixelValuesInCells [ iLatitude * gridShape [1] + iLongitude ] += list ( VMCImageFlattened [iInCell] )
+                
+                
+    return pixelValuesInCells, gridShape
+
+
+
+def test_VMCReprojection_applyMatchesBinning ():
+
+    randomGenerator = np.random.default_rng (8)
+    VMCGeoArraysFlattened = getRandomVMCGeoArraysFlattened (randomGenerator, 5000)
+    VMCImageFlattened = randomGenerator.uniform (0, 2, 5000)
+    VMCImageFlattened [::11] = -1.
+    VMCImageFlattened [::13] = np.nan
+    
+    # The whole sphere, and a part of it with pixels outside the grid.
+    for gridStep, latitudeLimits, longitudeLimits in [ ( 30., (-90., 90.), (0., 360.) ), ( 10., (-40., 20.), (150., 300.) ) ]:
+    
+        reprojection = VMCTools.getVMCReprojection (VMCGeoArraysFlattened, gridStep, latitudeLimits, longitudeLimits)
+        pixelValuesInCells, gridShape = getPixelValuesInCells ( [VMCImageFlattened], [VMCGeoArraysFlattened], gridStep, latitudeLimits, longitudeLimits )
+        
+        assert reprojection.gridShape == gridShape
+        np.testing.assert_allclose ( reprojection.apply (VMCImageFlattened).reshape (-1), 
+                                     [ np.mean (pixelValues)  if pixelValues  else np.nan  for pixelValues in pixelValuesInCells ], rtol = 1e-12 )
+        
+        latitudeCentres, longitudeCentres = reprojection.getGridCoordinates ()
+        np.testing.assert_allclose ( latitudeCentres, latitudeLimits [0] + gridStep / 2 + gridStep * np.arange ( gridShape [0] ) )
+        np.testing.assert_allclose ( longitudeCentres, longitudeLimits [0] + gridStep / 2 + gridStep * np.arange ( gridShape [1] ) )
+
+
+
+def test_VMCMosaic_addAndMergeMatchBinning ():
+
+    randomGenerator = np.random.default_rng (9)
+    VMCGeoArraysFlattenedOfImages = [ getRandomVMCGeoArraysFlattened (randomGenerator, 3000)  for iImage in range (4) ]
+    VMCImagesFlattened = [ randomGenerator.uniform (0, 2, 3000)  for iImage in range (4) ]
+    VMCImagesFlattened [1] [::7] = -1.
+    
+    gridStep, latitudeLimits, longitudeLimits = 30., (-90., 90.), (0., 360.)
+    pixelValuesInCells, gridShape = getPixelValuesInCells (VMCImagesFlattened, VMCGeoArraysFlattenedOfImages, gridStep, latitudeLimits, longitudeLimits)
+    
+    # All images in one mosaic, and the same images in two mosaics that are merged.
+    VMCMosaicAll = VMCMosaic (gridStep, latitudeLimits, longitudeLimits)
+    VMCMosaicsPart = [ VMCMosaic (gridStep, latitudeLimits, longitudeLimits), VMCMosaic (gridStep, latitudeLimits, longitudeLimits) ]
+    for iImage, (VMCImageFlattened, VMCGeoArraysFlattened) in enumerate ( zip (VMCImagesFlattened, VMCGeoArraysFlattenedOfImages) ):
+    
+        reprojection = VMCTools.getVMCReprojection (VMCGeoArraysFlattened, gridStep, latitudeLimits, longitudeLimits)
+        
+        assert VMCMosaicAll.add (VMCImageFlattened, reprojection)
+        assert VMCMosaicsPart [ int (iImage > 0) ].add (VMCImageFlattened, reprojection)
+        
+    VMCMosaicsPart [0].merge ( VMCMosaicsPart [1] )
+    
+    for VMCMosaicOfImages in [ VMCMosaicAll, VMCMosaicsPart [0] ]:
+    
+        assert VMCMosaicOfImages.numberOfImages == 4
+        np.testing.assert_array_equal ( VMCMosaicOfImages.getCount ().reshape (-1), [ len (pixelValues)  for pixelValues in pixelValuesInCells ] )
+        np.testing.assert_allclose ( VMCMosaicOfImages.getAverage ().reshape (-1), 
+                                     [ np.mean (pixelValues)  if pixelValues  else np.nan  for pixelValues in pixelValuesInCells ], rtol = 1e-12 )
+        np.testing.assert_allclose ( VMCMosaicOfImages.getVariance ().reshape (-1), 
+                                     [ np.var (pixelValues, ddof = 1)  if len (pixelValues) > 1  else np.nan  for pixelValues in pixelValuesInCells ], rtol = 1e-10 )
+        
+    # A reprojection or mosaic on another grid is not added.
+    assert not VMCMosaicAll.add ( VMCImagesFlattened [0], VMCTools.getVMCReprojection ( VMCGeoArraysFlattenedOfImages [0], 10. ) )
+    VMCMosaicAll.merge ( VMCMosaic (10.) )
+    assert VMCMosaicAll.numberOfImages == 4
+
+
+
+def test_getVMCReprojection_cacheKey (tmp_path):
+
+    # Two geocubes of 512 x 512 pixels with a small disk, which only differ in pixels that are not on a regular sample of the planes.
+    VMCGeoArraysFlattenedOfGeoCubes = []
+    for latitude in [-30.5, 40.5]:
+    
+        VMCGeoArraysFlattened = [ np.full (512 * 512, -1000., dtype = np.float32)  for iPlane in range (5) ]
+        VMCGeoArraysFlattened [3] [ 1030:1080 ] = latitude
+        VMCGeoArraysFlattened [4] [ 1030:1080 ] = np.linspace (-20, 20, 50)
+        VMCGeoArraysFlattenedOfGeoCubes.append (VMCGeoArraysFlattened)
+        
+    cacheDirectory = str ( tmp_path / 'cache' )
+    for iRun in range (2):
+    
+        for VMCGeoArraysFlattened in VMCGeoArraysFlattenedOfGeoCubes:
+        
+            reprojection = VMCTools.getVMCReprojection (VMCGeoArraysFlattened, 5., cacheDirectory = cacheDirectory)
+            reprojectionUncached = VMCTools.getVMCReprojection (VMCGeoArraysFlattened, 5.)
+            
+            for arrayName in ['iPixels', 'iCells', 'weights']:
+            
+                np.testing.assert_array_equal ( getattr (reprojection, arrayName), getattr (reprojectionUncached, arrayName) )
+                
+                
+    assert len ( os.listdir (cacheDirectory) ) == 2
+    
+    # With the file name of the image, the key is made from the .GEO file, and a changed .GEO file has a new entry.
+    VMCImageFileName = str ( tmp_path / 'V2700_0001_UV2' )
+    writeVMCImageAndGeoCube (VMCImageFileName)
+    VMCGeoArraysFlattened = VMCTools.readVMCImageAndGeoCubeMemoryMapped (VMCImageFileName) [3]
+    
+    for iRun in range (2):
+    
+        reprojection = VMCTools.getVMCReprojection ( VMCGeoArraysFlattened, 5., cacheDirectory = cacheDirectory, VMCImageFileName = VMCImageFileName + '.IMG' )
+        np.testing.assert_array_equal ( reprojection.iCells, VMCTools.getVMCReprojection (VMCGeoArraysFlattened, 5.).iCells )
+        
+    assert len ( os.listdir (cacheDirectory) ) == 3
+    
+    os.utime ( VMCImageFileName + '.GEO', ns = (0, 0) )
+    VMCTools.getVMCReprojection ( VMCGeoArraysFlattened, 5., cacheDirectory = cacheDirectory, VMCImageFileName = VMCImageFileName + '.IMG' )
+    assert len ( os.listdir (cacheDirectory) ) == 4
+
+
+
+def test_VMCClimatology_mergeWriteAndRead (tmp_path):
+
+    # Pixels of six images in different mission sections, added to one accumulator, and to three accumulators that are merged in different orders.
+    randomGenerator = np.random.default_rng (10)
+    images = [ ( randomGenerator.uniform (0, 2, 500), randomGenerator.uniform (-90, 90, 500), randomGenerator.uniform (-2, 26, 500), iImage % 3, 'V{:04d}'.format (iImage) )  
+               for iImage in range (6) ]
+    
+    climatologyAll = VMCClimatology (10., 2.)
+    climatologiesPart = [ VMCClimatology (10., 2.)  for iPart in range (3) ]
+    for iImage, image in enumerate (images):
+    
+        assert climatologyAll.add (*image)
+        assert climatologiesPart [ iImage // 2 ].add (*image)
+        
+    assert not climatologyAll.add (*images [0])
+    
+    for iOrder in [ (0, 1, 2), (2, 0, 1), (1, 2, 0) ]:
+    
+        climatologyMerged = VMCClimatology (10., 2.)
+        for iPart in iOrder:
+        
+            assert climatologyMerged.merge ( climatologiesPart [iPart] )
+            
+        np.testing.assert_array_equal (climatologyMerged.count, climatologyAll.count)
+        np.testing.assert_allclose (climatologyMerged.sum, climatologyAll.sum, rtol = 1e-12)
+        np.testing.assert_allclose (climatologyMerged.sumOfSquares, climatologyAll.sumOfSquares, rtol = 1e-12)
+        assert climatologyMerged.imageIDs == climatologyAll.imageIDs
+        
+    assert not climatologyAll.merge ( VMCClimatology (5., 2.) )
+    
+    # The average and standard deviation of one bin against the pixels in it.
+    radianceFactors, latitudes, localSolarTimes, iMissionSection, imageID = images [4]
+    iInBin = np.concatenate ( [ ( image [1] >= -10 ) & ( image [1] < 0 ) & ( np.mod (image [2], 24) >= 4 ) & ( np.mod (image [2], 24) < 6 )  
+                                for image in images  if image [3] == iMissionSection ] )
+    radianceFactorsInBin = np.concatenate ( [ image [0]  for image in images  if image [3] == iMissionSection ] ) [iInBin]
+    
+    assert climatologyAll.count [iMissionSection, 8, 2] == len (radianceFactorsInBin) > 1
+    np.testing.assert_allclose ( climatologyAll.getAverage () [iMissionSection, 8, 2], np.mean (radianceFactorsInBin), rtol = 1e-12 )
+    np.testing.assert_allclose ( climatologyAll.getStandardDeviation () [iMissionSection, 8, 2], np.std (radianceFactorsInBin, ddof = 1), rtol = 1e-9 )
+    
+    # The same accumulator after a round trip through file.
+    climatologyFileName = str ( tmp_path / 'climatology.npz' )
+    climatologyAll.write (climatologyFileName)
+    climatologyRead = VMCClimatology.read (climatologyFileName)
+    
+    assert [climatologyRead.latitudeStep, climatologyRead.localSolarTimeStep] == [10., 2.]
+    for arrayName in ['count', 'sum', 'sumOfSquares']:
+    
+        np.testing.assert_array_equal ( getattr (climatologyRead, arrayName), getattr (climatologyAll, arrayName) )
+        
+    assert climatologyRead.imageIDs == climatologyAll.imageIDs
+    assert not climatologyRead.add (*images [3])
+
+
+
+def test_createVMCClimatology_resumesFromCheckpoint (tmp_path, monkeypatch):
+
+    VMCImageFileNames = []
+    for iImage, orbitNumber in enumerate ( [600, 1200, 2700, 2701] ):
+    
+        VMCImageFileNames.append ( str ( tmp_path / 'V{:04d}_0001_UV2.IMG'.format (orbitNumber) ) )
+        writeVMCImageAndGeoCube ( VMCImageFileNames [-1] [:-4], orbitNumber = orbitNumber, seed = iImage, subSolarLongitude = 30. * iImage )
+        
+    # The local solar time is 12h at the sub-solar longitude, and increases by 1h per 15˚ to the west.
+    VMCImage, VMCImageFlattened, VMCGeoCube, VMCGeoArraysFlattened = VMCTools.readVMCImageAndGeoCubeMemoryMapped ( VMCImageFileNames [2] )
+    np.testing.assert_allclose ( VMCTools.getVMCLocalSolarTimes ( VMCImage, [ None, None, None, None, np.array ( [60., 45., 75., 240., -120.] ) ] ), [12., 13., 11., 0., 0.] )
+    
+    # All images at once, without a checkpoint.
+    climatologyAll = VMCTools.createVMCClimatology ( VMCImageFileNames, latitudeStep = 10., localSolarTimeStep = 2., numberOfProcesses = 1 )
+    
+    assert climatologyAll.imageIDs == { 'V0600_0001_UV2', 'V1200_0001_UV2', 'V2700_0001_UV2', 'V2701_0001_UV2' }
+    assert np.count_nonzero ( climatologyAll.count.sum (axis = (1, 2)) ) == 3
+    
+    # First the first two images with a checkpoint, then all four: only the last two are read.
+    climatologyFileName = str ( tmp_path / 'climatology.npz' )
+    VMCTools.createVMCClimatology ( VMCImageFileNames [:2], climatologyFileName, latitudeStep = 10., localSolarTimeStep = 2., numberOfProcesses = 1, imagesPerTask = 1 )
+    
+    readVMCImageAndGeoCubeMemoryMapped = VMCTools.readVMCImageAndGeoCubeMemoryMapped
+    readFileNames = []
+    monkeypatch.setattr ( VMCTools, 'readVMCImageAndGeoCubeMemoryMapped', lambda fileName: readFileNames.append (fileName) or readVMCImageAndGeoCubeMemoryMapped (fileName) )
+    
+    climatologyResumed = VMCTools.createVMCClimatology ( VMCImageFileNames, climatologyFileName, numberOfProcesses = 1, imagesPerTask = 1 )
+    
+    assert readFileNames == VMCImageFileNames [2:]
+    np.testing.assert_array_equal (climatologyResumed.count, climatologyAll.count)
+    np.testing.assert_allclose (climatologyResumed.sum, climatologyAll.sum, rtol = 1e-12)
+    assert VMCClimatology.read (climatologyFileName).imageIDs == climatologyAll.imageIDs
+    
+    # An image that cannot be read is skipped, a programming error is not.
+    os.remove ( VMCImageFileNames [3] [:-4] + '.GEO' )
+    assert VMCTools.getVMCClimatologyOfImages ( VMCImageFileNames [2:], 10., 2. ).imageIDs == { 'V2700_0001_UV2' }
+    
+    def VMCPhotometryWithError (*arguments, **keywordArguments):
+    
+        raise TypeError ('programming error')
+        
+    monkeypatch.setattr ( VMCTools, 'VMCPhotometry', VMCPhotometryWithError )
+    with pytest.raises (TypeError):
+    
+        VMCTools.getVMCClimatologyOfImages ( VMCImageFileNames [2:3], 10., 2. )
@@ -0,0 +1,485 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+pytest.importorskip ('HandyTools')
+
+sys.path.insert ( 0, os.path.join ( os.path.dirname (__file__), '..', 'VeRaTools' ) )
+from VeRaTools import VeRaTools, VeRaTableIndex, VeRaSoundingIndex
+from HandyTools import HandyTools
+
+
+
+# Write a synthetic VeRa TAB file with a known pressure uncertainty (Pa) on every level.
+def writeVeRaTAB (VeRaTABFileName, radii, pressureUncertainty, longitudes = 120.):
+
+    pressures = 1e5 * np.exp ( - (radii - 6100) / 5 )
+    temperatures = 300 - (radii - 6090) * 1.2
+    longitudes = np.broadcast_to ( longitudes, radii.shape )
+
+    with open (VeRaTABFileName, 'w') as VeRaTABFile:
+    
+        for iLevel, (radius, pressure, temperature, longitude) in enumerate ( zip (radii, pressures, temperatures, longitudes) ):
+        
+            VeRaTABFile.write ( '  '.join ( [ str (iLevel), '2008-05-01T12:00:00', '0.0', '%.4f' % radius, '-60.000', '%.3f' % longitude, 'x', 'y', 
+                                              '%.6e' % pressure, '%.6e' % pressureUncertainty, 'a', 'b', 'c', 'd', '%.3f' % temperature, '0.200' ] ) + '\n' )
+
+
+
+def test_readVeRaTAB_pressureUncertaintyInPa (tmp_path):
+
+    VeRaTABFileName = str ( tmp_path / 'PROF.TAB' )
+    writeVeRaTAB ( VeRaTABFileName, np.linspace (6150, 6095, 100), 50. )
+    
+    VeRaProfileOriginal = VeRaTools.readVeRaTAB (VeRaTABFileName) [0]
+    
+    np.testing.assert_allclose ( VeRaProfileOriginal [4], 50. )
+
+
+
+def test_getFilteredVeRaProfileMonteCarlo_pressureSpreadMatchesSigma (tmp_path):
+
+    # Ten original levels in every 1 km bin, each with a 1-sigma pressure uncertainty of 50 Pa.
+    VeRaTABFileName = str ( tmp_path / 'PROF.TAB' )
+    pressureUncertainty = 50.
+    writeVeRaTAB ( VeRaTABFileName, 6150.05 - 0.1 * np.arange (560), pressureUncertainty )
+    
+    VeRaProfilePercentiles, radii = VeRaTools.getFilteredVeRaProfileMonteCarlo ( VeRaTABFileName, startAltitude = 6100., endAltitude = 6140., 
+                                                                                 numberOfRealisations = 4000, percentiles = (16., 84.), randomSeed = 1 )
+    
+    # The spread of the average of ten levels, in bar.
+    expectedSigma = pressureUncertainty / np.sqrt (10) / 1e5
+    pressureSigma = ( VeRaProfilePercentiles [1, 1] - VeRaProfilePercentiles [1, 0] ) / 2
+    
+    np.testing.assert_allclose ( pressureSigma, expectedSigma, rtol = 0.1 )
+    np.testing.assert_allclose ( np.mean (pressureSigma), expectedSigma, rtol = 0.02 )
+
+
+
+def test_getFilteredVeRaProfile_cache (tmp_path):
+
+    VeRaTABFileName = str ( tmp_path / 'PROF.TAB' )
+    cacheDirectory = str ( tmp_path / 'cache' )
+    writeVeRaTAB ( VeRaTABFileName, np.linspace (6150, 6095, 100), 50. )
+    
+    VeRaProfileFilteredMiss, numberOfFilteredLevels, VeRaProfileOriginalMiss, numberOfOriginalLevels = \
+        VeRaTools.getFilteredVeRaProfile (VeRaTABFileName, cacheDirectory = cacheDirectory)
+    VeRaProfileFilteredHit, numberOfFilteredLevels, VeRaProfileOriginalHit, numberOfOriginalLevels = \
+        VeRaTools.getFilteredVeRaProfile (VeRaTABFileName, cacheDirectory = cacheDirectory)
+    
+    # A cache hit is a copy-on-write memory map: writable, without changing the cache file.
+    for VeRaProfileMiss, VeRaProfileHit in [ (VeRaProfileFilteredMiss, VeRaProfileFilteredHit), (VeRaProfileOriginalMiss, VeRaProfileOriginalHit) ]:
+    
+        assert isinstance (VeRaProfileHit, np.memmap) and VeRaProfileHit.mode == 'c'
+        assert VeRaProfileHit.flags.writeable and VeRaProfileMiss.flags.writeable
+        np.testing.assert_array_equal (VeRaProfileHit, VeRaProfileMiss)
+        
+        VeRaProfileHit [:] = 0.
+        
+    VeRaProfileFilteredHit, numberOfFilteredLevels, VeRaProfileOriginalHit, numberOfOriginalLevels = \
+        VeRaTools.getFilteredVeRaProfile (VeRaTABFileName, cacheDirectory = cacheDirectory)
+    
+    np.testing.assert_array_equal (VeRaProfileFilteredHit, VeRaProfileFilteredMiss)
+    np.testing.assert_array_equal (VeRaProfileOriginalHit, VeRaProfileOriginalMiss)
+    
+    # A changed .TAB file replaces its cache files instead of adding new ones.
+    cacheFileNames = sorted ( os.listdir (cacheDirectory) )
+    os.utime ( VeRaTABFileName, ns = (0, 0) )
+    VeRaTools.getFilteredVeRaProfile (VeRaTABFileName, cacheDirectory = cacheDirectory)
+    
+    assert len ( os.listdir (cacheDirectory) ) == len (cacheFileNames) == 2
+    assert not set ( os.listdir (cacheDirectory) ) & set (cacheFileNames)
+
+
+
+@pytest.mark.parametrize ( 'numberOfProcesses', [1, 2] )
+def test_getFilteredVeRaProfiles_matchesPerFile (tmp_path, numberOfProcesses):
+
+    # Profiles with different radii, given out of order, and a file that cannot be read.
+    randomGenerator = np.random.default_rng (5)
+    VeRaTABFileNames = []
+    for iProfile in [3, 0, 2, 1]:
+    
+        VeRaTABFileNames.append ( str ( tmp_path / 'PROF{}.TAB'.format (iProfile) ) )
+        if iProfile == 2:
+        
+            with open (VeRaTABFileNames [-1], 'w') as VeRaTABFile:
+            
+                VeRaTABFile.write ('not a VeRa profile\n')
+                
+        else:
+        
+            writeVeRaTAB ( VeRaTABFileNames [-1], np.sort ( randomGenerator.uniform (6090, 6160, 400) ) [::-1], 50. + iProfile )
+            
+    
+    filteredProfilesFileName = str ( tmp_path / 'filtered.npz' )
+    VeRaProfilesFiltered, profileIDs, numberOfFilteredLevels = VeRaTools.getFilteredVeRaProfiles ( VeRaTABFileNames, 6100., 6150., 2., numberOfProcesses = numberOfProcesses, 
+                                                                                                   filteredProfilesFileName = filteredProfilesFileName )
+    
+    assert profileIDs == [ 'PROF0', 'PROF1', 'PROF2', 'PROF3' ]
+    assert VeRaProfilesFiltered.shape == (4, 10, 25) and numberOfFilteredLevels == 25
+    
+    for iProfile, profileID in enumerate (profileIDs):
+    
+        if profileID == 'PROF2':
+        
+            assert np.all ( np.isnan ( VeRaProfilesFiltered [iProfile] ) )
+            
+        else:
+        
+            np.testing.assert_array_equal ( VeRaProfilesFiltered [iProfile], VeRaTools.getFilteredVeRaProfile ( str ( tmp_path / (profileID + '.TAB') ), 6100., 6150., 2. ) [0] )
+            
+    
+    # The same profiles from the columnar file.
+    VeRaProfilesFilteredRead, profileIDsRead, numberOfFilteredLevelsRead = VeRaTools.readFilteredVeRaProfiles (filteredProfilesFileName)
+    
+    np.testing.assert_array_equal (VeRaProfilesFilteredRead, VeRaProfilesFiltered)
+    assert profileIDsRead == profileIDs and numberOfFilteredLevelsRead == numberOfFilteredLevels
+    
+    with np.load (filteredProfilesFileName) as filteredProfilesContent:
+    
+        assert sorted (filteredProfilesContent.files) == sorted ( VeRaTools.filteredVeRaProfileVariables + ['profileIDs'] )
+        np.testing.assert_array_equal ( filteredProfilesContent ['temperature'], VeRaProfilesFiltered [:, 1] )
+
+
+
+def test_createVeRaProfileStore_longitudeAcrossMeridian (tmp_path):
+
+    # Longitudes from 358˚ through 4˚, crossing the 0˚ meridian.
+    VeRaTABFileName = str ( tmp_path / 'PROF.TAB' )
+    writeVeRaTAB ( VeRaTABFileName, np.linspace (6150, 6095, 100), 50., np.linspace (-2, 4, 100) % 360 )
+    
+    VeRaProfileStore = VeRaTools.createVeRaProfileStore ( str ( tmp_path / 'store' ), [VeRaTABFileName] )
+    
+    np.testing.assert_allclose ( VeRaProfileStore.metadata ['longitude'] [0], 1., atol = 0.01 )
+
+
+
+@pytest.mark.filterwarnings ('ignore:loadtxt')
+def test_VeRaProfileStore_matchesReadVeRaTAB (tmp_path):
+
+    # Profiles of different lengths, one of them empty.
+    VeRaTABFileNames = []
+    for iProfile, numberOfLevels in enumerate ( [120, 0, 45, 300] ):
+    
+        VeRaTABFileNames.append ( str ( tmp_path / 'PROF{}.TAB'.format (iProfile) ) )
+        writeVeRaTAB ( VeRaTABFileNames [-1], np.linspace (6150, 6095 + iProfile, numberOfLevels), 50. + iProfile, 100. + iProfile )
+        
+    VeRaProfileStore = VeRaTools.createVeRaProfileStore ( str ( tmp_path / 'store' ), VeRaTABFileNames )
+    VeRaProfilesOriginal = [ VeRaTools.readVeRaTAB (VeRaTABFileName) [0]  for VeRaTABFileName in VeRaTABFileNames ]
+    
+    assert len (VeRaProfileStore) == 4
+    
+    for iProfile, VeRaProfileOriginal in enumerate (VeRaProfilesOriginal):
+    
+        np.testing.assert_array_equal ( VeRaProfileStore [iProfile], VeRaProfileOriginal )
+        np.testing.assert_array_equal ( VeRaProfileStore [iProfile - 4], VeRaProfileOriginal )
+        np.testing.assert_array_equal ( VeRaProfileStore.getProfile ( 'PROF{}'.format (iProfile) ), VeRaProfileOriginal )
+        
+    for iProfile in [4, -5]:
+    
+        with pytest.raises (IndexError):
+        
+            VeRaProfileStore [iProfile]
+            
+            
+    # Ranges of profiles, as from  concatenateVeRaProfiles .
+    for iProfileStart, iProfileEnd in [ (0, None), (1, 3), (2, 2), (-2, None), (0, -1), (3, 1) ]:
+    
+        VeRaProfilesConcatenated, offsets = VeRaProfileStore.getProfiles (iProfileStart, iProfileEnd)
+        VeRaProfilesConcatenatedExpected, offsetsExpected = VeRaTools.concatenateVeRaProfiles ( VeRaProfilesOriginal [iProfileStart : iProfileEnd] )
+        
+        np.testing.assert_array_equal (VeRaProfilesConcatenated, VeRaProfilesConcatenatedExpected)
+        np.testing.assert_array_equal (offsets, offsetsExpected)
+
+
+
+# Write a synthetic VeRa .TXT file with the section of the 1-bar level.
+def writeVeRaTXT (VeRaTXTFileName, seed):
+
+    with open (VeRaTXTFileName, 'w') as VeRaTXTFile:
+    
+        VeRaTXTFile.write ( '\n'.join ( [ 'header', 'values of 1 bar level', '------------', 
+                                          '  time                :  2008-05-{:02d}T{:02d}:30:15.250'.format (1 + seed, seed), '  ---', 
+                                          '  latitude            : {:.3f}'.format (-80 + seed), '  longitude           : {:.3f}'.format (seed * 7), 
+                                          '  radius              : {:.3f}'.format (6100 + seed * 0.01), '  ---', 
+                                          '  temperature         : {:.2f}'.format (350 + seed), '  ---', 
+                                          '  local true solar time: {:.2f}'.format (seed), '  solar zenith angle  : {:.2f}'.format (40 + seed), '' ] ) )
+
+
+
+def test_readVeRaTAB_oneBarLevelOnlyOnRequest (tmp_path, monkeypatch):
+
+    # A directory with  TAB  in its name, next to the .TAB file.
+    os.makedirs ( str ( tmp_path / 'TAB_DIR' ) )
+    VeRaTABFileName = str ( tmp_path / 'TAB_DIR' / 'PROF.TAB' )
+    writeVeRaTAB ( VeRaTABFileName, np.linspace (6150, 6095, 100), 50. )
+    
+    # Record the text files that are read.
+    getTextFileContent = HandyTools.getTextFileContent
+    readFileNames = []
+    monkeypatch.setattr ( HandyTools, 'getTextFileContent', staticmethod ( lambda fileName: readFileNames.append (fileName) or getTextFileContent (fileName) ) )
+    
+    # Without the .TXT file the profile is read, the .TXT file is only read with  includeOneBarLevel = True .
+    VeRaProfileOriginal, numberOfLevels = VeRaTools.readVeRaTAB (VeRaTABFileName)
+    
+    assert VeRaProfileOriginal.shape == (7, 100) and numberOfLevels == 100
+    assert readFileNames == []
+    
+    writeVeRaTXT ( str ( tmp_path / 'TAB_DIR' / 'PROF.TXT' ), 3 )
+    VeRaProfileOriginalWithOneBarLevel, numberOfLevels, oneBarLevel = VeRaTools.readVeRaTAB (VeRaTABFileName, includeOneBarLevel = True)
+    
+    assert readFileNames == [ str ( tmp_path / 'TAB_DIR' / 'PROF.TXT' ) ]
+    np.testing.assert_array_equal (VeRaProfileOriginalWithOneBarLevel, VeRaProfileOriginal)
+    assert oneBarLevel == { 'measurementTime': '2008-05-04T03:30:15.250', 'latitude': -77., 'longitude': 21., 'radius': 6100.03, 'temperature': 353., 
+                            'localTrueSolarTime': 3., 'solarZenithAngle': 43. }
+    assert VeRaTools.readVeRaOneBarLevel ( str ( tmp_path / 'TAB_DIR' / 'PROF.TXT' ) ) == oneBarLevel
+
+
+
+def test_createVeRaProfilesTable_incremental (tmp_path, monkeypatch):
+
+    VeRaTXTFileNames = []
+    for iOrbit in range (4):
+    
+        os.makedirs ( str ( tmp_path / 'data' / 'DIR{:04d}'.format (1000 + iOrbit) ) )
+        VeRaTXTFileNames.append ( str ( tmp_path / 'data' / 'DIR{:04d}'.format (1000 + iOrbit) / 'PROF.TXT' ) )
+        writeVeRaTXT ( VeRaTXTFileNames [-1], iOrbit )
+        
+    VeRaTableFileName = str ( tmp_path / 'VeRa.tbl' )
+    VeRaTools.createVeRaProfilesTable ( VeRaTableFileName, str ( tmp_path / 'data' ), incremental = True )
+    
+    with open (VeRaTableFileName, 'rb') as fileOpen:
+    
+        VeRaTableFirstRun = fileOpen.read ()
+        
+    # Count the files that are parsed in the second run, after one file was touched.
+    getVeRaProfilesTableLine = VeRaTools.getVeRaProfilesTableLine
+    parsedFileNames = []
+    monkeypatch.setattr ( VeRaTools, 'getVeRaProfilesTableLine', lambda fileName: parsedFileNames.append (fileName) or getVeRaProfilesTableLine (fileName) )
+    
+    os.utime ( VeRaTXTFileNames [2], ns = (0, 0) )
+    VeRaTools.createVeRaProfilesTable ( VeRaTableFileName, str ( tmp_path / 'data' ), incremental = True )
+    
+    with open (VeRaTableFileName, 'rb') as fileOpen:
+    
+        assert fileOpen.read () == VeRaTableFirstRun
+        
+    assert parsedFileNames == [ VeRaTXTFileNames [2] ]
+    
+    # Without  incremental  all files are parsed and no state file is written.
+    parsedFileNames.clear ()
+    VeRaTools.createVeRaProfilesTable ( str ( tmp_path / 'VeRaFull.tbl' ), str ( tmp_path / 'data' ) )
+    
+    assert len (parsedFileNames) == 4
+    assert not os.path.isfile ( str ( tmp_path / 'VeRaFull.tbl.state.json' ) )
+
+
+
+def test_readVeRaTableAsArray_andVeRaTableIndex (tmp_path):
+
+    for iOrbit in range (8):
+    
+        os.makedirs ( str ( tmp_path / 'data' / 'DIR{:04d}'.format (1000 + iOrbit) ) )
+        writeVeRaTXT ( str ( tmp_path / 'data' / 'DIR{:04d}'.format (1000 + iOrbit) / 'PROF.TXT' ), iOrbit )
+        
+    VeRaTableFileName = str ( tmp_path / 'VeRa.tbl' )
+    VeRaTools.createVeRaProfilesTable ( VeRaTableFileName, str ( tmp_path / 'data' ) )
+    
+    VeRaTableValues = VeRaTools.readVeRaTableAsArray (VeRaTableFileName)
+    orbitID, dayOfYear, timeOfDay, localSolarTime, altitude, temperature, latitude, longitude, solarZenithAngle = VeRaTools.readValuesFromVeRaTable (VeRaTableFileName)
+    
+    # The typed columns, with the same values as the lists of  readValuesFromVeRaTable .
+    np.testing.assert_array_equal ( VeRaTableValues ['orbitID'], 1000 + np.arange (8) )
+    np.testing.assert_array_equal ( VeRaTableValues ['orbitID'], np.array (orbitID, dtype = int) )
+    np.testing.assert_array_equal ( VeRaTableValues ['time'], 
+                                    np.array ( [ '2008-05-{:02d}T{:02d}:30:15.250'.format (1 + iOrbit, iOrbit)  for iOrbit in range (8) ], dtype = 'datetime64[ms]' ) )
+    np.testing.assert_allclose ( VeRaTableValues ['timeOfDay'], timeOfDay )
+    
+    for columnName, columnValues in [ ('altitude', altitude), ('temperature', temperature), ('localSolarTime', localSolarTime), ('latitude', latitude), 
+                                      ('longitude', longitude), ('solarZenithAngle', solarZenithAngle) ]:
+    
+        np.testing.assert_array_equal ( VeRaTableValues [columnName], columnValues )
+        
+    
+    # Selections against a scan over all rows, with the limits included, on the time and orbit columns and with an empty result.
+    VeRaTableIndexOfTable = VeRaTableIndex (VeRaTableValues)
+    
+    for columnRanges in [ {}, { 'latitude': (-78, -74) }, { 'latitude': (-78, None), 'time': (None, '2008-05-06T05:30:15.250') }, 
+                          { 'orbitID': (1002, 1006), 'time': ('2008-05-04', None), 'longitude': (20, 50) }, { 'orbitID': (1005, 1006), 'latitude': (None, -77) } ]:
+    
+        iExpected = np.ones ( len (VeRaTableValues), dtype = bool )
+        for columnName, (minimum, maximum) in columnRanges.items ():
+        
+            columnValues = VeRaTableValues [columnName]
+            if columnName == 'time':
+            
+                minimum = None  if minimum is None  else np.datetime64 (minimum, 'ms')
+                maximum = None  if maximum is None  else np.datetime64 (maximum, 'ms')
+                
+            iExpected &= ( True  if minimum is None  else columnValues >= minimum ) & ( True  if maximum is None  else columnValues <= maximum )
+            
+        np.testing.assert_array_equal ( VeRaTableIndexOfTable.select (**columnRanges), VeRaTableValues [iExpected] )
+        
+    assert len ( VeRaTableIndexOfTable.select ( orbitID = (1005, 1006), latitude = (None, -77) ) ) == 0
+
+
+
+def test_VeRaSoundingIndex_matchesGreatCircleDistances ():
+
+    # Soundings all over the sphere, some of them close to the poles, over ten days.
+    randomGenerator = np.random.default_rng (6)
+    VeRaTableValues = np.zeros ( 3000, dtype = [ ('latitude', float), ('longitude', float), ('time', 'datetime64[ms]') ] )
+    VeRaTableValues ['latitude'] = np.degrees ( np.arcsin ( randomGenerator.uniform (-1, 1, 3000) ) )
+    VeRaTableValues ['latitude'] [:40] = randomGenerator.uniform (-90, -88, 40)
+    VeRaTableValues ['latitude'] [40:80] = randomGenerator.uniform (88, 90, 40)
+    VeRaTableValues ['longitude'] = randomGenerator.uniform (0, 360, 3000)
+    VeRaTableValues ['time'] = np.datetime64 ('2008-05-01T00:00:00.000') + ( randomGenerator.uniform (0, 240, 3000) * 3600000 ).astype ('timedelta64[ms]')
+    
+    VeRaSoundingIndexOfTable = VeRaSoundingIndex (VeRaTableValues, cellSizeDegrees = 4.)
+    
+    # Great-circle distances (haversine) of all soundings.
+    def getDistances (latitude, longitude):
+    
+        latitudes = np.radians ( VeRaTableValues ['latitude'] )
+        longitudes = np.radians ( VeRaTableValues ['longitude'] )
+        
+        return np.degrees ( 2 * np.arcsin ( np.sqrt ( np.sin ( (latitudes - np.radians (latitude)) / 2 )**2 + 
+                                                      np.cos (latitudes) * np.cos ( np.radians (latitude) ) * np.sin ( (longitudes - np.radians (longitude)) / 2 )**2 ) ) )
+        
+    time = np.datetime64 ('2008-05-05T12:00:00.000')
+    for latitude, longitude in [ (-89.5, 10.), (90., 0.), (88., 200.), (-30., -20.), (10., 365.), (0., 720.), (45., 359.9) ]:
+    
+        distances = getDistances (latitude, longitude)
+        iInTimeWindow = np.abs ( VeRaTableValues ['time'] - time ) <= np.timedelta64 (6, 'h')
+        
+        for radiusDegrees in [0.5, 3., 12., 50.]:
+        
+            for timeWindowHours, iExpected in [ ( None, np.where (distances <= radiusDegrees) [0] ), 
+                                                ( 6., np.where ( np.logical_and (distances <= radiusDegrees, iInTimeWindow) ) [0] ) ]:
+            
+                iSoundings, soundingDistances = VeRaSoundingIndexOfTable.queryRadius (latitude, longitude, radiusDegrees, time = time, timeWindowHours = timeWindowHours)
+                
+                iExpected = iExpected [ np.argsort (distances [iExpected], kind = 'stable') ]
+                np.testing.assert_array_equal (iSoundings, iExpected)
+                np.testing.assert_allclose (soundingDistances, distances [iExpected], atol = 1e-6)
+                
+                
+        # The k nearest, also with more soundings asked for than there are in the time window.
+        for k, timeWindowHours, iCandidates in [ ( 1, None, np.arange (3000) ), ( 25, None, np.arange (3000) ), ( 5, 6., np.where (iInTimeWindow) [0] ), 
+                                                 ( 1000, 6., np.where (iInTimeWindow) [0] ) ]:
+        
+            iSoundings, soundingDistances = VeRaSoundingIndexOfTable.queryNearest (latitude, longitude, k, time = time, timeWindowHours = timeWindowHours)
+            
+            iExpected = iCandidates [ np.argsort (distances [iCandidates], kind = 'stable') [:k] ]
+            np.testing.assert_array_equal (iSoundings, iExpected)
+            np.testing.assert_allclose (soundingDistances, distances [iExpected], atol = 1e-6)
+            
+        assert len ( VeRaSoundingIndexOfTable.queryNearest (latitude, longitude, 1000, time = time, timeWindowHours = 6.) [0] ) == np.count_nonzero (iInTimeWindow) < 1000
+
+
+
+# Filtered profile with a loop over the filtered levels, as before the binning of  getBinAveragesAndSDs .
+def getFilteredVeRaProfileWithLoop (VeRaProfileOriginal, startAltitude, endAltitude, filteredAltitudeLevelsStep):
+
+    numberOfFilteredLevels = int ( (endAltitude - startAltitude) / filteredAltitudeLevelsStep )
+    VeRaProfileFiltered = np.zeros ( (10, numberOfFilteredLevels) )
+    
+    for iFilteredAltitudeLevel in range (numberOfFilteredLevels):
+    
+        VeRaProfileFiltered [0][iFilteredAltitudeLevel] = startAltitude + iFilteredAltitudeLevel * filteredAltitudeLevelsStep
+        
+        iLevelsToAverage = np.where ( np.logical_and ( VeRaProfileOriginal [0] > VeRaProfileFiltered [0][iFilteredAltitudeLevel] - filteredAltitudeLevelsStep / 2, 
+                                                       VeRaProfileOriginal [0] < VeRaProfileFiltered [0][iFilteredAltitudeLevel] + filteredAltitudeLevelsStep / 2 ) ) [0]
+        VeRaProfileFiltered [9][iFilteredAltitudeLevel] = len (iLevelsToAverage)
+        
+        for iRow in [1, 3, 5, 6]:
+        
+            VeRaProfileFiltered [iRow][iFilteredAltitudeLevel] = np.mean ( VeRaProfileOriginal [iRow][iLevelsToAverage] )  if len (iLevelsToAverage)  else np.nan
+            
+        for iRow in [1, 3]:
+        
+            VeRaProfileFiltered [iRow + 1][iFilteredAltitudeLevel] = np.std ( VeRaProfileOriginal [iRow][iLevelsToAverage], ddof = 1 )  if len (iLevelsToAverage) > 1  else np.nan
+            
+            
+    for iFilteredAltitudeLevel in range (numberOfFilteredLevels - 1):
+    
+        VeRaProfileFiltered [7][iFilteredAltitudeLevel] = ( VeRaProfileFiltered [1][iFilteredAltitudeLevel + 1] - VeRaProfileFiltered [1][iFilteredAltitudeLevel] ) / filteredAltitudeLevelsStep
+        VeRaProfileFiltered [8][iFilteredAltitudeLevel] = np.sqrt ( VeRaProfileFiltered [2][iFilteredAltitudeLevel + 1]**2 + VeRaProfileFiltered [2][iFilteredAltitudeLevel]**2 ) / filteredAltitudeLevelsStep
+        
+    VeRaProfileFiltered [7][numberOfFilteredLevels - 1] = VeRaProfileFiltered [7][numberOfFilteredLevels - 2]
+    
+    return VeRaProfileFiltered
+
+
+
+@pytest.mark.parametrize ( 'filteredAltitudeLevelsStep', [1., 0.3, 2.5] )
+def test_getFilteredVeRaProfile_matchesLoop (tmp_path, filteredAltitudeLevelsStep):
+
+    # Random radii with a gap (empty bins) between 6120km and 6126km and sparse levels (bins with one level) above 6140km.
+    randomGenerator = np.random.default_rng (2)
+    radii = np.concatenate ( [ randomGenerator.uniform (6090, 6120, 600), randomGenerator.uniform (6126, 6140, 300), randomGenerator.uniform (6140, 6160, 12) ] )
+    radii = np.sort ( np.round (radii, 4) ) [::-1]
+    
+    VeRaTABFileName = str ( tmp_path / 'PROF.TAB' )
+    writeVeRaTAB ( VeRaTABFileName, radii, 50., randomGenerator.uniform (100, 110, len (radii)) )
+    
+    VeRaProfileFiltered, numberOfFilteredLevels, VeRaProfileOriginal, numberOfOriginalLevels = \
+        VeRaTools.getFilteredVeRaProfile (VeRaTABFileName, 6098., 6154., filteredAltitudeLevelsStep)
+    VeRaProfileFilteredWithLoop = getFilteredVeRaProfileWithLoop (VeRaProfileOriginal, 6098., 6154., filteredAltitudeLevelsStep)
+    
+    assert numberOfFilteredLevels == VeRaProfileFilteredWithLoop.shape [1]
+    assert np.any ( VeRaProfileFiltered [9] == 0 ) and np.any ( VeRaProfileFiltered [9] == 1 )
+    np.testing.assert_allclose ( VeRaProfileFiltered, VeRaProfileFilteredWithLoop, rtol = 1e-9, atol = 1e-12 )
+
+
+
+def test_getVeRaProfilesOnPressureLevels_matchesInterp ():
+
+    # Profiles as from  readVeRaTAB , with different pressure ranges; the second one crosses the 0˚ meridian and the last one is empty.
+    randomGenerator = np.random.default_rng (3)
+    VeRaProfilesOriginal = []
+    for numberOfLevels, startLongitude, longitudeStep, pressureScale in [ (200, 120., 0.01, 1.), (150, 358., 0.04, 0.5), (80, 2., -0.05, 2.), (0, 0., 0., 1.) ]:
+    
+        radii = np.sort ( randomGenerator.uniform (6090, 6160, numberOfLevels) )
+        VeRaProfilesOriginal.append ( np.stack ( [ radii, 300 - (radii - 6090) * 1.2, randomGenerator.uniform (0.1, 0.3, numberOfLevels), 
+                                                   pressureScale * np.exp ( - (radii - 6100) / 5 ), randomGenerator.uniform (1e-4, 1e-3, numberOfLevels), 
+                                                   -60 + 0.01 * np.arange (numberOfLevels), ( startLongitude + longitudeStep * np.arange (numberOfLevels) ) % 360 ] ) )
+        
+    # Pressure levels inside and outside the range of each profile.
+    pressureLevels = np.logspace (-7, 2, 40)
+    
+    VeRaProfilesOnPressureLevels = VeRaTools.getVeRaProfilesOnPressureLevels (VeRaProfilesOriginal, pressureLevels)
+    
+    assert VeRaProfilesOnPressureLevels.shape == ( len (VeRaProfilesOriginal), 7, len (pressureLevels) )
+    
+    for iProfile, VeRaProfileOriginal in enumerate (VeRaProfilesOriginal):
+    
+        np.testing.assert_array_equal ( VeRaProfilesOnPressureLevels [iProfile, 3], pressureLevels )
+        
+        # Longitudes unwrapped in the order of the levels, then interpolated per variable in log-pressure without extrapolation.
+        unwrappedValues = VeRaProfileOriginal.copy ()
+        unwrappedValues [6] = np.unwrap (VeRaProfileOriginal [6], period = 360)
+        iSorted = np.argsort ( VeRaProfileOriginal [3] )
+        
+        for iRow in [0, 1, 2, 4, 5, 6]:
+        
+            interpolatedValues = np.interp ( np.log (pressureLevels), np.log ( VeRaProfileOriginal [3][iSorted] ), unwrappedValues [iRow][iSorted], left = np.nan, right = np.nan ) \
+                                 if VeRaProfileOriginal.shape [1]  else np.full ( len (pressureLevels), np.nan )
+                                 
+            if iRow == 6:
+            
+                interpolatedValues = interpolatedValues % 360
+                
+            np.testing.assert_allclose ( VeRaProfilesOnPressureLevels [iProfile, iRow], interpolatedValues, rtol = 1e-9, atol = 1e-9 )
+            
+        
+    # Some levels are outside the range of every profile, and the second profile has interpolated longitudes on both sides of 0˚.
+    assert np.all ( np.isnan ( VeRaProfilesOnPressureLevels [:, 1, 0] ) ) and np.all ( np.isnan ( VeRaProfilesOnPressureLevels [:, 1, -1] ) )
+    assert np.nanmin ( VeRaProfilesOnPressureLevels [1, 6] ) < 10 and np.nanmax ( VeRaProfilesOnPressureLevels [1, 6] ) > 350
+    
+    # The same result from the concatenated profiles.
+    VeRaProfilesConcatenated, offsets = VeRaTools.concatenateVeRaProfiles (VeRaProfilesOriginal)
+    np.testing.assert_array_equal ( VeRaTools.getVeRaProfilesOnPressureLevels (VeRaProfilesConcatenated, pressureLevels, offsets), VeRaProfilesOnPressureLevels )